@@ -5,6 +5,11 @@ from config import config
 from app.models import init_db, db, migrate
 from app.middleware.cors import init_cors
 from app.middleware.error_handler import register_error_handlers
+from app.utils.cache import init_cache
+from app.utils.auth import init_auth
+from app.utils.query_stats import init_query_stats
+from app.utils.metrics import init_metrics
+from app.utils.profiler import init_profiler
 
 
 def create_app(config_name='development'):
@@ -17,7 +22,12 @@ def create_app(config_name='development'):
     
     # Initialize extensions
     init_db(app)
+    init_query_stats(app)
+    init_metrics(app)
+    init_profiler(app)
     jwt = JWTManager(app)
+    init_auth(jwt)
+    init_cache(app)
     
     # Initialize middleware
     init_cors(app)
@@ -28,11 +38,15 @@ def create_app(config_name='development'):
     from app.routes.donor import donor_bp
     from app.routes.partner import partner_bp
     from app.routes.admin import admin_bp
+    from app.routes.payments import payments_bp
+    from app.routes.files import files_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(donor_bp)
     app.register_blueprint(partner_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(payments_bp)
+    app.register_blueprint(files_bp)
     
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
@@ -52,7 +66,10 @@ def create_app(config_name='development'):
                 'auth': '/api/auth',
                 'donor': '/api/donor',
                 'partner': '/api/partner',
-                'admin': '/api/admin'
+                'admin': '/api/admin',
+                'payments': '/api/payments',
+                'files': '/api/files',
+                'metrics': '/metrics'
             }
         }), 200
     
@@ -1,13 +1,26 @@
 """Campaign models"""
 from datetime import datetime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.orm import deferred
+from sqlalchemy.sql.expression import Grouping
 import uuid
 from app.models import db
 
+# Priority rank of each urgency level (lower is more urgent)
+URGENCY_RANK = {'critical': 1, 'high': 2, 'medium': 3, 'low': 4}
+
 
 class Campaign(db.Model):
     """Medical fundraising campaign model"""
     __tablename__ = 'campaigns'
+    __table_args__ = (
+        db.Index('ix_campaigns_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_campaigns_created_at_id', 'created_at', 'id'),
+        db.Index('ix_campaigns_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_campaigns_status_category_urgency', 'status', 'category', 'urgency'),
+        db.Index('ix_campaigns_status_urgency', 'status', 'urgency'),
+        db.Index('ix_campaigns_partner_created_at_id', 'partner_id', 'created_at', 'id'),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = db.Column(db.String(255), nullable=False)
@@ -18,6 +31,7 @@ class Campaign(db.Model):
     # Financial
     target_amount = db.Column(db.Float, nullable=False)
     funds_raised = db.Column(db.Float, default=0)
+    counter_shards = db.Column(db.Integer, default=0)  # >0 spreads funds_raised increments over sub-counters (hot campaigns)
     status = db.Column(db.String(50), default='pending')  # 'pending', 'approved', 'rejected', 'completed', 'cancelled'
     
     # Beneficiary
@@ -30,6 +44,7 @@ class Campaign(db.Model):
     
     # Images & Documents
     cover_image = db.Column(db.String(255))
+    cover_variants = db.Column(db.JSON)  # {variant: {width, height, size, content_hash}} once rendered
     medical_document = db.Column(db.String(255))
     
     # Timeline
@@ -37,6 +52,18 @@ class Campaign(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     deadline = db.Column(db.DateTime)
     
+    # Full-text search document, maintained by PostgreSQL on every write
+    search_vector = deferred(db.Column(
+        TSVECTOR,
+        db.Computed(
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(beneficiary_name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(beneficiary_medical_condition, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'C')",
+            persisted=True
+        )
+    ))
+    
     # Relationships
     donations = db.relationship('Donation', backref='campaign', lazy=True, cascade='all, delete-orphan')
     documents = db.relationship('Document', backref='campaign', lazy=True, cascade='all, delete-orphan')
@@ -60,6 +87,15 @@ class Campaign(db.Model):
             'beneficiary_medical_condition': self.beneficiary_medical_condition,
             'partner_id': str(self.partner_id) if self.partner_id else None,
             'cover_image': self.cover_image,
+            'cover_image_url': f'/api/files/campaigns/{self.id}/cover' if self.cover_image else None,
+            'cover_image_variants': {
+                name: {
+                    'url': f'/api/files/campaigns/{self.id}/cover/{name}',
+                    'width': variant['width'],
+                    'height': variant['height']
+                }
+                for name, variant in self.cover_variants.items()
+            } if self.cover_image and self.cover_variants else None,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
             'deadline': self.deadline.isoformat() if self.deadline else None,
@@ -78,9 +114,63 @@ class Campaign(db.Model):
         return round((self.funds_raised / self.target_amount * 100), 2)
 
 
+def campaign_priority_order():
+    """ORDER BY clauses ranking campaigns by urgency, then largest remaining amount
+    
+    The expressions are explicitly parenthesized so the same clauses are
+    valid in CREATE INDEX and match the index definition exactly.
+    """
+    return (
+        Grouping(db.case(URGENCY_RANK, value=Campaign.urgency, else_=len(URGENCY_RANK) + 1)),
+        Grouping(Campaign.target_amount - Campaign.funds_raised).desc(),
+        Campaign.id
+    )
+
+
+# Serves /campaigns/priority: the status filter plus the full ORDER BY, so the
+# top N rows are read straight off the index without a sort
+db.Index('ix_campaigns_priority', Campaign.status, *campaign_priority_order())
+
+
+class CampaignFundShard(db.Model):
+    """Sub-counter absorbing funds_raised increments for a hot campaign.
+    
+    Shards are folded back into Campaign.funds_raised by compact_fund_shards().
+    """
+    __tablename__ = 'campaign_fund_shards'
+    
+    campaign_id = db.Column(UUID(as_uuid=True), db.ForeignKey('campaigns.id', ondelete='CASCADE'), primary_key=True)
+    shard = db.Column(db.Integer, primary_key=True)
+    amount = db.Column(db.Float, nullable=False, default=0)
+
+
+class DonationRollup(db.Model):
+    """Completed donations of a campaign aggregated per hour or day.
+    
+    Category and urgency are copied from the campaign so analytics can
+    filter and group on them without joining campaigns.
+    """
+    __tablename__ = 'donation_rollups'
+    
+    granularity = db.Column(db.String(10), primary_key=True)  # 'hour', 'day'
+    bucket_start = db.Column(db.DateTime, primary_key=True)  # UTC
+    campaign_id = db.Column(UUID(as_uuid=True), db.ForeignKey('campaigns.id', ondelete='CASCADE'), primary_key=True)
+    category = db.Column(db.String(100))
+    urgency = db.Column(db.String(50))
+    donation_count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Float, nullable=False, default=0)
+
+
 class Donation(db.Model):
     """Donation model"""
     __tablename__ = 'donations'
+    __table_args__ = (
+        db.Index('ix_donations_donor_created_at_id', 'donor_id', 'created_at', 'id'),
+        db.Index('ix_donations_campaign_status_created_at_id', 'campaign_id', 'status', 'created_at', 'id'),
+        # Small partial index walked by the pending-donation reconciler
+        db.Index('ix_donations_pending_created_at_id', 'created_at', 'id',
+                 postgresql_where=db.text("status = 'pending'")),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     campaign_id = db.Column(UUID(as_uuid=True), db.ForeignKey('campaigns.id'), nullable=False)
@@ -8,6 +8,10 @@ from app.models import db
 class Document(db.Model):
     """Document model for medical and verification documents"""
     __tablename__ = 'documents'
+    __table_args__ = (
+        db.Index('ix_documents_campaign_id', 'campaign_id'),
+        db.Index('ix_documents_file_path', 'file_path'),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     campaign_id = db.Column(UUID(as_uuid=True), db.ForeignKey('campaigns.id'), nullable=True)
@@ -17,6 +21,8 @@ class Document(db.Model):
     file_path = db.Column(db.String(255), nullable=False)
     file_name = db.Column(db.String(255), nullable=False)
     file_size = db.Column(db.Integer)
+    content_hash = db.Column(db.String(64))  # SHA-256 hex digest of the contents
+    mime_type = db.Column(db.String(100))  # Sniffed from the contents, not the extension
     
     is_verified = db.Column(db.Boolean, default=False)
     verification_notes = db.Column(db.Text)
@@ -31,6 +37,9 @@ class Document(db.Model):
             'document_type': self.document_type,
             'file_name': self.file_name,
             'file_size': self.file_size,
+            'content_hash': self.content_hash,
+            'mime_type': self.mime_type,
+            'download_url': f'/api/files/documents/{self.id}',
             'is_verified': self.is_verified,
             'created_at': self.created_at.isoformat(),
         }
@@ -39,6 +48,10 @@ class Document(db.Model):
 class Transaction(db.Model):
     """Payment transaction model"""
     __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_transactions_created_at_id', 'created_at', 'id'),
+        db.Index('ix_transactions_donation_id', 'donation_id'),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     donation_id = db.Column(UUID(as_uuid=True), db.ForeignKey('donations.id'), nullable=False)
@@ -70,6 +83,11 @@ class Transaction(db.Model):
 class Disbursement(db.Model):
     """Fund disbursement model for direct-to-bank transfer"""
     __tablename__ = 'disbursements'
+    __table_args__ = (
+        db.Index('ix_disbursements_created_at_id', 'created_at', 'id'),
+        db.Index('ix_disbursements_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_disbursements_campaign_id', 'campaign_id'),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     campaign_id = db.Column(UUID(as_uuid=True), db.ForeignKey('campaigns.id'), nullable=False)
@@ -104,6 +122,11 @@ class Disbursement(db.Model):
 class FraudReport(db.Model):
     """Fraud reporting model"""
     __tablename__ = 'fraud_reports'
+    __table_args__ = (
+        db.Index('ix_fraud_reports_created_at_id', 'created_at', 'id'),
+        db.Index('ix_fraud_reports_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_fraud_reports_campaign_id', 'campaign_id'),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     campaign_id = db.Column(UUID(as_uuid=True), db.ForeignKey('campaigns.id'), nullable=False)
@@ -127,3 +150,52 @@ class FraudReport(db.Model):
             'status': self.status,
             'created_at': self.created_at.isoformat(),
         }
+
+
+class PaymentEvent(db.Model):
+    """Payment gateway webhook event queued for batch processing"""
+    __tablename__ = 'payment_events'
+    __table_args__ = (
+        db.Index('ix_payment_events_status_received_at', 'status', 'received_at'),
+    )
+    
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_id = db.Column(db.String(255), unique=True, nullable=False)  # Gateway event ID, deduplicates retries
+    event_type = db.Column(db.String(100), nullable=False)
+    payment_intent_id = db.Column(db.String(255), index=True)
+    
+    status = db.Column(db.String(50), default='queued')  # 'queued', 'processed', 'failed'
+    payload = db.Column(db.JSON)
+    error_message = db.Column(db.Text)
+    
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': str(self.id),
+            'event_id': self.event_id,
+            'event_type': self.event_type,
+            'payment_intent_id': self.payment_intent_id,
+            'status': self.status,
+            'received_at': self.received_at.isoformat(),
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None,
+        }
+
+
+class IdempotencyKey(db.Model):
+    """Stored outcome of a request made with an Idempotency-Key header"""
+    __tablename__ = 'idempotency_keys'
+    
+    # sha256 of (user, endpoint, client key) - fixed size whatever the client sends
+    key_hash = db.Column(db.String(64), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)  # sha256 of the request body
+    
+    status = db.Column(db.String(20), default='in_progress')  # 'in_progress', 'completed'
+    response_status = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # In-progress keys expire after the lock timeout, completed ones after the TTL
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -2,13 +2,17 @@
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.models import db
+from app.utils.passwords import hash_password, verify_password
 
 
 class User(db.Model):
     """Base User model"""
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+        db.Index('ix_users_user_type_created_at_id', 'user_type', 'created_at', 'id'),
+    )
     
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
@@ -32,11 +36,11 @@ class User(db.Model):
     
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """Verify password"""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
     
     def to_dict(self):
         """Convert to dictionary"""
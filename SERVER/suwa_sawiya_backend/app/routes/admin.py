@@ -1,16 +1,27 @@
 """Admin routes - FR-A-01 to FR-A-05"""
-from flask import Blueprint, request
+from flask import Blueprint, Response, current_app, request, send_from_directory, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.models import db
-from app.models.user import User, Admin, Partner, Donor
+from app.models.user import User, Admin, Partner
 from app.models.campaign import Campaign, Donation
 from app.models.other import Document, Disbursement, FraudReport
 from app.utils.response import success_response, error_response, paginated_response
-from app.utils.auth import role_required
+from app.utils.pagination import paginate_query
+from app.utils.auth import role_required, revocations
+from app.utils.cache import response_cache
+from app.utils.query_stats import query_stats
+from app.utils.profiler import TOKEN_HEADER, PROFILE_EXTENSIONS, create_profile_token, list_profiles
+from app.utils.stats import get_dashboard_stats
+from app.utils.rollups import donation_time_series
+from app.utils.export import EXPORTS, EXPORT_FORMATS, export_query, generate_export, parse_export_args
+from app.utils.file_handler import delete_file
+from config import Config
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
+MAX_PROFILE_TOKEN_TTL = 3600
+
 
 # FR-A-01: Admin dashboard
 @admin_bp.route('/dashboard', methods=['GET'])
@@ -19,49 +30,11 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 def admin_dashboard():
     """Get admin dashboard statistics"""
     try:
-        # Get statistics
-        total_users = User.query.count()
-        total_donors = Donor.query.count()
-        total_partners = Partner.query.count()
-        total_campaigns = Campaign.query.count()
-        approved_campaigns = Campaign.query.filter_by(status='approved').count()
-        pending_campaigns = Campaign.query.filter_by(status='pending').count()
-        
-        total_funds_raised = db.session.query(db.func.sum(Campaign.funds_raised)).scalar() or 0
-        total_donations = Donation.query.filter_by(status='completed').count()
-        
-        # Get recent campaigns
-        recent_campaigns = Campaign.query.order_by(Campaign.created_at.desc()).limit(5).all()
-        
-        # Get pending fraud reports
-        pending_fraud_reports = FraudReport.query.filter_by(status='pending').count()
-        
-        # Get pending disbursement requests
-        pending_disbursements = Disbursement.query.filter_by(status='pending').count()
+        # Cached for a few seconds; refresh=true recomputes exactly
+        refresh = request.args.get('refresh', 'false').lower() in ('true', '1', 'yes')
         
         return success_response(
-            data={
-                'users': {
-                    'total': total_users,
-                    'donors': total_donors,
-                    'partners': total_partners
-                },
-                'campaigns': {
-                    'total': total_campaigns,
-                    'approved': approved_campaigns,
-                    'pending': pending_campaigns,
-                    'total_funds_raised': total_funds_raised
-                },
-                'donations': {
-                    'total': total_donations,
-                    'average_amount': total_funds_raised / total_donations if total_donations > 0 else 0
-                },
-                'pending_items': {
-                    'fraud_reports': pending_fraud_reports,
-                    'disbursement_requests': pending_disbursements
-                },
-                'recent_campaigns': [c.to_dict() for c in recent_campaigns]
-            },
+            data=get_dashboard_stats(refresh=refresh),
             message='Dashboard data retrieved successfully'
         )
     except Exception as e:
@@ -75,20 +48,19 @@ def admin_dashboard():
 def get_pending_campaigns():
     """Get pending campaigns for review"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        campaigns = Campaign.query.filter_by(status='pending').paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        campaigns, error = paginate_query(Campaign.query.filter_by(status='pending'), Campaign)
+        if error:
+            return error_response(error, 400)
         
         items = [campaign.to_dict() for campaign in campaigns.items]
         
         return paginated_response(
             items=items,
             total=campaigns.total,
-            page=page,
-            per_page=per_page,
+            page=campaigns.page,
+            per_page=campaigns.per_page,
+            has_more=campaigns.has_more,
+            next_cursor=campaigns.next_cursor,
             message='Pending campaigns retrieved successfully'
         )
     except Exception as e:
@@ -113,6 +85,8 @@ def approve_campaign(campaign_id):
         
         db.session.commit()
         
+        response_cache.invalidate_campaign(campaign_id)
+        
         return success_response(
             data=campaign.to_dict(),
             message='Campaign approved successfully'
@@ -142,6 +116,8 @@ def reject_campaign(campaign_id):
         # Could add a rejection reason field to Campaign model
         db.session.commit()
         
+        response_cache.invalidate_campaign(campaign_id)
+        
         return success_response(
             data=campaign.to_dict(),
             message='Campaign rejected successfully'
@@ -158,12 +134,9 @@ def reject_campaign(campaign_id):
 def get_pending_partners():
     """Get pending partner verifications"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        partners = Partner.query.filter_by(is_verified=False).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        partners, error = paginate_query(Partner.query.filter_by(is_verified=False), Partner)
+        if error:
+            return error_response(error, 400)
         
         items = []
         for partner in partners.items:
@@ -178,8 +151,10 @@ def get_pending_partners():
         return paginated_response(
             items=items,
             total=partners.total,
-            page=page,
-            per_page=per_page,
+            page=partners.page,
+            per_page=partners.per_page,
+            has_more=partners.has_more,
+            next_cursor=partners.next_cursor,
             message='Pending partners retrieved successfully'
         )
     except Exception as e:
@@ -231,6 +206,9 @@ def reject_partner(partner_id):
         
         db.session.commit()
         
+        # Outstanding tokens stop working here now, in other workers on their next refresh
+        revocations.revoke(partner.id)
+        
         return success_response(
             data=partner.to_dict(),
             message='Partner rejected successfully'
@@ -247,8 +225,6 @@ def reject_partner(partner_id):
 def get_all_campaigns():
     """Get all campaigns with filtering"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
         
         query = Campaign.query
@@ -256,15 +232,19 @@ def get_all_campaigns():
         if status:
             query = query.filter_by(status=status)
         
-        campaigns = query.paginate(page=page, per_page=per_page, error_out=False)
+        campaigns, error = paginate_query(query, Campaign)
+        if error:
+            return error_response(error, 400)
         
         items = [campaign.to_dict() for campaign in campaigns.items]
         
         return paginated_response(
             items=items,
             total=campaigns.total,
-            page=page,
-            per_page=per_page,
+            page=campaigns.page,
+            per_page=campaigns.per_page,
+            has_more=campaigns.has_more,
+            next_cursor=campaigns.next_cursor,
             message='Campaigns retrieved successfully'
         )
     except Exception as e:
@@ -285,18 +265,22 @@ def update_campaign(campaign_id):
         data = request.get_json()
         
         # Update allowed fields
-        updatable_fields = ['title', 'description', 'category', 'urgency', 'target_amount']
+        updatable_fields = ['title', 'description', 'category', 'urgency', 'target_amount', 'counter_shards']
         
         for field in updatable_fields:
             if field in data:
                 if field == 'target_amount':
                     setattr(campaign, field, float(data[field]))
+                elif field == 'counter_shards':
+                    setattr(campaign, field, max(int(data[field]), 0))
                 else:
                     setattr(campaign, field, data[field])
         
         campaign.updated_at = datetime.utcnow()
         db.session.commit()
         
+        response_cache.invalidate_campaign(campaign_id)
+        
         return success_response(
             data=campaign.to_dict(),
             message='Campaign updated successfully'
@@ -317,9 +301,19 @@ def delete_campaign(campaign_id):
         if not campaign:
             return error_response('Campaign not found', 404)
         
+        # Stored files may be shared with other campaigns; only unreferenced ones go
+        file_paths = {campaign.cover_image, campaign.medical_document}
+        file_paths.update(document.file_path for document in campaign.documents)
+        
         db.session.delete(campaign)
         db.session.commit()
         
+        response_cache.invalidate_campaign(campaign_id)
+        
+        grace = current_app.config.get('UPLOAD_GC_GRACE_SECONDS', 0)
+        for file_path in file_paths - {None}:
+            delete_file(file_path, Config.UPLOAD_FOLDER, grace)
+        
         return success_response(message='Campaign deleted successfully')
     except Exception as e:
         db.session.rollback()
@@ -333,8 +327,6 @@ def delete_campaign(campaign_id):
 def get_fraud_reports():
     """Get fraud reports"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
         
         query = FraudReport.query
@@ -342,15 +334,19 @@ def get_fraud_reports():
         if status:
             query = query.filter_by(status=status)
         
-        reports = query.paginate(page=page, per_page=per_page, error_out=False)
+        reports, error = paginate_query(query, FraudReport)
+        if error:
+            return error_response(error, 400)
         
         items = [report.to_dict() for report in reports.items]
         
         return paginated_response(
             items=items,
             total=reports.total,
-            page=page,
-            per_page=per_page,
+            page=reports.page,
+            per_page=reports.per_page,
+            has_more=reports.has_more,
+            next_cursor=reports.next_cursor,
             message='Fraud reports retrieved successfully'
         )
     except Exception as e:
@@ -406,6 +402,8 @@ def confirm_fraud(report_id):
         
         db.session.commit()
         
+        response_cache.invalidate_campaign(report.campaign_id)
+        
         return success_response(
             data=report.to_dict(),
             message='Fraud confirmed. Campaign suspended.'
@@ -450,8 +448,6 @@ def dismiss_fraud_report(report_id):
 def get_disbursement_requests():
     """Get pending disbursement requests"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
         
         query = Disbursement.query
@@ -459,15 +455,19 @@ def get_disbursement_requests():
         if status:
             query = query.filter_by(status=status)
         
-        disbursements = query.paginate(page=page, per_page=per_page, error_out=False)
+        disbursements, error = paginate_query(query, Disbursement)
+        if error:
+            return error_response(error, 400)
         
         items = [d.to_dict() for d in disbursements.items]
         
         return paginated_response(
             items=items,
             total=disbursements.total,
-            page=page,
-            per_page=per_page,
+            page=disbursements.page,
+            per_page=disbursements.per_page,
+            has_more=disbursements.has_more,
+            next_cursor=disbursements.next_cursor,
             message='Disbursement requests retrieved successfully'
         )
     except Exception as e:
@@ -504,14 +504,169 @@ def approve_disbursement(disbursement_id):
         return error_response(str(e), 500)
 
 
+@admin_bp.route('/analytics/donations', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def get_donation_analytics():
+    """Get donation counts and amounts over time from the rollups"""
+    try:
+        try:
+            end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else datetime.utcnow()
+            start = datetime.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=30)
+        except ValueError:
+            return error_response('start and end must be ISO 8601 dates', 400)
+        
+        granularity = request.args.get('granularity', 'day')
+        group_by = request.args.get('group_by')
+        
+        series, error = donation_time_series(
+            start, end, granularity, group_by,
+            filters={
+                'campaign': request.args.get('campaign_id'),
+                'category': request.args.get('category'),
+                'urgency': request.args.get('urgency')
+            }
+        )
+        if error:
+            return error_response(error, 400)
+        
+        return success_response(
+            data={
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'granularity': granularity,
+                'group_by': group_by,
+                'series': series
+            },
+            message='Donation analytics retrieved successfully'
+        )
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@admin_bp.route('/export/<resource>', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def export_resource(resource):
+    """Stream all donations, transactions, campaigns or disbursements as CSV or NDJSON"""
+    try:
+        if resource not in EXPORTS:
+            return error_response(f'Unknown export: {resource}', 404)
+        
+        options, error = parse_export_args()
+        if error:
+            return error_response(error, 400)
+        
+        stmt = export_query(resource, options['start'], options['end'], options['status'])
+        columns = EXPORTS[resource][1]
+        
+        filename = f"{resource}-{datetime.utcnow():%Y%m%d%H%M%S}.{options['format']}"
+        mimetype = EXPORT_FORMATS[options['format']]
+        if options['gzip']:
+            filename += '.gz'
+            mimetype = 'application/gzip'
+        
+        response = Response(
+            stream_with_context(generate_export(stmt, columns, options['format'], options['gzip'])),
+            mimetype=mimetype
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # Let reverse proxies pass chunks through instead of buffering the whole export
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@admin_bp.route('/cache/stats', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def get_cache_stats():
+    """Get response cache hit/miss counters for this worker"""
+    try:
+        return success_response(
+            data=response_cache.stats(),
+            message='Cache statistics retrieved successfully'
+        )
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@admin_bp.route('/sql/stats', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def get_sql_stats():
+    """Get per-endpoint SQL query counts and DB time for this worker"""
+    try:
+        stats = query_stats.stats()
+        if request.args.get('reset', 'false').lower() == 'true':
+            query_stats.reset()
+        
+        return success_response(
+            data=stats,
+            message='SQL statistics retrieved successfully'
+        )
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@admin_bp.route('/profiling/token', methods=['POST'])
+@jwt_required()
+@role_required('admin')
+def create_profiling_token():
+    """Issue a short-lived token that makes requests carrying it get profiled"""
+    try:
+        data = request.get_json(silent=True) or {}
+        ttl = data.get('ttl', 300)
+        
+        if not isinstance(ttl, int) or not 1 <= ttl <= MAX_PROFILE_TOKEN_TTL:
+            return error_response(f'ttl must be 1-{MAX_PROFILE_TOKEN_TTL} seconds', 400)
+        
+        token, expires_at = create_profile_token(ttl)
+        
+        return success_response(
+            data={
+                'header': TOKEN_HEADER,
+                'token': token,
+                'expires_at': expires_at.isoformat()
+            },
+            message='Profiling token created successfully'
+        )
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@admin_bp.route('/profiling/profiles', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def get_profiles():
+    """List saved request profiles, newest first"""
+    try:
+        return success_response(
+            data=list_profiles(current_app.config['PROFILE_DIR']),
+            message='Profiles retrieved successfully'
+        )
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@admin_bp.route('/profiling/profiles/<filename>', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def download_profile(filename):
+    """Download a .prof (pstats) or .collapsed (flame graph) file"""
+    if not filename.endswith(PROFILE_EXTENSIONS):
+        return error_response('Profile not found', 404)
+    # send_from_directory refuses paths outside PROFILE_DIR
+    return send_from_directory(current_app.config['PROFILE_DIR'], filename, as_attachment=True)
+
+
 @admin_bp.route('/users', methods=['GET'])
 @jwt_required()
 @role_required('admin')
 def get_all_users():
     """Get all users"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         user_type = request.args.get('user_type')
         
         query = User.query
@@ -519,15 +674,19 @@ def get_all_users():
         if user_type:
             query = query.filter_by(user_type=user_type)
         
-        users = query.paginate(page=page, per_page=per_page, error_out=False)
+        users, error = paginate_query(query, User)
+        if error:
+            return error_response(error, 400)
         
         items = [user.to_dict() for user in users.items]
         
         return paginated_response(
             items=items,
             total=users.total,
-            page=page,
-            per_page=per_page,
+            page=users.page,
+            per_page=users.per_page,
+            has_more=users.has_more,
+            next_cursor=users.next_cursor,
             message='Users retrieved successfully'
         )
     except Exception as e:
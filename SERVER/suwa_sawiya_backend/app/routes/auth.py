@@ -1,9 +1,12 @@
 """Authentication routes"""
 from flask import Blueprint, request
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app.models import db
 from app.models.user import User, Donor, Partner, Admin
 from app.utils.response import success_response, error_response
+from app.utils.auth import create_user_token, current_user
+from app.utils.passwords import needs_rehash, PasswordHasherBusy
+from app.utils.query_stats import query_budget
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -34,7 +37,7 @@ def register_donor():
         db.session.add(donor)
         db.session.commit()
         
-        access_token = create_access_token(identity=str(donor.id))
+        access_token = create_user_token(donor)
         
         return success_response(
             data={
@@ -44,6 +47,9 @@ def register_donor():
             message='Donor registered successfully',
             status_code=201
         )
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return error_response(str(e), 503)
     except Exception as e:
         db.session.rollback()
         return error_response(str(e), 500)
@@ -83,7 +89,7 @@ def register_partner():
         db.session.add(partner)
         db.session.commit()
         
-        access_token = create_access_token(identity=str(partner.id))
+        access_token = create_user_token(partner)
         
         return success_response(
             data={
@@ -93,12 +99,16 @@ def register_partner():
             message='Partner registered successfully',
             status_code=201
         )
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return error_response(str(e), 503)
     except Exception as e:
         db.session.rollback()
         return error_response(str(e), 500)
 
 
 @auth_bp.route('/login', methods=['POST'])
+@query_budget(4)
 def login():
     """Login user"""
     try:
@@ -115,7 +125,12 @@ def login():
         if not user.is_active:
             return error_response('User account is inactive', 401)
         
-        access_token = create_access_token(identity=str(user.id))
+        # Upgrade hashes made with older KDF settings while we know the password
+        if needs_rehash(user.password_hash):
+            user.set_password(data['password'])
+            db.session.commit()
+        
+        access_token = create_user_token(user)
         
         return success_response(
             data={
@@ -124,17 +139,20 @@ def login():
             },
             message='Login successful'
         )
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return error_response(str(e), 503)
     except Exception as e:
         return error_response(str(e), 500)
 
 
 @auth_bp.route('/profile', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_profile():
     """Get current user profile"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         
         if not user:
             return error_response('User not found', 404)
@@ -149,8 +167,7 @@ def get_profile():
 def update_profile():
     """Update user profile"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         
         if not user:
             return error_response('User not found', 404)
@@ -178,8 +195,7 @@ def update_profile():
 def change_password():
     """Change user password"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         
         if not user:
             return error_response('User not found', 404)
@@ -196,6 +212,9 @@ def change_password():
         db.session.commit()
         
         return success_response(message='Password changed successfully')
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return error_response(str(e), 503)
     except Exception as e:
         db.session.rollback()
         return error_response(str(e), 500)
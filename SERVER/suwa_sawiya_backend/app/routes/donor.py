@@ -1,39 +1,45 @@
 """Donor routes - FR-D-01 to FR-D-07"""
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import or_, and_
-from datetime import datetime
+from sqlalchemy import and_
 from app.models import db
-from app.models.user import User, Donor
-from app.models.campaign import Campaign, Donation
-from app.models.other import Transaction
+from app.models.campaign import Campaign, Donation, campaign_priority_order
 from app.utils.response import success_response, error_response, paginated_response
-from app.utils.auth import role_required
-from app.utils.payment import create_payment_intent, verify_payment_intent
+from app.utils.pagination import paginate_query
+from app.utils.auth import role_required, current_user
+from app.utils.payment import create_payment_intent
+from app.utils.search import search_campaigns_query, search_result_to_dict
+from app.utils.cache import response_cache, campaign_tag, CAMPAIGN_LISTS_TAG
+from app.utils.donations import donation_summary, completed_donations_query
+from app.utils.idempotency import idempotent
+from app.utils.query_stats import query_budget
 
 donor_bp = Blueprint('donor', __name__, url_prefix='/api/donor')
 
+MAX_PRIORITY_LIMIT = 100
+
 
 # FR-D-01: Browse medical fundraising campaigns
 @donor_bp.route('/campaigns', methods=['GET'])
+@query_budget(2)
+@response_cache.cached(tags=lambda: [CAMPAIGN_LISTS_TAG])
 def get_campaigns():
     """Browse all campaigns"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
         # Get approved campaigns
-        campaigns = Campaign.query.filter_by(status='approved').paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        campaigns, error = paginate_query(Campaign.query.filter_by(status='approved'), Campaign)
+        if error:
+            return error_response(error, 400)
         
         items = [campaign.to_dict() for campaign in campaigns.items]
         
         return paginated_response(
             items=items,
             total=campaigns.total,
-            page=page,
-            per_page=per_page,
+            page=campaigns.page,
+            per_page=campaigns.per_page,
+            has_more=campaigns.has_more,
+            next_cursor=campaigns.next_cursor,
             message='Campaigns retrieved successfully'
         )
     except Exception as e:
@@ -42,6 +48,8 @@ def get_campaigns():
 
 # FR-D-02: Search and filter campaigns by urgency and category
 @donor_bp.route('/campaigns/search', methods=['GET'])
+@query_budget(2)
+@response_cache.cached(tags=lambda: [CAMPAIGN_LISTS_TAG])
 def search_campaigns():
     """Search and filter campaigns"""
     try:
@@ -61,23 +69,20 @@ def search_campaigns():
         if category:
             query = query.filter_by(category=category)
         
-        # Search by title or beneficiary name
-        if search_query:
-            query = query.filter(
-                or_(
-                    Campaign.title.ilike(f'%{search_query}%'),
-                    Campaign.beneficiary_name.ilike(f'%{search_query}%'),
-                    Campaign.beneficiary_medical_condition.ilike(f'%{search_query}%')
-                )
-            )
-        
-        campaigns = query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        items = [campaign.to_dict() for campaign in campaigns.items]
+        # Full-text search over title, description, beneficiary name and condition
+        if search_query and search_query.strip():
+            query, ranked_query = search_campaigns_query(query, search_query)
+            total = query.order_by(None).count()
+            rows = ranked_query.limit(per_page).offset((page - 1) * per_page).all()
+            items = [search_result_to_dict(row) for row in rows]
+        else:
+            campaigns = query.paginate(page=page, per_page=per_page, error_out=False)
+            total = campaigns.total
+            items = [campaign.to_dict() for campaign in campaigns.items]
         
         return paginated_response(
             items=items,
-            total=campaigns.total,
+            total=total,
             page=page,
             per_page=per_page,
             message='Search results retrieved successfully'
@@ -88,24 +93,24 @@ def search_campaigns():
 
 # FR-D-03: Display prioritized campaigns by urgency
 @donor_bp.route('/campaigns/priority', methods=['GET'])
+@query_budget(1)
+@response_cache.cached(tags=lambda: [CAMPAIGN_LISTS_TAG], ttl='PRIORITY_CAMPAIGNS_CACHE_TTL')
 def get_priority_campaigns():
     """Get campaigns prioritized by urgency"""
     try:
-        # Order by urgency (critical > high > medium > low) and funds needed
-        urgency_order = {'critical': 1, 'high': 2, 'medium': 3, 'low': 4}
+        limit = request.args.get('limit', 20, type=int)
+        offset = request.args.get('offset', 0, type=int)
         
-        campaigns = Campaign.query.filter_by(status='approved').all()
+        if limit < 1 or limit > MAX_PRIORITY_LIMIT or offset < 0:
+            return error_response(f'limit must be 1-{MAX_PRIORITY_LIMIT} and offset non-negative', 400)
         
-        # Sort by urgency then by remaining amount
-        sorted_campaigns = sorted(
-            campaigns,
-            key=lambda x: (urgency_order.get(x.urgency, 5), -(x.target_amount - x.funds_raised))
-        )
-        
-        # Limit to top 20 priority campaigns
-        priority_campaigns = sorted_campaigns[:20]
+        # Order by urgency (critical > high > medium > low) and funds needed,
+        # served by the ix_campaigns_priority index
+        campaigns = Campaign.query.filter_by(status='approved').order_by(
+            *campaign_priority_order()
+        ).limit(limit).offset(offset).all()
         
-        items = [campaign.to_dict() for campaign in priority_campaigns]
+        items = [campaign.to_dict() for campaign in campaigns]
         
         return success_response(
             data=items,
@@ -117,6 +122,8 @@ def get_priority_campaigns():
 
 # FR-D-04: Display campaign details
 @donor_bp.route('/campaigns/<campaign_id>', methods=['GET'])
+@query_budget(3)
+@response_cache.cached(tags=lambda campaign_id: [campaign_tag(campaign_id)])
 def get_campaign_details(campaign_id):
     """Get detailed campaign information"""
     try:
@@ -125,22 +132,60 @@ def get_campaign_details(campaign_id):
         if not campaign:
             return error_response('Campaign not found', 404)
         
+        data = campaign.to_dict()
+        data['donation_summary'] = donation_summary(campaign.id)
+        
         return success_response(
-            data=campaign.to_dict(include_donations=True),
+            data=data,
             message='Campaign details retrieved successfully'
         )
     except Exception as e:
         return error_response(str(e), 500)
 
 
+@donor_bp.route('/campaigns/<campaign_id>/donations', methods=['GET'])
+@query_budget(2)
+@response_cache.cached(tags=lambda campaign_id: [campaign_tag(campaign_id)])
+def get_campaign_donations(campaign_id):
+    """Stream a campaign's completed donations, newest first, by cursor"""
+    try:
+        campaign = Campaign.query.get(campaign_id)
+        
+        if not campaign:
+            return error_response('Campaign not found', 404)
+        
+        donations, error = paginate_query(
+            completed_donations_query(campaign.id),
+            Donation,
+            keyset=True,
+            include_total=False
+        )
+        if error:
+            return error_response(error, 400)
+        
+        items = [donation.to_dict() for donation in donations.items]
+        
+        return paginated_response(
+            items=items,
+            total=donations.total,
+            page=donations.page,
+            per_page=donations.per_page,
+            has_more=donations.has_more,
+            next_cursor=donations.next_cursor,
+            message='Campaign donations retrieved successfully'
+        )
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
 # FR-D-05 & FR-D-06: Make secure donations and anonymous donations
 @donor_bp.route('/donate', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_donation():
     """Create a donation"""
     try:
-        user_id = get_jwt_identity()
-        donor = User.query.get(user_id)
+        donor = current_user()
         
         if not donor or donor.user_type != 'donor':
             return error_response('Unauthorized', 401)
@@ -167,13 +212,13 @@ def create_donation():
         if payment_error:
             return error_response(f'Payment error: {payment_error}', 400)
         
-        # Create donation record
-        is_anonymous = data.get('is_anonymous', False)
+        # Create donation record (anonymous ones keep their donor so only they
+        # can confirm them; is_anonymous hides the donor everywhere else)
         donation = Donation(
             campaign_id=campaign.id,
-            donor_id=None if is_anonymous else donor.id,
+            donor_id=donor.id,
             amount=amount,
-            is_anonymous=is_anonymous,
+            is_anonymous=data.get('is_anonymous', False),
             donor_message=data.get('message'),
             transaction_id=payment_intent['id'],
             status='pending'
@@ -200,52 +245,30 @@ def create_donation():
 @donor_bp.route('/donations/<donation_id>/confirm', methods=['POST'])
 @jwt_required()
 def confirm_donation(donation_id):
-    """Confirm donation payment"""
+    """Get the confirmation status of a donation payment"""
     try:
-        user_id = get_jwt_identity()
-        donor = User.query.get(user_id)
+        donor = current_user()
         
         if not donor:
             return error_response('User not found', 401)
         
         donation = Donation.query.get(donation_id)
-        if not donation:
+        if not donation or donation.donor_id != donor.id:
             return error_response('Donation not found', 404)
         
-        # Verify payment with Stripe
-        payment_intent, error = verify_payment_intent(donation.transaction_id)
+        # Payments are settled asynchronously from gateway webhooks
+        # (see app/utils/payment_events.py), so this is only a status read
+        if donation.status == 'pending':
+            return success_response(
+                data={'donation': donation.to_dict()},
+                message='Payment is being processed',
+                status_code=202
+            )
         
-        if error:
-            return error_response(f'Payment verification failed: {error}', 400)
-        
-        if payment_intent['status'] != 'succeeded':
-            return error_response(f'Payment status: {payment_intent["status"]}', 400)
-        
-        # Update donation status
-        donation.status = 'completed'
-        donation.completed_at = datetime.utcnow()
-        
-        # Create transaction record
-        transaction = Transaction(
-            donation_id=donation.id,
-            payment_method='stripe',
-            transaction_reference=payment_intent['id'],
-            amount=donation.amount,
-            currency=payment_intent['currency'].upper(),
-            status='success',
-            processed_at=datetime.utcnow()
-        )
+        if donation.status != 'completed':
+            return error_response(f'Donation is {donation.status}', 400)
         
-        # Update campaign funds
         campaign = donation.campaign
-        campaign.funds_raised += donation.amount
-        
-        # Update donor total
-        if not donation.is_anonymous and isinstance(donor, Donor):
-            donor.total_donated += donation.amount
-        
-        db.session.add(transaction)
-        db.session.commit()
         
         # FR-D-07: Provide donation confirmation
         return success_response(
@@ -265,28 +288,33 @@ def confirm_donation(donation_id):
 
 
 @donor_bp.route('/donations', methods=['GET'])
+@query_budget(3)
 @jwt_required()
 def get_donor_donations():
     """Get donor's donation history"""
     try:
         user_id = get_jwt_identity()
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         
-        donations = Donation.query.filter(
+        query = Donation.query.filter(
             and_(
                 Donation.donor_id == user_id,
                 Donation.is_anonymous == False
             )
-        ).paginate(page=page, per_page=per_page, error_out=False)
+        )
+        
+        donations, error = paginate_query(query, Donation)
+        if error:
+            return error_response(error, 400)
         
         items = [donation.to_dict() for donation in donations.items]
         
         return paginated_response(
             items=items,
             total=donations.total,
-            page=page,
-            per_page=per_page,
+            page=donations.page,
+            per_page=donations.per_page,
+            has_more=donations.has_more,
+            next_cursor=donations.next_cursor,
             message='Donations retrieved successfully'
         )
     except Exception as e:
@@ -294,6 +322,8 @@ def get_donor_donations():
 
 
 @donor_bp.route('/campaigns/<campaign_id>/updates', methods=['GET'])
+@query_budget(2)
+@response_cache.cached(tags=lambda campaign_id: [campaign_tag(campaign_id)])
 def get_campaign_updates(campaign_id):
     """FR-D-07: Get campaign progress updates"""
     try:
@@ -0,0 +1,97 @@
+"""Uploaded file download routes"""
+import os
+from flask import Blueprint
+from flask_jwt_extended import jwt_required, verify_jwt_in_request, get_jwt, get_jwt_identity
+from app.models.campaign import Campaign
+from app.models.other import Document
+from app.utils.response import error_response
+from app.utils.auth import current_user
+from app.utils.file_serving import resolve_stored_path, send_stored_file
+from app.utils.images import VARIANTS, variant_path
+from app.utils.query_stats import query_budget
+from config import Config
+
+files_bp = Blueprint('files', __name__, url_prefix='/api/files')
+
+# Campaigns whose cover image anyone may download
+PUBLIC_CAMPAIGN_STATUSES = {'approved', 'completed'}
+
+
+def _can_access_campaign_files(campaign):
+    """Whether the requester is an admin or the partner running the campaign"""
+    if get_jwt_identity() is None:
+        return False
+    role = get_jwt().get('role')
+    if role is None:
+        # Tokens issued before role claims
+        user = current_user()
+        role = user.user_type if user and user.is_active else None
+    if role == 'admin':
+        return True
+    return role == 'partner' and str(campaign.partner_id) == get_jwt_identity()
+
+
+@files_bp.route('/campaigns/<campaign_id>/cover', methods=['GET'])
+@files_bp.route('/campaigns/<campaign_id>/cover/<variant>', methods=['GET'])
+@query_budget(2)
+def get_campaign_cover(campaign_id, variant=None):
+    """Download a campaign's cover image, or one of its resized variants"""
+    try:
+        campaign = Campaign.query.get(campaign_id)
+        
+        if not campaign or not campaign.cover_image:
+            return error_response('Cover image not found', 404)
+        
+        if variant is not None and (variant not in VARIANTS or variant not in (campaign.cover_variants or {})):
+            return error_response('Cover image variant not found', 404)
+        
+        public = campaign.status in PUBLIC_CAMPAIGN_STATUSES
+        if not public:
+            verify_jwt_in_request(optional=True)
+            if not _can_access_campaign_files(campaign):
+                return error_response('Cover image not found', 404)
+        
+        if variant is None:
+            path = resolve_stored_path(campaign.cover_image, Config.UPLOAD_FOLDER)
+            if not path:
+                return error_response('Cover image not found', 404)
+            return send_stored_file(path, Config.UPLOAD_FOLDER, public=public)
+        
+        path = resolve_stored_path(variant_path(campaign.cover_image, variant), Config.UPLOAD_FOLDER)
+        if not path:
+            return error_response('Cover image variant not found', 404)
+        return send_stored_file(
+            path,
+            Config.UPLOAD_FOLDER,
+            content_hash=campaign.cover_variants[variant]['content_hash'],
+            mime_type='image/jpeg',
+            public=public
+        )
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@files_bp.route('/documents/<document_id>', methods=['GET'])
+@jwt_required()
+@query_budget(3)
+def download_document(document_id):
+    """Download a medical or verification document (owning partner or admin)"""
+    try:
+        document = Document.query.get(document_id)
+        
+        if not document or not document.campaign or not _can_access_campaign_files(document.campaign):
+            return error_response('Document not found', 404)
+        
+        path = resolve_stored_path(document.file_path, Config.UPLOAD_FOLDER)
+        if not path:
+            return error_response('Document not found', 404)
+        
+        return send_stored_file(
+            path,
+            Config.UPLOAD_FOLDER,
+            content_hash=document.content_hash,
+            mime_type=document.mime_type,
+            download_name=os.path.basename(document.file_name or '') or 'document'
+        )
+    except Exception as e:
+        return error_response(str(e), 500)
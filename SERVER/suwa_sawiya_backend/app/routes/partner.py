@@ -1,14 +1,17 @@
 """Partner and Beneficiary routes - FR-P-01 to FR-P-05"""
-from flask import Blueprint, request
+from flask import Blueprint, current_app, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from app.models import db
-from app.models.user import User, Partner
-from app.models.campaign import Campaign, Donation
+from app.models.campaign import Campaign
 from app.models.other import Document, Disbursement
 from app.utils.response import success_response, error_response, paginated_response
-from app.utils.auth import role_required
+from app.utils.pagination import paginate_query
+from app.utils.auth import role_required, current_user
+from app.utils.donations import donation_stats, EMPTY_DONATION_STATS
 from app.utils.file_handler import save_uploaded_file, allowed_file, delete_file
+from app.utils.images import schedule_cover_variants
+from app.utils.query_stats import query_budget
 from config import Config
 
 partner_bp = Blueprint('partner', __name__, url_prefix='/api/partner')
@@ -21,26 +24,33 @@ partner_bp = Blueprint('partner', __name__, url_prefix='/api/partner')
 def create_campaign():
     """Create a new fundraising campaign"""
     try:
-        partner_id = get_jwt_identity()
-        partner = Partner.query.get(partner_id)
+        partner = current_user()
         
         if not partner:
             return error_response('Partner not found', 404)
         
-        data = request.get_json()
+        # JSON, or multipart form fields when files are attached
+        data = request.get_json(silent=True) or request.form
         
         required_fields = ['title', 'category', 'urgency', 'target_amount', 'beneficiary_name', 'beneficiary_medical_condition']
         if not all(data.get(field) for field in required_fields):
             return error_response('Missing required fields', 400)
         
+        # Form fields arrive as strings, and blank ones as ''
+        try:
+            target_amount = float(data['target_amount'])
+            beneficiary_age = int(data['beneficiary_age']) if data.get('beneficiary_age') not in (None, '') else None
+        except (TypeError, ValueError):
+            return error_response('target_amount and beneficiary_age must be numbers', 400)
+        
         # Handle file uploads
-        cover_image_path = None
-        medical_document_path = None
+        cover_image = None
+        medical_document = None
         
         if 'cover_image' in request.files:
             file = request.files['cover_image']
             if file and allowed_file(file.filename, {'png', 'jpg', 'jpeg', 'gif'}):
-                cover_image_path, error = save_uploaded_file(
+                cover_image, error = save_uploaded_file(
                     file, 
                     Config.UPLOAD_FOLDER, 
                     {'png', 'jpg', 'jpeg', 'gif'}
@@ -51,7 +61,7 @@ def create_campaign():
         if 'medical_document' in request.files:
             file = request.files['medical_document']
             if file and allowed_file(file.filename, {'pdf', 'doc', 'docx'}):
-                medical_document_path, error = save_uploaded_file(
+                medical_document, error = save_uploaded_file(
                     file, 
                     Config.UPLOAD_FOLDER, 
                     {'pdf', 'doc', 'docx'}
@@ -65,13 +75,13 @@ def create_campaign():
             description=data.get('description'),
             category=data['category'],
             urgency=data['urgency'],
-            target_amount=float(data['target_amount']),
+            target_amount=target_amount,
             beneficiary_name=data['beneficiary_name'],
-            beneficiary_age=data.get('beneficiary_age'),
+            beneficiary_age=beneficiary_age,
             beneficiary_medical_condition=data['beneficiary_medical_condition'],
             partner_id=partner.id,
-            cover_image=cover_image_path,
-            medical_document=medical_document_path,
+            cover_image=cover_image.path if cover_image else None,
+            medical_document=medical_document.path if medical_document else None,
             status='pending'  # Requires admin approval
         )
         
@@ -79,17 +89,27 @@ def create_campaign():
         db.session.flush()
         
         # If medical document uploaded, create document record
-        if medical_document_path:
+        if medical_document:
             doc = Document(
                 campaign_id=campaign.id,
                 document_type='medical_certificate',
-                file_path=medical_document_path,
-                file_name=request.files.get('medical_document').filename if 'medical_document' in request.files else 'document'
+                file_path=medical_document.path,
+                file_name=request.files.get('medical_document').filename if 'medical_document' in request.files else 'document',
+                file_size=medical_document.size,
+                content_hash=medical_document.content_hash,
+                mime_type=medical_document.mime_type
             )
             db.session.add(doc)
         
         db.session.commit()
         
+        # Card and thumbnail sizes are rendered in the background. The
+        # campaign exists either way; generate_cover_variants.py catches up.
+        try:
+            schedule_cover_variants(campaign)
+        except Exception as e:
+            current_app.logger.warning(f'Could not schedule cover variants of campaign {campaign.id}: {e}')
+        
         return success_response(
             data=campaign.to_dict(),
             message='Campaign created successfully. Pending admin approval.',
@@ -107,8 +127,7 @@ def create_campaign():
 def register_beneficiary():
     """Register a patient/beneficiary on behalf of partner"""
     try:
-        partner_id = get_jwt_identity()
-        partner = Partner.query.get(partner_id)
+        partner = current_user()
         
         if not partner:
             return error_response('Partner not found', 404)
@@ -154,8 +173,7 @@ def register_beneficiary():
 def upload_document(campaign_id):
     """Upload medical or verification documents for a campaign"""
     try:
-        partner_id = get_jwt_identity()
-        partner = Partner.query.get(partner_id)
+        partner = current_user()
         
         campaign = Campaign.query.get(campaign_id)
         if not campaign or campaign.partner_id != partner.id:
@@ -167,7 +185,7 @@ def upload_document(campaign_id):
         file = request.files['document']
         document_type = request.form.get('document_type', 'medical_certificate')
         
-        file_path, error = save_uploaded_file(
+        saved, error = save_uploaded_file(
             file, 
             Config.UPLOAD_FOLDER, 
             Config.ALLOWED_EXTENSIONS
@@ -180,9 +198,11 @@ def upload_document(campaign_id):
         document = Document(
             campaign_id=campaign.id,
             document_type=document_type,
-            file_path=file_path,
+            file_path=saved.path,
             file_name=file.filename,
-            file_size=len(file.read())
+            file_size=saved.size,
+            content_hash=saved.content_hash,
+            mime_type=saved.mime_type
         )
         
         db.session.add(document)
@@ -198,8 +218,27 @@ def upload_document(campaign_id):
         return error_response(str(e), 500)
 
 
+def campaign_progress(campaign, stats):
+    """Progress figures of a campaign given its donation stats"""
+    return {
+        'campaign_id': str(campaign.id),
+        'title': campaign.title,
+        'status': campaign.status,
+        'funds_raised': campaign.funds_raised,
+        'target_amount': campaign.target_amount,
+        'remaining_amount': campaign.target_amount - campaign.funds_raised,
+        'progress_percentage': campaign.get_progress_percentage(),
+        'total_donors': stats['donor_count'],
+        'donation_count': stats['donation_count'],
+        'anonymous_donations': stats['anonymous_donations'],
+        'created_at': campaign.created_at.isoformat(),
+        'deadline': campaign.deadline.isoformat() if campaign.deadline else None
+    }
+
+
 # FR-P-04: View campaign progress
 @partner_bp.route('/campaigns/<campaign_id>/progress', methods=['GET'])
+@query_budget(3)
 @jwt_required()
 @role_required('partner')
 def get_campaign_progress(campaign_id):
@@ -208,33 +247,38 @@ def get_campaign_progress(campaign_id):
         partner_id = get_jwt_identity()
         campaign = Campaign.query.get(campaign_id)
         
-        if not campaign or campaign.partner_id != partner_id:
+        if not campaign or str(campaign.partner_id) != partner_id:
             return error_response('Campaign not found or unauthorized', 404)
         
-        # Get donation statistics
-        completed_donations = Donation.query.filter_by(
-            campaign_id=campaign_id,
-            status='completed'
-        ).all()
+        stats = donation_stats([campaign.id]).get(campaign.id, EMPTY_DONATION_STATS)
+        
+        return success_response(
+            data=campaign_progress(campaign, stats),
+            message='Campaign progress retrieved successfully'
+        )
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@partner_bp.route('/campaigns/progress', methods=['GET'])
+@query_budget(3)
+@jwt_required()
+@role_required('partner')
+def get_all_campaigns_progress():
+    """Get progress of all the partner's campaigns in one call"""
+    try:
+        partner_id = get_jwt_identity()
         
-        total_donors = len(set(d.donor_id for d in completed_donations if d.donor_id))
-        anonymous_donations_count = sum(1 for d in completed_donations if d.is_anonymous)
+        campaigns = Campaign.query.filter_by(partner_id=partner_id).order_by(
+            Campaign.created_at.desc(), Campaign.id.desc()
+        ).all()
+        stats = donation_stats([campaign.id for campaign in campaigns])
         
         return success_response(
-            data={
-                'campaign_id': str(campaign.id),
-                'title': campaign.title,
-                'status': campaign.status,
-                'funds_raised': campaign.funds_raised,
-                'target_amount': campaign.target_amount,
-                'remaining_amount': campaign.target_amount - campaign.funds_raised,
-                'progress_percentage': campaign.get_progress_percentage(),
-                'total_donors': total_donors,
-                'donation_count': len(completed_donations),
-                'anonymous_donations': anonymous_donations_count,
-                'created_at': campaign.created_at.isoformat(),
-                'deadline': campaign.deadline.isoformat() if campaign.deadline else None
-            },
+            data=[
+                campaign_progress(campaign, stats.get(campaign.id, EMPTY_DONATION_STATS))
+                for campaign in campaigns
+            ],
             message='Campaign progress retrieved successfully'
         )
     except Exception as e:
@@ -249,10 +293,10 @@ def request_disbursement(campaign_id):
     """Request fund disbursement to bank account"""
     try:
         partner_id = get_jwt_identity()
-        partner = Partner.query.get(partner_id)
+        partner = current_user()
         
         campaign = Campaign.query.get(campaign_id)
-        if not campaign or campaign.partner_id != partner_id:
+        if not campaign or str(campaign.partner_id) != partner_id:
             return error_response('Campaign not found or unauthorized', 404)
         
         data = request.get_json()
@@ -288,26 +332,27 @@ def request_disbursement(campaign_id):
 
 
 @partner_bp.route('/campaigns', methods=['GET'])
+@query_budget(3)
 @jwt_required()
 @role_required('partner')
 def get_partner_campaigns():
     """Get all campaigns for the partner"""
     try:
         partner_id = get_jwt_identity()
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         
-        campaigns = Campaign.query.filter_by(partner_id=partner_id).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        campaigns, error = paginate_query(Campaign.query.filter_by(partner_id=partner_id), Campaign)
+        if error:
+            return error_response(error, 400)
         
         items = [campaign.to_dict() for campaign in campaigns.items]
         
         return paginated_response(
             items=items,
             total=campaigns.total,
-            page=page,
-            per_page=per_page,
+            page=campaigns.page,
+            per_page=campaigns.per_page,
+            has_more=campaigns.has_more,
+            next_cursor=campaigns.next_cursor,
             message='Partner campaigns retrieved successfully'
         )
     except Exception as e:
@@ -315,13 +360,13 @@ def get_partner_campaigns():
 
 
 @partner_bp.route('/profile', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 @role_required('partner')
 def get_partner_profile():
     """Get partner profile"""
     try:
-        partner_id = get_jwt_identity()
-        partner = Partner.query.get(partner_id)
+        partner = current_user()
         
         if not partner:
             return error_response('Partner not found', 404)
@@ -350,8 +395,7 @@ def get_partner_profile():
 def update_partner_profile():
     """Update partner profile"""
     try:
-        partner_id = get_jwt_identity()
-        partner = Partner.query.get(partner_id)
+        partner = current_user()
         
         if not partner:
             return error_response('Partner not found', 404)
@@ -0,0 +1,34 @@
+"""Payment gateway webhook routes"""
+import json
+from flask import Blueprint, request
+from app.models import db
+from app.utils.response import success_response, error_response
+from app.utils.payment import construct_webhook_event
+from app.utils.payment_events import enqueue_payment_event, HANDLED_EVENTS
+
+payments_bp = Blueprint('payments', __name__, url_prefix='/api/payments')
+
+
+@payments_bp.route('/webhook', methods=['POST'])
+def payment_webhook():
+    """Receive signed payment intent events from the gateway"""
+    try:
+        payload = request.get_data()
+        event, error = construct_webhook_event(payload, request.headers.get('Stripe-Signature', ''))
+        
+        if error:
+            return error_response(error, 400)
+        
+        # Acknowledge everything quickly; only outcomes we act on are queued
+        if event['type'] not in HANDLED_EVENTS:
+            return success_response(message='Event ignored')
+        
+        queued = enqueue_payment_event(json.loads(payload))
+        
+        return success_response(
+            data={'event_id': event['id'], 'queued': queued},
+            message='Event queued' if queued else 'Duplicate event'
+        )
+    except Exception as e:
+        db.session.rollback()
+        return error_response(str(e), 500)
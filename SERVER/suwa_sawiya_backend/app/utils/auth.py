@@ -1,8 +1,100 @@
-"""Authentication utilities"""
+"""Authentication utilities
+
+Access tokens carry the user's role and active flag as claims, so the
+decorators below authorize requests without loading the user. Accounts
+deactivated after a token was issued are caught by a small in-process
+revocation cache of inactive user ids, refreshed from the database every
+AUTH_REVOCATION_REFRESH seconds instead of on every request.
+"""
+import threading
+import time
+import uuid
 from functools import wraps
-from flask import request, jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask import current_app, g, jsonify
+from flask_jwt_extended import create_access_token, verify_jwt_in_request, get_jwt, get_jwt_identity
+from sqlalchemy import select
+from sqlalchemy.orm import with_polymorphic
+from app.models import db
 from app.models.user import User
+from app.utils.query_stats import unattributed
+
+
+def user_claims(user):
+    """Claims embedded in a user's access tokens"""
+    return {'role': user.user_type, 'active': bool(user.is_active)}
+
+
+def create_user_token(user):
+    """Issue an access token for a user"""
+    return create_access_token(identity=str(user.id), additional_claims=user_claims(user))
+
+
+class RevocationCache:
+    """Ids of deactivated users whose outstanding tokens must be refused"""
+
+    def __init__(self):
+        self._revoked = set()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        interval = current_app.config.get('AUTH_REVOCATION_REFRESH', 30)
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < interval:
+                return
+            # Pick up deactivations made by other workers. Whichever request
+            # happens to trigger the refresh is not charged for it.
+            with unattributed():
+                rows = db.session.query(User.id).filter(User.is_active.is_(False)).all()
+            self._revoked = {str(row.id) for row in rows}
+            self._loaded_at = time.monotonic()
+
+    def is_revoked(self, user_id):
+        self._refresh()
+        return str(user_id) in self._revoked
+
+    def revoke(self, user_id):
+        """Refuse the user's tokens in this worker right away"""
+        with self._lock:
+            self._revoked.add(str(user_id))
+
+    def restore(self, user_id):
+        with self._lock:
+            self._revoked.discard(str(user_id))
+
+
+revocations = RevocationCache()
+
+
+def init_auth(jwt):
+    """Register token checks with the JWTManager"""
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_payload):
+        if jwt_payload.get('active') is False:
+            return True
+        return revocations.is_revoked(jwt_payload['sub'])
+
+
+def current_user():
+    """The authenticated user, loaded at most once per request"""
+    if 'current_user' not in g:
+        # Load the Donor/Partner/Admin columns in the same query
+        user = with_polymorphic(User, '*')
+        g.current_user = db.session.execute(
+            select(user).where(user.id == uuid.UUID(get_jwt_identity()))
+        ).scalar_one_or_none()
+    return g.current_user
+
+
+def _token_role():
+    """Role of the current token; older tokens without claims fall back to the user row"""
+    claims = get_jwt()
+    if 'role' in claims:
+        return claims['role']
+    user = current_user()
+    if not user or not user.is_active:
+        return None
+    return user.user_type
 
 
 def token_required(f):
@@ -11,9 +103,7 @@ def token_required(f):
     def decorated(*args, **kwargs):
         try:
             verify_jwt_in_request()
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
-            if not user or not user.is_active:
+            if not _token_role():
                 return jsonify({'message': 'User not found or inactive'}), 401
         except Exception as e:
             return jsonify({'message': str(e)}), 401
@@ -28,9 +118,7 @@ def role_required(*allowed_roles):
         def decorated(*args, **kwargs):
             try:
                 verify_jwt_in_request()
-                user_id = get_jwt_identity()
-                user = User.query.get(user_id)
-                if not user or user.user_type not in allowed_roles:
+                if _token_role() not in allowed_roles:
                     return jsonify({'message': 'Insufficient permissions'}), 403
             except Exception as e:
                 return jsonify({'message': str(e)}), 401
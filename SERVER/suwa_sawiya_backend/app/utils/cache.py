@@ -0,0 +1,291 @@
+"""Response caching with pluggable backends and tag-based invalidation
+
+Cached responses are stored under keys that embed the current version of
+each tag they depend on (e.g. ``campaigns`` for list pages and
+``campaign:<id>`` for a single campaign). Invalidating a tag bumps its
+version, so every entry built from the old data becomes unreachable at
+once and ages out of the backend on its own.
+
+Reading a tag never stores anything: a tag that was never invalidated has
+DEFAULT_VERSION, so request URLs cannot grow the version store. Bumped
+versions are kept for TAG_VERSION_TTL, longer than any entry may live, so
+by the time a tag falls back to DEFAULT_VERSION every entry cached under
+that default before the bump has expired.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, request
+
+# Tag covering every cached list of campaigns (browse, search, priority)
+CAMPAIGN_LISTS_TAG = 'campaigns'
+
+# Version of tags that were never invalidated (or not for TAG_VERSION_TTL)
+DEFAULT_VERSION = '0'
+
+# Seconds a bumped tag version is kept; entry TTLs are capped below it
+TAG_VERSION_TTL = 86400
+
+# Why worker scripts refuse to run on a cache their web workers cannot see
+UNSHARED_CACHE_ERROR = (
+    "CACHE_BACKEND=memory is private to each process, so this worker's cache "
+    "invalidations never reach the web workers and they keep serving stale "
+    "campaign totals. Set CACHE_BACKEND=redis (or none) for the web app and "
+    "this worker."
+)
+
+
+def campaign_tag(campaign_id):
+    """Tag covering cached responses about a single campaign"""
+    try:
+        # Normalize so URL spellings and UUID objects map to the same tag
+        campaign_id = uuid.UUID(str(campaign_id))
+    except ValueError:
+        pass
+    return f'campaign:{campaign_id}'
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry TTL.
+
+    Entries are private to one worker process; use RedisCache when several
+    workers must see each other's invalidations.
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + min(ttl, TAG_VERSION_TTL))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_versions(self, tags):
+        # Versions live outside the LRU; only invalidated tags have one
+        now = time.monotonic()
+        with self._lock:
+            versions = []
+            for tag in tags:
+                version, expires_at = self._versions.get(tag, (DEFAULT_VERSION, now))
+                versions.append(version if expires_at > now else DEFAULT_VERSION)
+            return versions
+
+    def bump_version(self, tag):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._versions) >= self.max_entries:
+                # Sweep expired versions; the store grows only with invalidations
+                for expired in [t for t, (_, expires_at) in self._versions.items() if expires_at <= now]:
+                    del self._versions[expired]
+            self._versions[tag] = (uuid.uuid4().hex, now + TAG_VERSION_TTL)
+
+    def info(self):
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'evictions': self.evictions
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+class RedisCache:
+    """Shared cache on any Redis-compatible server (Redis, Valkey, KeyDB, ...)"""
+
+    name = 'redis'
+
+    def __init__(self, url, prefix='suwa:cache:'):
+        import redis  # Optional dependency, only needed for this backend
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.set(self.prefix + key, json.dumps(value), ex=min(max(int(ttl), 1), TAG_VERSION_TTL))
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def get_versions(self, tags):
+        versions = self._client.mget([f'{self.prefix}tag:{tag}' for tag in tags])
+        return [
+            DEFAULT_VERSION if version is None else version.decode() if isinstance(version, bytes) else version
+            for version in versions
+        ]
+
+    def bump_version(self, tag):
+        self._client.set(f'{self.prefix}tag:{tag}', uuid.uuid4().hex, ex=TAG_VERSION_TTL)
+
+    def info(self):
+        return {'keys': self._client.dbsize()}
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=f'{self.prefix}*'))
+        if keys:
+            self._client.delete(*keys)
+
+
+class ResponseCache:
+    """Caches JSON responses of read-only endpoints and tracks hit rates"""
+
+    def __init__(self):
+        self.backend = None
+        self.default_ttl = 60
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def init_app(self, app):
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        if backend == 'redis':
+            self.backend = RedisCache(app.config['CACHE_REDIS_URL'])
+        elif backend == 'memory':
+            self.backend = MemoryCache(app.config.get('CACHE_MAX_ENTRIES', 2048))
+        else:
+            self.backend = None  # Caching disabled
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 60)
+        app.extensions['response_cache'] = self
+
+    @property
+    def is_shared(self):
+        """Whether invalidations made here reach every process (or nothing is cached)"""
+        return not isinstance(self.backend, MemoryCache)
+
+    def _record(self, endpoint, outcome):
+        with self._stats_lock:
+            counters = self._stats.setdefault(endpoint, {'hits': 0, 'misses': 0})
+            counters[outcome] += 1
+
+    def build_key(self, tags):
+        """Key from the endpoint, its view args, the sorted query args and tag versions"""
+        view_args = sorted((request.view_args or {}).items())
+        query_args = sorted(request.args.items(multi=True))
+        versions = self.backend.get_versions(tags)
+        return json.dumps([request.endpoint, view_args, query_args, versions], separators=(',', ':'))
+
+    def invalidate(self, *tags):
+        """Make every entry depending on any of the tags unreachable"""
+        if self.backend is None:
+            return
+        for tag in tags:
+            try:
+                self.backend.bump_version(tag)
+            except Exception as e:
+                current_app.logger.warning(f'Cache invalidation failed for {tag}: {e}')
+
+    def invalidate_campaign(self, campaign_id):
+        """Evict a campaign's own entries and every cached campaign list"""
+        self.invalidate(CAMPAIGN_LISTS_TAG, campaign_tag(campaign_id))
+
+    def cached(self, tags, ttl=None):
+        """Decorator caching successful responses of a GET view.
+
+        tags is called with the view's keyword arguments and returns the tags
+        the response depends on. ttl may be a number of seconds or the name
+        of a config key holding one.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                if self.backend is None:
+                    return f(*args, **kwargs)
+
+                try:
+                    key = self.build_key(tags(**kwargs))
+                    entry = self.backend.get(key)
+                except Exception as e:
+                    # A cache outage must never take the endpoint down with it
+                    current_app.logger.warning(f'Cache read failed: {e}')
+                    return f(*args, **kwargs)
+
+                if entry is not None:
+                    self._record(request.endpoint, 'hits')
+                    response = current_app.response_class(
+                        entry['body'], status=entry['status'], mimetype='application/json'
+                    )
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self._record(request.endpoint, 'misses')
+                response = make_response(f(*args, **kwargs))
+
+                if response.status_code == 200:
+                    timeout = current_app.config[ttl] if isinstance(ttl, str) else ttl
+                    try:
+                        self.backend.set(
+                            key,
+                            {'body': response.get_data(as_text=True), 'status': response.status_code},
+                            timeout or self.default_ttl
+                        )
+                    except Exception as e:
+                        current_app.logger.warning(f'Cache write failed: {e}')
+
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return decorated
+        return decorator
+
+    def stats(self):
+        """Hit/miss counters per endpoint for this process, plus backend info"""
+        with self._stats_lock:
+            endpoints = {}
+            for endpoint, counters in self._stats.items():
+                lookups = counters['hits'] + counters['misses']
+                endpoints[endpoint] = dict(
+                    counters,
+                    hit_ratio=round(counters['hits'] / lookups, 4) if lookups else 0
+                )
+
+        hits = sum(c['hits'] for c in endpoints.values())
+        misses = sum(c['misses'] for c in endpoints.values())
+
+        return {
+            'backend': self.backend.name if self.backend else 'disabled',
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else 0,
+            'endpoints': endpoints,
+            'backend_info': self.backend.info() if self.backend else {}
+        }
+
+
+response_cache = ResponseCache()
+
+
+def init_cache(app):
+    """Initialize the response cache with Flask app"""
+    response_cache.init_app(app)
@@ -0,0 +1,104 @@
+"""Atomic counter updates for campaign and donor totals
+
+Totals are changed with single UPDATE ... SET x = x + n statements, so
+concurrent settlements never lose increments and no row is held locked
+longer than that one statement. Campaigns flagged as hot
+(Campaign.counter_shards > 0) spread their increments over sub-counter
+rows instead, which removes contention on the campaign row entirely; a
+periodic compact_fund_shards() folds the shards back into funds_raised.
+"""
+import random
+from sqlalchemy import func, update, delete, select, values, column, cast, String, Float
+from sqlalchemy.dialects.postgresql import insert, UUID
+from app.models import db
+from app.models.user import Donor
+from app.models.campaign import Campaign, CampaignFundShard
+
+
+def _increments(amounts):
+    """VALUES list of (id, amount) rows for a set-based UPDATE ... FROM"""
+    return values(
+        column('id', String),
+        column('amount', Float),
+        name='increments'
+    ).data([(str(row_id), amount) for row_id, amount in amounts.items()])
+
+
+def increment_campaign_funds_bulk(amounts):
+    """Add {campaign_id: amount} to many campaigns.
+    
+    Campaigns without shards are updated with a single UPDATE; the amounts
+    of hot campaigns (counter_shards > 0) go to one random shard each, in
+    a single upsert, so they never touch the contended campaign row.
+    """
+    if not amounts:
+        return
+    increments = _increments(amounts)
+    updated = db.session.execute(
+        update(Campaign)
+        .where(
+            Campaign.id == cast(increments.c.id, UUID(as_uuid=True)),
+            func.coalesce(Campaign.counter_shards, 0) <= 0
+        )
+        .values(funds_raised=func.coalesce(Campaign.funds_raised, 0) + increments.c.amount)
+        .returning(Campaign.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    
+    remaining = set(amounts) - set(updated)
+    if not remaining:
+        return
+    shards = db.session.query(Campaign.id, Campaign.counter_shards).filter(
+        Campaign.id.in_(list(remaining)),
+        Campaign.counter_shards > 0
+    ).all()
+    if not shards:
+        return
+    stmt = insert(CampaignFundShard).values([
+        {'campaign_id': campaign_id, 'shard': random.randrange(count), 'amount': amounts[campaign_id]}
+        for campaign_id, count in shards
+    ])
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[CampaignFundShard.campaign_id, CampaignFundShard.shard],
+        set_={'amount': CampaignFundShard.amount + stmt.excluded.amount}
+    ))
+
+
+def increment_donor_totals_bulk(amounts):
+    """Add {donor_id: amount} to many donors in a single UPDATE"""
+    if not amounts:
+        return
+    donors = Donor.__table__
+    increments = _increments(amounts)
+    db.session.execute(
+        donors.update()
+        .where(donors.c.id == cast(increments.c.id, UUID(as_uuid=True)))
+        .values(total_donated=func.coalesce(donors.c.total_donated, 0) + increments.c.amount)
+    )
+
+
+def compact_fund_shards():
+    """Fold every shard sub-counter into Campaign.funds_raised.
+    
+    Runs as one statement: the shards are deleted and their sums added to
+    the campaigns atomically, so concurrent increments simply recreate
+    their shard rows. Returns the ids of the campaigns that changed.
+    """
+    drained = delete(CampaignFundShard).returning(
+        CampaignFundShard.campaign_id, CampaignFundShard.amount
+    ).cte('drained')
+    totals = select(
+        drained.c.campaign_id,
+        func.sum(drained.c.amount).label('amount')
+    ).group_by(drained.c.campaign_id).cte('totals')
+    
+    result = db.session.execute(
+        update(Campaign)
+        .where(Campaign.id == totals.c.campaign_id)
+        .values(funds_raised=func.coalesce(Campaign.funds_raised, 0) + totals.c.amount)
+        .returning(Campaign.id)
+        .execution_options(synchronize_session=False)
+    )
+    campaign_ids = [row[0] for row in result]
+    db.session.commit()
+    return campaign_ids
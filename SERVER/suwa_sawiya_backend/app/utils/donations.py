@@ -0,0 +1,64 @@
+"""Donation query helpers"""
+from sqlalchemy import func, distinct
+from app.models import db
+from app.models.campaign import Donation
+
+# Number of recent donations embedded in a campaign's details
+LATEST_DONATIONS = 5
+
+
+def completed_donations_query(campaign_id):
+    """Completed donations of a campaign, served by ix_donations_campaign_status_created_at_id"""
+    return Donation.query.filter(
+        Donation.campaign_id == campaign_id,
+        Donation.status == 'completed'
+    )
+
+
+def donation_stats(campaign_ids):
+    """Completed donation counts per campaign from one grouped aggregate.
+    
+    Served by ix_donations_campaign_status_created_at_id. Returns
+    {campaign_id: {donation_count, donor_count, anonymous_donations}};
+    campaigns without completed donations are absent.
+    """
+    if not campaign_ids:
+        return {}
+    
+    rows = db.session.query(
+        Donation.campaign_id,
+        func.count(Donation.id),
+        func.count(distinct(Donation.donor_id)).filter(Donation.is_anonymous.isnot(True)),
+        func.count(Donation.id).filter(Donation.is_anonymous.is_(True))
+    ).filter(
+        Donation.campaign_id.in_(campaign_ids),
+        Donation.status == 'completed'
+    ).group_by(Donation.campaign_id).all()
+    
+    return {
+        campaign_id: {
+            'donation_count': donation_count,
+            'donor_count': donor_count,
+            'anonymous_donations': anonymous_count
+        }
+        for campaign_id, donation_count, donor_count, anonymous_count in rows
+    }
+
+
+EMPTY_DONATION_STATS = {'donation_count': 0, 'donor_count': 0, 'anonymous_donations': 0}
+
+
+def donation_summary(campaign_id, latest=LATEST_DONATIONS):
+    """Aggregate completed donations of a campaign without loading them.
+    
+    Returns counts from a single aggregate query plus the `latest` most
+    recent donations; the full list is available from the paginated
+    /campaigns/<id>/donations endpoint.
+    """
+    stats = donation_stats([campaign_id]).get(campaign_id, EMPTY_DONATION_STATS)
+    
+    latest_donations = completed_donations_query(campaign_id).order_by(
+        Donation.created_at.desc(), Donation.id.desc()
+    ).limit(latest).all()
+    
+    return dict(stats, latest_donations=[d.to_dict() for d in latest_donations])
@@ -0,0 +1,143 @@
+"""Streaming CSV/NDJSON exports of whole tables
+
+Rows are read through a server-side cursor (stream_results + yield_per),
+so only one batch is ever held in memory, and each batch is encoded and
+sent as soon as it arrives. Memory stays flat however many rows are
+exported.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import select, case
+from app.models import db
+from app.models.campaign import Campaign, Donation
+from app.models.other import Transaction, Disbursement
+
+# Exportable tables and the columns written for each
+EXPORTS = {
+    'donations': (Donation, [
+        'id', 'campaign_id', 'donor_id', 'amount', 'is_anonymous', 'status',
+        'transaction_id', 'created_at', 'completed_at'
+    ]),
+    'transactions': (Transaction, [
+        'id', 'donation_id', 'payment_method', 'transaction_reference', 'amount',
+        'currency', 'status', 'error_message', 'created_at', 'processed_at'
+    ]),
+    'campaigns': (Campaign, [
+        'id', 'title', 'category', 'urgency', 'target_amount', 'funds_raised', 'status',
+        'beneficiary_name', 'partner_id', 'created_at', 'updated_at', 'deadline'
+    ]),
+    'disbursements': (Disbursement, [
+        'id', 'campaign_id', 'amount', 'status', 'bank_name', 'approved_by_id',
+        'created_at', 'approved_at', 'processed_at'
+    ])
+}
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+# Leading characters that make spreadsheets evaluate a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _export_column(model, name):
+    if model is Donation and name == 'donor_id':
+        # Anonymous donations record their donor only for ownership checks
+        return case((Donation.is_anonymous.is_(True), None), else_=Donation.donor_id).label('donor_id')
+    return getattr(model, name)
+
+
+def export_query(resource, start=None, end=None, status=None):
+    """SELECT of a resource's export columns, oldest first, with optional filters"""
+    model, columns = EXPORTS[resource]
+    stmt = select(*[_export_column(model, name) for name in columns])
+    
+    if start:
+        stmt = stmt.where(model.created_at >= start)
+    if end:
+        stmt = stmt.where(model.created_at < end)
+    if status:
+        stmt = stmt.where(model.status == status)
+    
+    return stmt.order_by(model.created_at, model.id)
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # User-supplied text (titles, names, error messages) must not run as
+        # a formula when the export is opened in a spreadsheet
+        return "'" + value
+    return value
+
+
+def _encode_batch(rows, columns, fmt):
+    if fmt == 'ndjson':
+        return ''.join(
+            json.dumps(dict(zip(columns, row)), default=_json_value) + '\n' for row in rows
+        ).encode()
+    
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def generate_export(stmt, columns, fmt='csv', compress=False):
+    """Yield the encoded (and optionally gzipped) export chunk by chunk"""
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 2000)
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31 = gzip container
+    
+    def emit(data):
+        return compressor.compress(data) if compressor else data
+    
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(columns)
+        yield emit(buffer.getvalue().encode())
+    
+    result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+    try:
+        for rows in result.partitions():
+            chunk = emit(_encode_batch(rows, columns, fmt))
+            if chunk:
+                yield chunk
+    finally:
+        result.close()
+        # Release the long-running read transaction
+        db.session.rollback()
+    
+    if compressor:
+        yield compressor.flush()
+
+
+def parse_export_args():
+    """Read format, filters and compression from the query string.
+    
+    Returns (options, error).
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return None, f'format must be one of: {", ".join(EXPORT_FORMATS)}'
+    
+    try:
+        start = datetime.fromisoformat(request.args['start']) if 'start' in request.args else None
+        end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else None
+    except ValueError:
+        return None, 'start and end must be ISO 8601 dates'
+    
+    return {
+        'format': fmt,
+        'start': start,
+        'end': end,
+        'status': request.args.get('status'),
+        'gzip': request.args.get('gzip', 'false').lower() in ('true', '1', 'yes')
+    }, None
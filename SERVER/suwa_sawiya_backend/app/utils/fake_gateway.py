@@ -0,0 +1,154 @@
+"""Local fake payment gateway for development and load testing
+
+Mimics the parts of Stripe's PaymentIntent API the platform uses, without
+any network access. Intents live in a small SQLite file so the web
+workers, the payment event worker and the load generators all see the
+same gateway. Webhook events are signed with the real Stripe signature
+scheme, so they pass stripe.Webhook.construct_event unchanged.
+
+Enable with PAYMENT_GATEWAY=fake.
+"""
+import hashlib
+import hmac
+import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class FakeGateway:
+    """Stripe-shaped PaymentIntent store backed by SQLite"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS payment_intents ('
+            ' id TEXT PRIMARY KEY, amount INTEGER NOT NULL, currency TEXT NOT NULL,'
+            ' description TEXT, status TEXT NOT NULL, created INTEGER NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_created ON payment_intents (created, id)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_intent(row):
+        return {
+            'id': row['id'],
+            'object': 'payment_intent',
+            'amount': row['amount'],
+            'currency': row['currency'],
+            'description': row['description'],
+            'status': row['status'],
+            'created': row['created'],
+            'client_secret': f"{row['id']}_secret_fake"
+        }
+
+    def create_payment_intent(self, amount, currency='usd', description=None):
+        """Create an intent awaiting payment; amount is in cents"""
+        intent_id = f'pi_fake_{uuid.uuid4().hex[:24]}'
+        self._connect().execute(
+            'INSERT INTO payment_intents VALUES (?, ?, ?, ?, ?, ?)',
+            (intent_id, amount, currency, description, 'requires_payment_method', int(time.time()))
+        )
+        return self.retrieve_payment_intent(intent_id)
+
+    def retrieve_payment_intent(self, intent_id):
+        row = self._connect().execute('SELECT * FROM payment_intents WHERE id = ?', (intent_id,)).fetchone()
+        return self._to_intent(row) if row else None
+
+    def list_payment_intents(self, created_gte=None, created_lte=None, starting_after=None, limit=100):
+        """One page of intents, newest first, like stripe.PaymentIntent.list"""
+        sql = 'SELECT * FROM payment_intents WHERE created >= ?'
+        params = [created_gte or 0]
+        if created_lte is not None:
+            sql += ' AND created <= ?'
+            params.append(created_lte)
+        if starting_after:
+            anchor = self._connect().execute(
+                'SELECT created FROM payment_intents WHERE id = ?', (starting_after,)
+            ).fetchone()
+            if anchor:
+                sql += ' AND (created, id) < (?, ?)'
+                params += [anchor['created'], starting_after]
+        sql += ' ORDER BY created DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        rows = self._connect().execute(sql, params).fetchall()
+        return {
+            'object': 'list',
+            'data': [self._to_intent(row) for row in rows[:limit]],
+            'has_more': len(rows) > limit
+        }
+
+    def settle(self, intent_ids, success_rate=0.95, rng=random):
+        """Complete payment for the given intents; returns the updated intents"""
+        settled = []
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for intent_id in intent_ids:
+                status = 'succeeded' if rng.random() < success_rate else 'requires_payment_method'
+                conn.execute(
+                    "UPDATE payment_intents SET status = ? WHERE id = ? AND status = 'requires_payment_method'",
+                    (status, intent_id)
+                )
+                intent = self.retrieve_payment_intent(intent_id)
+                if intent:
+                    intent['last_payment_error'] = None if status == 'succeeded' else {'message': 'Your card was declined.'}
+                    settled.append(intent)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return settled
+
+
+def build_event(intent):
+    """Webhook event reporting the outcome of a settled intent"""
+    event_type = 'payment_intent.succeeded' if intent['status'] == 'succeeded' else 'payment_intent.payment_failed'
+    return {
+        'id': f'evt_fake_{uuid.uuid4().hex[:24]}',
+        'object': 'event',
+        'type': event_type,
+        'created': int(time.time()),
+        'livemode': False,
+        'data': {'object': intent}
+    }
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """Stripe-Signature header value for a raw webhook payload"""
+    timestamp = int(timestamp or time.time())
+    if isinstance(payload, bytes):
+        payload = payload.decode()
+    signature = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+def signed_event(intent, secret):
+    """(payload, signature header) ready to POST to the webhook endpoint"""
+    payload = json.dumps(build_event(intent))
+    return payload, sign_payload(payload, secret)
+
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def get_fake_gateway(path):
+    """Shared FakeGateway instance for a store path"""
+    with _gateways_lock:
+        if path not in _gateways:
+            _gateways[path] = FakeGateway(path)
+        return _gateways[path]
@@ -1,7 +1,70 @@
-"""File handling utilities"""
+"""File handling utilities
+
+Uploads are stored by content: a file with SHA-256 digest <h> lives at
+UPLOAD_FOLDER/<h[0:2]>/<h[2:4]>/<h>. Identical uploads share one file, and
+the two-level fan-out keeps directories small. A stored file is referenced
+by the rows pointing at its path (documents.file_path, campaigns.cover_image
+and campaigns.medical_document); delete_file removes it only once none do.
+Files derived from a stored file (e.g. resized images) sit next to it as
+<h>.<suffix> and are removed with it.
+"""
+import glob
+import hashlib
 import os
-from werkzeug.utils import secure_filename
+import re
+import tempfile
+import time
+import zipfile
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import func, or_
 from werkzeug.datastructures import FileStorage
+from app.models import db
+from app.models.campaign import Campaign
+from app.models.other import Document
+from app.utils.metrics import record_upload
+
+# Uploads are copied to disk this many bytes at a time
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes inspected to identify the file type
+SNIFF_BYTES = 8
+
+DOCX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+# Part every Word document ZIP container has (other ZIPs share its magic number)
+DOCX_MAIN_PART = 'word/document.xml'
+
+# (magic prefix, MIME type), checked in order
+MAGIC_NUMBERS = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),  # OLE2 compound file
+    (b'PK\x03\x04', DOCX_MIME_TYPE),  # ZIP container, confirmed by _is_docx
+)
+
+# MIME type the content of each allowed extension must sniff as
+EXTENSION_MIME_TYPES = {
+    'pdf': 'application/pdf',
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'doc': 'application/msword',
+    'docx': DOCX_MIME_TYPE,
+}
+
+# Temporary files of in-progress uploads (in the root of the upload folder)
+# and of derived files being written (next to their source)
+TEMP_PREFIX = '.upload-'
+TEMP_SUFFIX = '.part'
+
+_CONTENT_HASH = re.compile(r'^[0-9a-f]{64}$')
+
+SavedFile = namedtuple('SavedFile', ['path', 'size', 'content_hash', 'mime_type', 'duplicate'])
 
 
 def allowed_file(filename, allowed_extensions):
@@ -9,8 +72,64 @@ def allowed_file(filename, allowed_extensions):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
 
+def sniff_mime_type(head):
+    """MIME type identified from a file's leading bytes, or None"""
+    for magic, mime_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return mime_type
+    return None
+
+
+def stored_file_path(upload_folder, content_hash):
+    """Where the file with this SHA-256 hex digest is stored"""
+    return os.path.join(upload_folder, content_hash[:2], content_hash[2:4], content_hash)
+
+
+def content_hash_from_path(file_path):
+    """SHA-256 a stored file is keyed by, or None for files saved by name"""
+    name = os.path.basename(file_path or '')
+    return name if _CONTENT_HASH.match(name) else None
+
+
+def _is_docx(path):
+    """Whether a ZIP container holds a Word document (reads only its directory)"""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return DOCX_MAIN_PART in archive.namelist()
+    except zipfile.BadZipFile:
+        return False
+
+
+def _copy_stream(stream, destination):
+    """Copy stream to an open file in CHUNK_SIZE pieces.
+    
+    Returns (size, sha256 hex digest, sniffed MIME type); memory use does
+    not depend on the size of the upload.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if len(head) < SNIFF_BYTES:
+            head += chunk[:SNIFF_BYTES - len(head)]
+        digest.update(chunk)
+        destination.write(chunk)
+        size += len(chunk)
+    return size, digest.hexdigest(), sniff_mime_type(head)
+
+
 def save_uploaded_file(file, upload_folder, allowed_extensions):
-    """Save uploaded file and return file path"""
+    """Stream an uploaded file into the content-addressed store.
+    
+    The upload is written to a temporary file in upload_folder and renamed
+    into place once complete, so a partial file is never visible under its
+    final name. Size, SHA-256 and sniffed MIME type are computed in the same
+    pass. If the same content is already stored, the existing file is reused
+    (SavedFile.duplicate). Returns (SavedFile, error).
+    """
     if not isinstance(file, FileStorage):
         return None, 'Invalid file'
     
@@ -20,27 +139,147 @@ def save_uploaded_file(file, upload_folder, allowed_extensions):
     if not allowed_file(file.filename, allowed_extensions):
         return None, f'File type not allowed. Allowed types: {", ".join(allowed_extensions)}'
     
+    extension = file.filename.rsplit('.', 1)[1].lower()
+    temp_path = None
     try:
-        filename = secure_filename(file.filename)
-        # Add timestamp to filename to make it unique
-        import time
-        filename = f"{int(time.time())}_{filename}"
-        
         os.makedirs(upload_folder, exist_ok=True)
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
+        started = time.perf_counter()
+        
+        # Same filesystem as the store, so the rename below is atomic
+        fd, temp_path = tempfile.mkstemp(dir=upload_folder, prefix=TEMP_PREFIX, suffix=TEMP_SUFFIX)
+        with os.fdopen(fd, 'wb') as destination:
+            size, content_hash, mime_type = _copy_stream(file.stream, destination)
+            destination.flush()
+            os.fsync(destination.fileno())
+        
+        if size == 0:
+            os.remove(temp_path)
+            record_upload(0, 0, error='empty')
+            return None, 'File is empty'
+        
+        if mime_type == DOCX_MIME_TYPE and not _is_docx(temp_path):
+            mime_type = None  # Some other ZIP archive
         
-        return file_path, None
+        expected = EXTENSION_MIME_TYPES.get(extension)
+        if expected and mime_type != expected:
+            os.remove(temp_path)
+            record_upload(0, 0, error='mismatch')
+            return None, 'File content does not match its extension'
+        
+        file_path = stored_file_path(upload_folder, content_hash)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        try:
+            # Already stored: keep the existing copy. Touching it tells
+            # garbage collection it is about to gain a reference.
+            os.utime(file_path)
+            os.remove(temp_path)
+            duplicate = True
+        except FileNotFoundError:
+            os.replace(temp_path, file_path)
+            duplicate = False
+        temp_path = None
+        record_upload(size, time.perf_counter() - started, duplicate=duplicate)
+        
+        return SavedFile(file_path, size, content_hash, mime_type, duplicate), None
     except Exception as e:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+        record_upload(0, 0, error=e)
         return None, str(e)
 
 
-def delete_file(file_path):
-    """Delete a file"""
+def file_references(file_path):
+    """Number of documents and campaigns pointing at a stored file"""
+    documents = db.session.query(func.count(Document.id)).filter(
+        Document.file_path == file_path
+    ).scalar()
+    # Campaign file columns are unindexed; this only runs when deleting
+    campaigns = db.session.query(func.count(Campaign.id)).filter(
+        or_(Campaign.cover_image == file_path, Campaign.medical_document == file_path)
+    ).scalar()
+    return documents + campaigns
+
+
+def _recently_touched(file_path, grace_seconds):
+    return time.time() - os.path.getmtime(file_path) < grace_seconds
+
+
+def _prune_empty_dirs(directory, upload_folder):
+    """Remove emptied shard directories up to (not including) upload_folder"""
+    upload_folder = os.path.abspath(upload_folder)
+    directory = os.path.abspath(directory)
+    while directory != upload_folder and directory.startswith(upload_folder + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return  # Not empty, or already gone
+        directory = os.path.dirname(directory)
+
+
+def delete_file(file_path, upload_folder=None, grace_seconds=0):
+    """Delete a stored file once nothing references it.
+    
+    Call after the rows referencing file_path were deleted and committed.
+    Files touched within grace_seconds are kept, as a concurrent upload of
+    the same content may be about to reference them; collect_garbage
+    removes them later. Returns whether the file was deleted.
+    """
     try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            return True
+        if not file_path or file_references(file_path):
+            return False
+        if not os.path.exists(file_path) or _recently_touched(file_path, grace_seconds):
+            return False
+        os.remove(file_path)
+        for derived_path in glob.glob(glob.escape(file_path) + '.*'):
+            os.remove(derived_path)
+        if upload_folder and content_hash_from_path(file_path):
+            _prune_empty_dirs(os.path.dirname(file_path), upload_folder)
+        return True
     except Exception as e:
-        print(f"Error deleting file: {e}")
+        current_app.logger.warning(f'Error deleting file {file_path}: {e}')
     return False
+
+
+def _referenced_paths():
+    paths = set()
+    for column in (Document.file_path, Campaign.cover_image, Campaign.medical_document):
+        paths.update(path for (path,) in db.session.query(column).filter(column.isnot(None)).distinct())
+    return paths
+
+
+def collect_garbage(upload_folder, grace_seconds, dry_run=False):
+    """Delete unreferenced stored files, their derived files and stale partial writes.
+    
+    Only files last touched more than grace_seconds ago are considered, so
+    uploads whose rows are not committed yet survive. Files saved by name
+    before the store existed are left alone. Returns (files, bytes) removed.
+    """
+    if not os.path.isdir(upload_folder):
+        return 0, 0
+    
+    referenced = _referenced_paths()
+    removed = freed = 0
+    for directory, subdirectories, filenames in os.walk(upload_folder, topdown=False):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            stem = filename.split('.', 1)[0]
+            if filename.startswith('.'):
+                collectable = filename.endswith(TEMP_SUFFIX)
+            elif directory == upload_folder:
+                collectable = False
+            else:
+                # Derived files (<h>.<suffix>) go with their source <h>
+                collectable = bool(_CONTENT_HASH.match(stem)) and os.path.join(directory, stem) not in referenced
+            try:
+                if not collectable or _recently_touched(path, grace_seconds):
+                    continue
+                size = os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+            freed += size
+        if not dry_run and directory != upload_folder:
+            _prune_empty_dirs(directory, upload_folder)
+    return removed, freed
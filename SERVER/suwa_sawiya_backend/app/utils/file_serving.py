@@ -0,0 +1,91 @@
+"""Serving stored files
+
+send_stored_file answers conditional requests (If-None-Match with the
+content hash as a strong ETag, If-Modified-Since) without touching the
+file. How the body is sent depends on FILE_SERVING_MODE:
+- 'direct': Werkzeug sends the file, honouring Range, through the WSGI
+  server's wsgi.file_wrapper (sendfile(2) under gunicorn) when available
+- 'x-accel': an empty response with X-Accel-Redirect under
+  FILE_ACCEL_PREFIX; nginx streams the file and handles Range
+- 'x-sendfile': an empty response with X-Sendfile for Apache mod_xsendfile
+  or lighttpd, which stream the file and handle Range
+
+Either way no worker thread is busy copying a large file through Python.
+"""
+import os
+from urllib.parse import quote
+from flask import current_app, request
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.utils import send_file
+from app.utils.file_handler import SNIFF_BYTES, content_hash_from_path, sniff_mime_type
+
+FILE_SERVING_MODES = ('direct', 'x-accel', 'x-sendfile')
+
+
+def resolve_stored_path(file_path, upload_folder):
+    """Absolute path of a stored file, or None if missing or outside upload_folder"""
+    if not file_path:
+        return None
+    root = os.path.realpath(upload_folder)
+    path = os.path.realpath(file_path)
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def stored_mime_type(path):
+    """MIME type of a stored file, sniffed from its contents"""
+    with open(path, 'rb') as f:
+        return sniff_mime_type(f.read(SNIFF_BYTES)) or 'application/octet-stream'
+
+
+def send_stored_file(path, upload_folder, content_hash=None, mime_type=None,
+                     download_name=None, public=False):
+    """Response sending a file resolved with resolve_stored_path.
+    
+    Public files may be cached by browsers and shared caches for
+    FILE_CACHE_MAX_AGE seconds; private ones must be revalidated on every
+    use, which costs a 304 when unchanged.
+    """
+    config = current_app.config
+    mode = config.get('FILE_SERVING_MODE', 'direct')
+    content_hash = content_hash or content_hash_from_path(path)
+    
+    try:
+        response = send_file(
+            path,
+            request.environ,
+            mimetype=mime_type or stored_mime_type(path),
+            as_attachment=download_name is not None,
+            download_name=download_name or os.path.basename(path),
+            conditional=mode == 'direct',
+            etag=content_hash or True,
+            max_age=config.get('FILE_CACHE_MAX_AGE', 3600) if public else 0,
+            response_class=current_app.response_class,
+            # Both offload modes start from Werkzeug's empty X-Sendfile response
+            use_x_sendfile=mode != 'direct'
+        )
+    except RequestedRangeNotSatisfiable as e:
+        return e.get_response(request.environ)
+    
+    if download_name is None:
+        # Shown inline; the stored name is just the hash
+        response.headers.pop('Content-Disposition', None)
+    if not public:
+        response.cache_control.private = True
+    
+    if mode == 'direct':
+        return response
+    
+    if mode == 'x-accel':
+        del response.headers['X-Sendfile']
+        relative = os.path.relpath(path, os.path.realpath(upload_folder)).replace(os.sep, '/')
+        response.headers['X-Accel-Redirect'] = config.get('FILE_ACCEL_PREFIX', '/protected-uploads/') + quote(relative)
+    
+    # The front server sends the body and handles Range; only validators are checked here
+    response.headers.pop('Content-Length', None)
+    response = response.make_conditional(request.environ, accept_ranges=False)
+    if response.status_code == 304:
+        response.headers.pop('X-Accel-Redirect', None)
+        response.headers.pop('X-Sendfile', None)
+    return response
@@ -0,0 +1,156 @@
+"""Idempotency-Key support for non-idempotent endpoints
+
+A request carrying an ``Idempotency-Key`` header first claims the key in
+the idempotency_keys table. The request that wins the claim runs the view
+and stores its response; retries with the same key replay that response
+without running the view again, and duplicates arriving while it is still
+running wait for it to finish.
+"""
+import hashlib
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert
+from app.models import db
+from app.models.other import IdempotencyKey
+from app.utils.response import error_response
+
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 0.5
+
+
+def _sha256(value):
+    return hashlib.sha256(value).hexdigest()
+
+
+def claim_key(key_hash, request_hash):
+    """Try to take ownership of a key; returns True if this request owns it.
+    
+    An expired key (a finished response past its TTL, or a request that
+    died before storing its response) is taken over.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=current_app.config['IDEMPOTENCY_LOCK_TIMEOUT'])
+    
+    claimed = db.session.execute(
+        insert(IdempotencyKey)
+        .values(key_hash=key_hash, request_hash=request_hash, status='in_progress',
+                created_at=now, expires_at=expires_at)
+        .on_conflict_do_update(
+            index_elements=[IdempotencyKey.key_hash],
+            set_={'request_hash': request_hash, 'status': 'in_progress', 'response_status': None,
+                  'response_body': None, 'created_at': now, 'expires_at': expires_at},
+            where=IdempotencyKey.expires_at < now
+        )
+        .returning(IdempotencyKey.key_hash)
+    ).first()
+    db.session.commit()
+    return claimed is not None
+
+
+def _load_key(key_hash):
+    row = db.session.execute(
+        select(
+            IdempotencyKey.request_hash, IdempotencyKey.status,
+            IdempotencyKey.response_status, IdempotencyKey.response_body
+        ).where(IdempotencyKey.key_hash == key_hash)
+    ).first()
+    # End the transaction so the next poll sees fresh data
+    db.session.commit()
+    return row
+
+
+def store_response(key_hash, response):
+    """Record the response for replay, or release the key on server errors"""
+    if response.status_code >= 500:
+        # Let the client retry a request that failed on our side
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key_hash == key_hash))
+    else:
+        db.session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key_hash == key_hash)
+            .values(
+                status='completed',
+                response_status=response.status_code,
+                response_body=response.get_data(as_text=True),
+                expires_at=datetime.utcnow() + timedelta(seconds=current_app.config['IDEMPOTENCY_KEY_TTL'])
+            )
+        )
+    db.session.commit()
+
+
+def _replay(row):
+    response = current_app.response_class(row.response_body, status=row.response_status, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(f):
+    """Decorator honouring the Idempotency-Key header on a JWT-protected view"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return f(*args, **kwargs)
+        
+        if len(key) > MAX_KEY_LENGTH:
+            return error_response(f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters', 400)
+        
+        # Keys are scoped per user and endpoint
+        key_hash = _sha256(f'{get_jwt_identity()}:{request.endpoint}:{key}'.encode())
+        request_hash = _sha256(request.get_data())
+        
+        try:
+            owned = claim_key(key_hash, request_hash)
+        except Exception as e:
+            db.session.rollback()
+            return error_response(str(e), 500)
+        
+        if owned:
+            response = make_response(f(*args, **kwargs))
+            try:
+                store_response(key_hash, response)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f'Could not store idempotent response: {e}')
+            return response
+        
+        # Someone else owns the key: wait for their response
+        deadline = time.monotonic() + current_app.config['IDEMPOTENCY_WAIT_TIMEOUT']
+        interval = POLL_INTERVAL
+        while True:
+            row = _load_key(key_hash)
+            
+            if row is None:
+                # The original failed and released the key
+                return error_response('Original request failed, please retry', 409)
+            if row.request_hash != request_hash:
+                return error_response('Idempotency-Key was already used with a different request', 422)
+            if row.status == 'completed':
+                return _replay(row)
+            if time.monotonic() >= deadline:
+                response, status = error_response('A request with this Idempotency-Key is in progress', 409)
+                response.headers['Retry-After'] = '1'
+                return response, status
+            
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+    return decorated
+
+
+def purge_expired_keys(batch_size=1000):
+    """Delete expired keys in batches; returns the number removed"""
+    removed = 0
+    while True:
+        expired = select(IdempotencyKey.key_hash).where(
+            IdempotencyKey.expires_at < datetime.utcnow()
+        ).limit(batch_size)
+        result = db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key_hash.in_(expired)))
+        db.session.commit()
+        removed += result.rowcount
+        if result.rowcount < batch_size:
+            return removed
@@ -0,0 +1,167 @@
+"""Campaign cover image derivatives
+
+Cover uploads may be up to 50MB, far too large for campaign cards. After a
+campaign with a cover is created, resized and recompressed JPEG variants
+(see VARIANTS) are rendered in a small process pool, so neither the request
+nor the web worker's CPU is spent on them. Each variant is written next to
+its source as <source>.<variant>.jpg, so it shares the source's lifetime in
+the upload store. Sizes and hashes are recorded in campaigns.cover_variants
+once all variants exist; until then clients use the original cover.
+
+Rendering needs Pillow. Jobs still queued when a worker exits are lost;
+generate_cover_variants.py renders whatever is missing.
+"""
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from flask import current_app
+from app.models import db
+from app.models.campaign import Campaign
+from app.utils.cache import response_cache
+from app.utils.process_pool import ProcessPool
+
+# name: (max width, max height); images are scaled to fit, never enlarged
+VARIANTS = {
+    'hero': (1600, 900),
+    'card': (640, 400),
+    'thumbnail': (240, 240),
+}
+
+JPEG_QUALITY = 82
+
+
+def variant_path(source_path, variant):
+    """Where a variant of a stored cover image is written"""
+    return f'{source_path}.{variant}.jpg'
+
+
+def _write_atomic(path, data):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.variant-', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def render_variants(source_path):
+    """Render every variant of an image; runs in a pool worker.
+
+    Variants are rendered largest first, each from the previous one, so
+    the full-size original is only decoded and resampled once. Returns
+    {variant: {width, height, size, content_hash}}.
+    """
+    from PIL import Image, ImageOps  # Optional dependency, only needed here
+
+    with Image.open(source_path) as original:
+        # Let the JPEG decoder downscale while decoding (DCT scaling); square,
+        # as EXIF orientation may still swap width and height
+        largest = max(max(size) for size in VARIANTS.values())
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'L'):
+            # JPEG has no transparency; flatten onto white
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+
+        variants = {}
+        for name, size in sorted(VARIANTS.items(), key=lambda item: -item[1][0] * item[1][1]):
+            image = image.copy()
+            image.thumbnail(size, Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            data = buffer.getvalue()
+            _write_atomic(variant_path(source_path, name), data)
+            variants[name] = {
+                'width': image.width,
+                'height': image.height,
+                'size': len(data),
+                'content_hash': hashlib.sha256(data).hexdigest()
+            }
+    return variants
+
+
+def record_cover_variants(campaign_id, source_path, variants):
+    """Store rendered variants, unless the campaign's cover changed meanwhile"""
+    updated = Campaign.query.filter_by(id=campaign_id, cover_image=source_path).update(
+        {'cover_variants': variants}, synchronize_session=False
+    )
+    db.session.commit()
+    if updated:
+        response_cache.invalidate_campaign(campaign_id)
+    return bool(updated)
+
+
+class ImagePipeline:
+    """Renders cover variants in a bounded background process pool"""
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = ProcessPool(workers)
+
+    def submit(self, app, campaign_id, source_path):
+        """Queue a campaign's cover for rendering; returns False if the queue is full"""
+        if not self.workers:
+            # Inline (testing); still recorded like a pool result
+            self._finish(app, campaign_id, source_path, render_variants, source_path)
+            return True
+
+        if not self._slots.acquire(blocking=False):
+            app.logger.warning(f'Cover variant queue full, skipped campaign {campaign_id}')
+            return False
+        try:
+            future = self._pool.submit(render_variants, source_path)
+        except Exception:
+            self._slots.release()
+            raise
+
+        def done(future):
+            self._slots.release()
+            self._finish(app, campaign_id, source_path, future.result)
+
+        future.add_done_callback(done)
+        return True
+
+    @staticmethod
+    def _finish(app, campaign_id, source_path, fn, *args):
+        with app.app_context():
+            try:
+                record_cover_variants(campaign_id, source_path, fn(*args))
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(f'Could not render cover variants of campaign {campaign_id}: {e}')
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_pipeline(app):
+    """The image pipeline configured for an app (one per process and app)"""
+    with _pipelines_lock:
+        pipeline = _pipelines.get(id(app))
+        if pipeline is None:
+            workers = app.config.get('IMAGE_VARIANT_WORKERS', 2)
+            pipeline = ImagePipeline(
+                workers,
+                app.config.get('IMAGE_VARIANT_MAX_PENDING') or max(workers, 1) * 16
+            )
+            _pipelines[id(app)] = pipeline
+        return pipeline
+
+
+def schedule_cover_variants(campaign):
+    """Render a committed campaign's cover variants in the background"""
+    if not campaign.cover_image:
+        return False
+    app = current_app._get_current_object()
+    return get_pipeline(app).submit(app, campaign.id, campaign.cover_image)
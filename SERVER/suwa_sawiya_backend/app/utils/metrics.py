@@ -0,0 +1,317 @@
+"""Prometheus metrics
+
+A small in-process registry rendering the Prometheus text exposition
+format, so the platform needs no extra dependency. Recording a sample is
+a dict lookup and an addition under a lock, cheap enough to leave on in
+production. Each worker process keeps its own series; scrape every worker
+or let the collector aggregate them.
+
+Collected here:
+- request latency histograms and request counts per blueprint/endpoint,
+  plus in-flight requests per blueprint
+- SQLAlchemy pool checkout wait time, checked-out connections and
+  saturation
+- latency of payment gateway calls (app/utils/payment.py)
+- uploaded bytes and upload duration (app/utils/file_handler.py)
+"""
+import bisect
+import math
+import threading
+import time
+from functools import wraps
+from flask import Response, current_app, g, request
+from app.models import db
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; spans fast cached reads to slow exports and payment calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Registry:
+    """Metrics exposed by /metrics, in registration order"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}')
+        return tuple(labels)
+
+
+class Counter(_Metric):
+    """Monotonically increasing total"""
+
+    type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in values]
+
+
+class Gauge(Counter):
+    """Value that goes up and down; optionally read from a callback at scrape time"""
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        if self.callback:
+            # callback returns [(label values, value)]
+            return [
+                f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in self.callback()
+            ]
+        return super().samples()
+
+
+class Histogram(_Metric):
+    """Bucketed observations with their sum and count"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), sum
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+
+        lines = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ('le',), key + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time spent handling HTTP requests',
+    ('blueprint', 'endpoint', 'method')
+)
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests handled',
+    ('blueprint', 'endpoint', 'method', 'status')
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress', 'HTTP requests being handled',
+    ('blueprint',)
+)
+
+POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds', 'Time to check out a connection from the pool, including opening new ones',
+    buckets=POOL_WAIT_BUCKETS
+)
+
+GATEWAY_LATENCY = Histogram(
+    'payment_gateway_request_duration_seconds', 'Latency of outbound payment gateway calls',
+    ('gateway', 'operation', 'outcome')
+)
+
+UPLOAD_BYTES = Counter('upload_bytes_total', 'Bytes of uploaded files written to storage')
+UPLOADS = Counter('uploads_total', 'Uploaded files processed', ('outcome',))
+UPLOAD_DURATION = Histogram('upload_duration_seconds', 'Time spent writing uploaded files to storage')
+
+# Instrumented pools, by engine; gauges below read them at scrape time
+_pools = {}
+
+
+def _pool_values(read):
+    values = []
+    for name, pool in list(_pools.items()):
+        try:
+            values.append(((name,), read(pool)))
+        except (AttributeError, TypeError):
+            pass  # Pools without a fixed size (e.g. SQLite's) report nothing
+    return values
+
+
+def _pool_saturation(pool):
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    return round(pool.checkedout() / capacity, 4) if capacity else 0
+
+
+POOL_SIZE = Gauge(
+    'db_pool_size', 'Persistent connections the pool keeps', ('pool',),
+    callback=lambda: _pool_values(lambda pool: pool.size())
+)
+POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out', 'Connections currently checked out', ('pool',),
+    callback=lambda: _pool_values(lambda pool: pool.checkedout())
+)
+POOL_OVERFLOW = Gauge(
+    'db_pool_overflow', 'Connections open beyond the pool size (negative while the pool is filling)', ('pool',),
+    callback=lambda: _pool_values(lambda pool: pool.overflow())
+)
+POOL_SATURATION = Gauge(
+    'db_pool_saturation', 'Checked-out connections as a fraction of pool size plus max overflow', ('pool',),
+    callback=lambda: _pool_values(_pool_saturation)
+)
+
+
+def instrument_pool(name, pool):
+    """Time every checkout from a SQLAlchemy pool"""
+    do_get = pool._do_get
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+    pool._do_get = timed_do_get
+    _pools[name] = pool
+
+
+def timed_gateway_call(operation):
+    """Decorator timing a payment helper that returns (result, error)"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            started = time.perf_counter()
+            result, error = f(*args, **kwargs)
+            GATEWAY_LATENCY.observe(
+                time.perf_counter() - started,
+                current_app.config.get('PAYMENT_GATEWAY', 'stripe'),
+                operation,
+                'error' if error else 'ok'
+            )
+            return result, error
+        return decorated
+    return decorator
+
+
+def record_upload(size, duration, error=None, duplicate=False):
+    """Account for one uploaded file"""
+    UPLOADS.inc('error' if error else 'duplicate' if duplicate else 'ok')
+    if not error:
+        UPLOAD_BYTES.inc(amount=size)
+        UPLOAD_DURATION.observe(duration)
+
+
+def _request_labels():
+    return request.blueprint or 'app', request.endpoint or 'unmatched'
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    REQUESTS_IN_PROGRESS.inc(request.blueprint or 'app')
+
+
+def _finish_request(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def _teardown_request(exc):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    blueprint, endpoint = _request_labels()
+    REQUEST_LATENCY.observe(time.perf_counter() - started, blueprint, endpoint, request.method)
+    REQUESTS.inc(blueprint, endpoint, request.method, g.pop('metrics_status', 500))
+    REQUESTS_IN_PROGRESS.dec(blueprint)
+
+
+def metrics_view():
+    """Prometheus scrape endpoint"""
+    token = current_app.config.get('METRICS_AUTH_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+def init_metrics(app):
+    """Record request metrics and expose them at /metrics"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    with app.app_context():
+        instrument_pool(db.engine.url.database or 'default', db.engine.pool)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
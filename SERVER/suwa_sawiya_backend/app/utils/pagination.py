@@ -0,0 +1,91 @@
+"""Pagination utilities - offset and keyset (cursor) pagination"""
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from flask import request
+from sqlalchemy import tuple_
+
+
+class Page:
+    """One page of query results plus the metadata for paginated_response"""
+
+    def __init__(self, items, per_page, page=None, total=None, has_more=False, next_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.page = page
+        self.total = total
+        self.has_more = has_more
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(created_at, row_id):
+    """Build an opaque cursor pointing just after (created_at, id)"""
+    raw = json.dumps([created_at.isoformat(), str(row_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into (created_at, id); returns None if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+
+def include_total_requested(default=True):
+    """Whether the client wants the (COUNT(*)) total"""
+    value = request.args.get('include_total')
+    if value is None:
+        return default
+    return value.lower() not in ('false', '0', 'no')
+
+
+def paginate_query(query, model, keyset=False, include_total=True):
+    """Paginate a query according to the current request's arguments.
+
+    Offset mode (default) uses ``page``/``per_page``. Passing ``cursor``
+    (empty for the first page) switches to keyset mode, which walks
+    ``model`` newest first by ``(created_at, id)`` so every page costs the
+    same regardless of depth. ``include_total=false`` skips the COUNT(*)
+    query in either mode. Endpoints built for streaming can pass
+    keyset=True to always use cursor mode and include_total=False to make
+    the count opt-in.
+
+    Returns (page, error) where page is a Page instance.
+    """
+    per_page = request.args.get('per_page', 10, type=int)
+    if per_page < 1:
+        return None, 'per_page must be at least 1'
+
+    total = query.order_by(None).count() if include_total_requested(include_total) else None
+
+    if keyset or 'cursor' in request.args:
+        keyset_query = query.order_by(model.created_at.desc(), model.id.desc())
+
+        cursor = request.args.get('cursor')
+        if cursor:
+            position = decode_cursor(cursor)
+            if position is None:
+                return None, 'Invalid cursor'
+            keyset_query = keyset_query.filter(tuple_(model.created_at, model.id) < position)
+
+        # Fetch one extra row to learn whether another page exists
+        rows = keyset_query.limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+
+        return Page(rows, per_page, total=total, has_more=has_more, next_cursor=next_cursor), None
+
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+        return None, 'page must be at least 1'
+
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    has_more = len(rows) > per_page
+
+    return Page(rows[:per_page], per_page, page=page, total=total, has_more=has_more), None
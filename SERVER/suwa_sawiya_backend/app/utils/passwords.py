@@ -0,0 +1,116 @@
+"""Password hashing in a bounded worker process pool
+
+Password KDFs are deliberately CPU-heavy. Running them in request threads
+lets a burst of logins starve every other request, so hashing and
+verification are sent to a small process pool instead. At most
+PASSWORD_HASH_MAX_PENDING operations may be queued or running at once;
+beyond that callers wait up to PASSWORD_HASH_TIMEOUT seconds for a slot
+and then get PasswordHasherBusy, which routes turn into a 503; so do
+callers whose operation takes longer than that to complete.
+
+The KDF and its cost come from PASSWORD_HASH_METHOD (any werkzeug method
+string, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'). Hashes made
+with other parameters are upgraded on the next successful login.
+"""
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.process_pool import ProcessPool
+
+DEFAULT_METHOD = 'scrypt'
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated"""
+
+
+class PasswordHasher:
+    """Runs password KDF calls in a bounded process pool"""
+
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = ProcessPool(workers)
+
+    def run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy('Password hashing is overloaded, please retry')
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # A slot stays taken until the worker is done with it, even when the
+        # caller stops waiting, so timeouts cannot overfill the pool
+        future.add_done_callback(lambda future: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()  # Frees the slot at once if it never started
+            raise PasswordHasherBusy('Password hashing is overloaded, please retry')
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+
+_hashers = {}
+_hashers_lock = threading.Lock()
+_method_prefixes = {}
+
+
+def get_hasher(app):
+    """The hasher configured for an app (one per process and app)"""
+    with _hashers_lock:
+        hasher = _hashers.get(id(app))
+        if hasher is None:
+            workers = app.config.get('PASSWORD_HASH_WORKERS')
+            if workers is None:
+                workers = os.cpu_count() or 1
+            hasher = PasswordHasher(
+                workers,
+                app.config.get('PASSWORD_HASH_MAX_PENDING') or max(workers, 1) * 4,
+                app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+            )
+            _hashers[id(app)] = hasher
+        return hasher
+
+
+def _method():
+    if has_app_context():
+        return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    return DEFAULT_METHOD
+
+
+def _run(fn, *args):
+    if not has_app_context():
+        return fn(*args)
+    return get_hasher(current_app._get_current_object()).run(fn, *args)
+
+
+def hash_password(password):
+    """Hash a password with the configured method"""
+    return _run(generate_password_hash, password, _method())
+
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash"""
+    return _run(check_password_hash, password_hash, password)
+
+
+def _method_prefix(method):
+    # werkzeug fills in default costs ('scrypt' -> 'scrypt:32768:8:1'), so
+    # learn the stored form from a real hash once per method
+    if method not in _method_prefixes:
+        _method_prefixes[method] = generate_password_hash('', method).split('$', 1)[0]
+    return _method_prefixes[method]
+
+
+def needs_rehash(password_hash):
+    """Whether a stored hash was made with other KDF parameters than configured"""
+    return password_hash.split('$', 1)[0] != _method_prefix(_method())
@@ -1,15 +1,35 @@
 """Payment utilities for Stripe integration"""
 import os
 import stripe
+from flask import current_app
+from app.utils.fake_gateway import get_fake_gateway
+from app.utils.metrics import timed_gateway_call
 
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY', '')
 
 
+def _fake_gateway():
+    """The local fake gateway when PAYMENT_GATEWAY is 'fake', else None"""
+    if current_app.config.get('PAYMENT_GATEWAY') == 'fake':
+        return get_fake_gateway(current_app.config['FAKE_GATEWAY_PATH'])
+    return None
+
+
+def amount_in_cents(amount):
+    """Gateway amount (smallest currency unit) charged for a donation amount"""
+    return int(round(amount * 100))
+
+
+@timed_gateway_call('create_payment_intent')
 def create_payment_intent(amount, currency='usd', description='Medical Campaign Donation'):
     """Create a Stripe payment intent"""
     try:
+        fake = _fake_gateway()
+        if fake:
+            return fake.create_payment_intent(amount_in_cents(amount), currency, description), None
+
         intent = stripe.PaymentIntent.create(
-            amount=int(amount * 100),  # Amount in cents
+            amount=amount_in_cents(amount),
             currency=currency,
             description=description,
             payment_method_types=['card']
@@ -29,10 +49,56 @@ def create_payment_intent(amount, currency='usd', description='Medical Campaign
         return None, str(e)
 
 
+@timed_gateway_call('retrieve_payment_intent')
 def verify_payment_intent(intent_id):
-    """Verify a payment intent status"""
+    """Verify a payment intent status.
+    
+    Returns (None, None) if the gateway has no such intent.
+    """
     try:
+        fake = _fake_gateway()
+        if fake:
+            return fake.retrieve_payment_intent(intent_id), None
+
         intent = stripe.PaymentIntent.retrieve(intent_id)
         return intent, None
+    except stripe.error.InvalidRequestError as e:
+        if e.code == 'resource_missing':
+            return None, None
+        return None, str(e)
+    except Exception as e:
+        return None, str(e)
+
+
+@timed_gateway_call('list_payment_intents')
+def list_payment_intents(created_gte=None, created_lte=None, starting_after=None, limit=100):
+    """List one page of payment intents created in a time window (newest first)"""
+    try:
+        fake = _fake_gateway()
+        if fake:
+            return fake.list_payment_intents(created_gte, created_lte, starting_after, limit), None
+
+        created = {'gte': created_gte}
+        if created_lte is not None:
+            created['lte'] = created_lte
+        params = {'created': created, 'limit': limit}
+        if starting_after:
+            params['starting_after'] = starting_after
+        return stripe.PaymentIntent.list(**params), None
     except Exception as e:
         return None, str(e)
+
+
+def construct_webhook_event(payload, signature_header):
+    """Verify a webhook's Stripe-Signature header and parse the event"""
+    secret = current_app.config.get('STRIPE_WEBHOOK_SECRET')
+    if not secret:
+        return None, 'Webhook secret not configured'
+
+    try:
+        event = stripe.Webhook.construct_event(payload, signature_header, secret)
+        return event, None
+    except ValueError:
+        return None, 'Invalid payload'
+    except stripe.error.SignatureVerificationError:
+        return None, 'Invalid signature'
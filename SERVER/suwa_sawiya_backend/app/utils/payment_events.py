@@ -0,0 +1,223 @@
+"""Payment event ingestion and batch settlement
+
+Webhook events are recorded durably in payment_events and acknowledged
+immediately; a worker (process_payment_events.py) later applies them in
+batches, settling many donations with a handful of set-based statements.
+"""
+import uuid
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from sqlalchemy import update, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from flask import current_app
+from app.models import db
+from app.models.campaign import Donation
+from app.models.other import Transaction, PaymentEvent
+from app.utils.cache import response_cache
+from app.utils.counters import increment_campaign_funds_bulk, increment_donor_totals_bulk
+from app.utils.payment import amount_in_cents
+from app.utils.rollups import record_donation_rollups
+
+SUCCEEDED_EVENTS = {'payment_intent.succeeded'}
+FAILED_EVENTS = {'payment_intent.payment_failed', 'payment_intent.canceled'}
+HANDLED_EVENTS = SUCCEEDED_EVENTS | FAILED_EVENTS
+
+# Intent ids of the donations a settlement changed, and their campaigns
+Settlement = namedtuple('Settlement', ['campaign_ids', 'completed', 'failed'])
+
+
+def enqueue_payment_event(event):
+    """Durably queue a verified webhook event (parsed JSON).
+    
+    Gateways retry deliveries, so an event already queued is ignored.
+    Returns True if the event was new.
+    """
+    intent = event['data']['object']
+    error = intent.get('last_payment_error') or {}
+    
+    result = db.session.execute(
+        pg_insert(PaymentEvent).values(
+            id=uuid.uuid4(),
+            event_id=event['id'],
+            event_type=event['type'],
+            payment_intent_id=intent.get('id'),
+            status='queued',
+            payload={
+                'amount': intent.get('amount'),
+                'currency': intent.get('currency'),
+                'status': intent.get('status'),
+                'error': error.get('message')
+            },
+            received_at=datetime.utcnow()
+        ).on_conflict_do_nothing(index_elements=[PaymentEvent.event_id])
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _matching_amounts(succeeded):
+    """Intents of succeeded whose charged amount is the donation's amount.
+    
+    Mismatched donations are left as they are, for manual review.
+    """
+    donations = db.session.query(Donation.transaction_id, Donation.amount).filter(
+        Donation.transaction_id.in_(list(succeeded)),
+        Donation.status.in_(['pending', 'failed'])
+    ).all()
+    matching = {}
+    for intent_id, amount in donations:
+        currency, charged = succeeded[intent_id]
+        if charged == amount_in_cents(amount):
+            matching[intent_id] = currency
+        else:
+            current_app.logger.warning(
+                f'Payment intent {intent_id} charged {charged} but its donation is {amount_in_cents(amount)}; not settled'
+            )
+    return matching
+
+
+def apply_payment_results(succeeded, failed):
+    """Settle pending donations from payment intent outcomes in bulk.
+    
+    succeeded maps intent id -> (currency, amount charged in cents),
+    failed maps intent id -> error message. A donation is only completed
+    when the charged amount matches it. A failed payment can still be
+    retried by the donor, so a later success also settles a donation
+    marked failed. Does not commit. Returns a Settlement.
+    """
+    now = datetime.utcnow()
+    campaign_ids = set()
+    completed_ids, failed_ids = set(), set()
+    
+    succeeded = _matching_amounts(succeeded) if succeeded else {}
+    if succeeded:
+        completed = db.session.execute(
+            update(Donation)
+            .where(
+                Donation.transaction_id.in_(list(succeeded)),
+                Donation.status.in_(['pending', 'failed'])
+            )
+            .values(status='completed', completed_at=now)
+            .returning(
+                Donation.id, Donation.campaign_id, Donation.donor_id,
+                Donation.amount, Donation.is_anonymous, Donation.transaction_id
+            )
+            .execution_options(synchronize_session=False)
+        ).all()
+        
+        if completed:
+            completed_ids.update(row.transaction_id for row in completed)
+            db.session.execute(insert(Transaction), [
+                {
+                    'donation_id': row.id,
+                    'payment_method': 'stripe',
+                    'transaction_reference': row.transaction_id,
+                    'amount': row.amount,
+                    'currency': (succeeded[row.transaction_id] or 'usd').upper(),
+                    'status': 'success',
+                    'created_at': now,
+                    'processed_at': now
+                }
+                for row in completed
+            ])
+            
+            campaign_amounts = defaultdict(float)
+            donor_amounts = defaultdict(float)
+            for row in completed:
+                campaign_amounts[row.campaign_id] += row.amount
+                if row.donor_id and not row.is_anonymous:
+                    donor_amounts[row.donor_id] += row.amount
+            
+            increment_campaign_funds_bulk(campaign_amounts)
+            increment_donor_totals_bulk(donor_amounts)
+            record_donation_rollups((row.campaign_id, row.amount, now) for row in completed)
+            campaign_ids.update(campaign_amounts)
+    
+    if failed:
+        rows = db.session.execute(
+            update(Donation)
+            .where(Donation.transaction_id.in_(list(failed)), Donation.status == 'pending')
+            .values(status='failed')
+            .returning(Donation.campaign_id, Donation.transaction_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        campaign_ids.update(row.campaign_id for row in rows)
+        failed_ids.update(row.transaction_id for row in rows)
+    
+    return Settlement(campaign_ids, completed_ids, failed_ids)
+
+
+def _outcomes(events):
+    """Collapse events into the final outcome per payment intent"""
+    succeeded = {}
+    failed = {}
+    for event in events:
+        payload = event.payload or {}
+        intent_id = event.payment_intent_id
+        if event.event_type in SUCCEEDED_EVENTS:
+            succeeded[intent_id] = (payload.get('currency'), payload.get('amount'))
+            failed.pop(intent_id, None)
+        elif event.event_type in FAILED_EVENTS and intent_id not in succeeded:
+            failed[intent_id] = payload.get('error')
+    return succeeded, failed
+
+
+def process_payment_events(batch_size=500):
+    """Apply one batch of queued events in a single transaction.
+    
+    Rows are claimed with FOR UPDATE SKIP LOCKED, so several workers can
+    drain the queue in parallel. If the batch fails, its events are
+    retried one by one and the offending ones are marked failed.
+    Returns the number of events handled.
+    """
+    events = PaymentEvent.query.filter_by(status='queued').order_by(
+        PaymentEvent.received_at
+    ).limit(batch_size).with_for_update(skip_locked=True).all()
+    
+    if not events:
+        db.session.commit()
+        return 0
+    
+    event_ids = [event.id for event in events]
+    
+    try:
+        campaign_ids = apply_payment_results(*_outcomes(events)).campaign_ids
+        _mark_processed(events)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        campaign_ids = _process_individually(event_ids)
+    
+    for campaign_id in campaign_ids:
+        response_cache.invalidate_campaign(campaign_id)
+    
+    return len(event_ids)
+
+
+def _mark_processed(events):
+    now = datetime.utcnow()
+    for event in events:
+        event.status = 'processed'
+        event.processed_at = now
+
+
+def _process_individually(event_ids):
+    campaign_ids = set()
+    for event_id in event_ids:
+        event = PaymentEvent.query.filter_by(id=event_id, status='queued').with_for_update(skip_locked=True).first()
+        if not event:
+            db.session.commit()
+            continue
+        try:
+            campaign_ids |= apply_payment_results(*_outcomes([event])).campaign_ids
+            _mark_processed([event])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            PaymentEvent.query.filter_by(id=event_id).update({
+                'status': 'failed',
+                'error_message': str(e),
+                'processed_at': datetime.utcnow()
+            })
+            db.session.commit()
+    return campaign_ids
@@ -0,0 +1,35 @@
+"""Process pools for CPU-heavy work
+
+A ProcessPoolExecutor inherited from a parent process (e.g. a pre-forking
+server such as gunicorn) is unusable in the child, so ProcessPool starts
+its executor lazily, once per process that submits work to it.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+class ProcessPool:
+    """A ProcessPoolExecutor started on first use in each process"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """Run fn(*args) in a worker process; returns a Future"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            executor = self._executor
+        return executor.submit(fn, *args)
+
+    def shutdown(self):
+        """Stop this process's workers (a parent's pool is only forgotten)"""
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown()
+            self._executor = None
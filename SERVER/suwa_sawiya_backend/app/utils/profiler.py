@@ -0,0 +1,217 @@
+"""On-demand request profiling
+
+Profiles a random PROFILE_SAMPLE_RATE fraction of requests, plus any
+request carrying a valid X-Profile-Token header. Admins obtain such tokens
+from POST /api/admin/profiling/token; they are HMAC-signed with an expiry,
+so a token cannot be forged or reused indefinitely.
+
+Each profiled request writes two files to PROFILE_DIR:
+- <id>.prof: cProfile stats, for pstats, snakeviz and similar tools
+- <id>.collapsed: collapsed stacks for flamegraph.pl or speedscope
+
+Once PROFILE_MAX_FILES profiles or PROFILE_MAX_BYTES are exceeded, the
+oldest are deleted. Requests that are not profiled only pay for one
+config lookup and, when sampling is on, one random number.
+"""
+import cProfile
+import hashlib
+import hmac
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from flask import current_app, g, request
+
+TOKEN_HEADER = 'X-Profile-Token'
+PROFILE_EXTENSIONS = ('.prof', '.collapsed')
+
+# Deeper call paths are folded into their ancestor in collapsed stacks
+MAX_STACK_DEPTH = 64
+
+_PROFILE_NAME = re.compile(r'^(\d+)-([0-9a-f]{8})-(\d+)ms-([\w.]+)$')
+
+
+def _signing_key():
+    key = current_app.config.get('PROFILER_SECRET') or current_app.config['SECRET_KEY']
+    return key.encode()
+
+
+def _sign(expires):
+    return hmac.new(_signing_key(), f'profile:{expires}'.encode(), hashlib.sha256).hexdigest()
+
+
+def create_profile_token(ttl):
+    """Token enabling profiling of requests that send it, valid for ttl seconds"""
+    expires = int(time.time()) + ttl
+    return f'{expires}.{_sign(expires)}', datetime.utcfromtimestamp(expires)
+
+
+def verify_profile_token(token):
+    """Whether a token is correctly signed and not expired"""
+    try:
+        expires, signature = token.split('.', 1)
+        expires = int(expires)
+    except (AttributeError, ValueError):
+        return False
+    return expires >= time.time() and hmac.compare_digest(signature, _sign(expires))
+
+
+def _frame_label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name  # Built-in functions
+    return f'{name} ({os.path.basename(filename)}:{line})'.replace(';', ',')
+
+
+def collapsed_stacks(stats):
+    """Collapsed stack lines ("a;b;c <microseconds>") from pstats data.
+
+    cProfile only records caller/callee pairs, so deeper paths are
+    estimated by splitting each function's time across its callers in
+    proportion to the time spent under each of them.
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge
+
+    folded = Counter()
+
+    def walk(func, stack, scale):
+        own_time, cumulative = stats[func][2], stats[func][3]
+        stack = stack + (_frame_label(func),)
+        folded[';'.join(stack)] += own_time * scale
+        for child, edge in callees.get(func, {}).items():
+            child_cumulative = stats[child][3]
+            # Skip recursion and subtrees too small to show up in a flame graph
+            if child_cumulative <= 0 or edge[3] * scale < 1e-6 or _frame_label(child) in stack:
+                continue
+            if len(stack) >= MAX_STACK_DEPTH:
+                # Charge the untraversed subtree to the deepest frame we keep
+                folded[';'.join(stack)] += edge[3] * scale
+                continue
+            walk(child, stack, scale * edge[3] / child_cumulative)
+
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            walk(func, (), 1.0)
+
+    return [f'{stack} {round(seconds * 1e6)}' for stack, seconds in folded.items() if seconds * 1e6 >= 1]
+
+
+def list_profiles(directory):
+    """Saved profiles, newest first"""
+    if not os.path.isdir(directory):
+        return []
+
+    profiles = []
+    for entry in os.scandir(directory):
+        stem, ext = os.path.splitext(entry.name)
+        match = _PROFILE_NAME.match(stem)
+        if ext != '.prof' or not match:
+            continue
+        timestamp, request_id, duration_ms, endpoint = match.groups()
+        profiles.append({
+            'id': stem,
+            'request_id': request_id,  # X-Profile-Id of the profiled response
+            'endpoint': endpoint,
+            'duration_ms': int(duration_ms),
+            'created_at': datetime.utcfromtimestamp(int(timestamp) / 1000).isoformat(),
+            'size': entry.stat().st_size,
+            'files': [stem + extension for extension in PROFILE_EXTENSIONS]
+        })
+    profiles.sort(key=lambda profile: profile['id'], reverse=True)
+    return profiles
+
+
+def rotate_profiles(directory, max_files, max_bytes):
+    """Delete the oldest profiles beyond max_files or max_bytes; returns the number removed"""
+    groups = {}
+    for entry in os.scandir(directory):
+        stem, ext = os.path.splitext(entry.name)
+        if ext in PROFILE_EXTENSIONS and _PROFILE_NAME.match(stem):
+            groups.setdefault(stem, []).append((entry.path, entry.stat().st_size))
+
+    # Stems start with a millisecond timestamp, so they sort oldest first
+    stems = sorted(groups)
+    total = sum(size for files in groups.values() for _, size in files)
+    removed = 0
+    while stems and (len(stems) > max_files or total > max_bytes):
+        for path, size in groups[stems.pop(0)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        removed += 1
+    return removed
+
+
+class RequestProfiler:
+    """Runs cProfile around sampled or token-bearing requests"""
+
+    def init_app(self, app):
+        app.extensions['profiler'] = self
+        if not app.config.get('PROFILER_ENABLED', True):
+            return
+        app.before_request(self._start)
+        app.after_request(self._tag_response)
+        app.teardown_request(self._finish)
+
+    @staticmethod
+    def _should_profile():
+        token = request.headers.get(TOKEN_HEADER)
+        if token is not None:
+            return verify_profile_token(token)
+        rate = current_app.config.get('PROFILE_SAMPLE_RATE', 0)
+        return rate > 0 and random.random() < rate
+
+    def _start(self):
+        if not self._should_profile():
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return  # Another profiler is active in this process
+        g.profiler = profiler
+        g.profile_id = uuid.uuid4().hex[:8]
+        g.profile_started = time.perf_counter()
+
+    @staticmethod
+    def _tag_response(response):
+        if 'profiler' in g:
+            response.headers['X-Profile-Id'] = g.profile_id
+        return response
+
+    @staticmethod
+    def _finish(exc):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        duration_ms = round((time.perf_counter() - g.pop('profile_started')) * 1000)
+
+        config = current_app.config
+        directory = config['PROFILE_DIR']
+        stem = f"{int(time.time() * 1000)}-{g.pop('profile_id')}-{duration_ms}ms-{request.endpoint or 'unmatched'}"
+        try:
+            os.makedirs(directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(directory, stem + '.prof'))
+            with open(os.path.join(directory, stem + '.collapsed'), 'w') as f:
+                f.write('\n'.join(collapsed_stacks(pstats.Stats(profiler).stats)) + '\n')
+            rotate_profiles(directory, config.get('PROFILE_MAX_FILES', 200), config.get('PROFILE_MAX_BYTES', 200 * 1024 * 1024))
+        except OSError as e:
+            current_app.logger.warning(f'Could not write profile {stem}: {e}')
+
+
+request_profiler = RequestProfiler()
+
+
+def init_profiler(app):
+    """Initialize request profiling with Flask app"""
+    request_profiler.init_app(app)
@@ -0,0 +1,217 @@
+"""Per-request SQL instrumentation
+
+SQLAlchemy engine events time every statement executed while a request is
+being handled. Each response can then report how many queries it ran and
+how long they took (X-DB-Query-Count / X-DB-Time-Ms when SQL_STATS_HEADERS
+is on), a statement repeated SQL_REPEATED_QUERY_THRESHOLD or more times in
+one request is logged as a likely N+1 pattern, and the totals are
+aggregated per endpoint for /api/admin/sql/stats.
+
+Views declare how many queries they may run with @query_budget(n).
+Exceeding the budget is logged; with SQL_STRICT_BUDGETS (on in testing) it
+raises QueryBudgetExceeded so the regression fails the test that made the
+request. Periodic bookkeeping that merely happens to run inside some
+request (e.g. refreshing an in-process cache) is wrapped in unattributed()
+so it does not count against that request's budget.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from app.models import db
+
+# Distinct repeated statements remembered per endpoint
+MAX_REPEATED_STATEMENTS = 20
+
+
+class QueryBudgetExceeded(Exception):
+    """A view ran more queries than its budget allows (strict mode only)"""
+
+
+def query_budget(max_queries):
+    """Decorator declaring the most queries a view may run per request"""
+    def decorator(f):
+        # functools.wraps copies __dict__, so the budget survives the other decorators
+        f.query_budget = max_queries
+        return f
+    return decorator
+
+
+@contextmanager
+def unattributed():
+    """Run statements without attributing them to the current request"""
+    if not has_request_context() or 'sql_queries' not in g:
+        yield
+        return
+    queries = g.pop('sql_queries')
+    try:
+        yield
+    finally:
+        g.sql_queries = queries
+
+
+class RequestQueries:
+    """SQL executed while handling one request"""
+
+    __slots__ = ('count', 'duration', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated(self, threshold):
+        """[(statement, times)] run at least `threshold` times, most frequent first"""
+        return [(statement, times) for statement, times in self.statements.most_common() if times >= threshold]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_started', None)
+    if started is None:
+        return
+    # Only statements run on behalf of a request are attributed to it
+    queries = g.get('sql_queries') if has_request_context() else None
+    if queries is not None:
+        queries.record(statement, time.perf_counter() - started)
+
+
+class QueryStats:
+    """Counts and times SQL per request and aggregates it per endpoint"""
+
+    def __init__(self):
+        self.enabled = False
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SQL_STATS_ENABLED', True)
+        app.extensions['query_stats'] = self
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    @staticmethod
+    def _start_request():
+        g.sql_queries = RequestQueries()
+
+    def _finish_request(self, response):
+        # Streamed bodies run their queries later; those are not attributed
+        queries = g.pop('sql_queries', None)
+        if queries is None:
+            return response
+
+        config = current_app.config
+        endpoint = request.endpoint or 'unmatched'
+        budget = getattr(current_app.view_functions.get(request.endpoint), 'query_budget', None)
+        if budget is None:
+            budget = config.get('SQL_QUERY_BUDGET')
+        over_budget = budget is not None and queries.count > budget
+        repeated = queries.repeated(config.get('SQL_REPEATED_QUERY_THRESHOLD', 5))
+
+        self._record(endpoint, queries, budget, over_budget, repeated)
+
+        for statement, times in repeated:
+            current_app.logger.warning(
+                f'Possible N+1 in {endpoint}: statement ran {times} times: {" ".join(statement.split())[:200]}'
+            )
+
+        if config.get('SQL_STATS_HEADERS'):
+            response.headers['X-DB-Query-Count'] = str(queries.count)
+            response.headers['X-DB-Time-Ms'] = f'{queries.duration * 1000:.2f}'
+            if repeated:
+                response.headers['X-DB-Repeated-Queries'] = str(sum(times for _, times in repeated))
+
+        if over_budget:
+            message = f'{endpoint} ran {queries.count} queries, budget is {budget}'
+            if config.get('SQL_STRICT_BUDGETS'):
+                raise QueryBudgetExceeded(message)
+            current_app.logger.warning(message)
+
+        return response
+
+    def _record(self, endpoint, queries, budget, over_budget, repeated):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'db_time': 0.0,
+                'max_db_time': 0.0,
+                'budget': budget,
+                'over_budget': 0,
+                'n_plus_one': 0,
+                'repeated_statements': Counter()
+            })
+            stats['requests'] += 1
+            stats['queries'] += queries.count
+            stats['max_queries'] = max(stats['max_queries'], queries.count)
+            stats['db_time'] += queries.duration
+            stats['max_db_time'] = max(stats['max_db_time'], queries.duration)
+            stats['budget'] = budget
+            stats['over_budget'] += over_budget
+            if repeated:
+                stats['n_plus_one'] += 1
+                seen = stats['repeated_statements']
+                for statement, times in repeated:
+                    if statement in seen or len(seen) < MAX_REPEATED_STATEMENTS:
+                        seen[statement] = max(seen[statement], times)
+
+    def stats(self):
+        """Per-endpoint query counts and DB time for this process, busiest first"""
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in self._endpoints.items():
+                requests = stats['requests']
+                endpoints[endpoint] = {
+                    'requests': requests,
+                    'queries': stats['queries'],
+                    'avg_queries': round(stats['queries'] / requests, 2),
+                    'max_queries': stats['max_queries'],
+                    'avg_db_time_ms': round(stats['db_time'] * 1000 / requests, 3),
+                    'max_db_time_ms': round(stats['max_db_time'] * 1000, 3),
+                    'budget': stats['budget'],
+                    'over_budget': stats['over_budget'],
+                    'n_plus_one': stats['n_plus_one'],
+                    'repeated_statements': [
+                        {'statement': statement, 'max_times': times}
+                        for statement, times in stats['repeated_statements'].most_common()
+                    ]
+                }
+
+        return {
+            'enabled': self.enabled,
+            'requests': sum(e['requests'] for e in endpoints.values()),
+            'queries': sum(e['queries'] for e in endpoints.values()),
+            'endpoints': dict(sorted(endpoints.items(), key=lambda item: -item[1]['queries']))
+        }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+query_stats = QueryStats()
+
+
+def init_query_stats(app):
+    """Initialize SQL instrumentation with Flask app"""
+    query_stats.init_app(app)
@@ -0,0 +1,176 @@
+"""Reconciliation of pending donations against the payment gateway
+
+Catches donations whose webhook events never arrived (or were never
+processed). Pending donations are walked in bounded keyset batches. Each
+batch is split into time windows of at most MAX_WINDOW_SECONDS, and the
+gateway's payment intents created in each window are listed page by page
+instead of being retrieved one by one. A window full of other intents
+would cost more list pages than it saves, so listing stops as soon as it
+has made as many calls as there are intents left to find, and those are
+retrieved individually. Outcomes are applied with the same set-based
+settlement as the webhook worker.
+"""
+import calendar
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import tuple_
+from app.models import db
+from app.models.campaign import Donation
+from app.utils.cache import response_cache
+from app.utils.payment import list_payment_intents, verify_payment_intent
+from app.utils.payment_events import apply_payment_results
+
+# Intents are created just before their donation row; allow for clock skew
+INTENT_WINDOW_SKEW = 300  # seconds
+GATEWAY_PAGE_SIZE = 100
+# Longest span of donation creation times listed from the gateway at once
+MAX_WINDOW_SECONDS = 3600
+# Donations still unpaid this long after creation are marked failed
+ABANDON_AFTER = 2 * 24 * 3600  # seconds
+
+
+def _timestamp(value):
+    return calendar.timegm(value.utctimetuple())
+
+
+def _windows(batch):
+    """Split a batch (ordered by created_at) into runs spanning at most MAX_WINDOW_SECONDS"""
+    window = [batch[0]]
+    for row in batch[1:]:
+        if (row.created_at - window[0].created_at).total_seconds() > MAX_WINDOW_SECONDS:
+            yield window
+            window = []
+        window.append(row)
+    yield window
+
+
+def _record_outcome(outcomes, intent):
+    if intent['status'] == 'succeeded':
+        outcomes['succeeded'][intent['id']] = (intent['currency'], intent['amount'])
+    elif intent['status'] == 'canceled':
+        outcomes['canceled'][intent['id']] = 'Payment canceled'
+    else:
+        outcomes['unpaid'].add(intent['id'])
+
+
+def list_intent_outcomes(intent_ids, created_gte, created_lte):
+    """Final states of the given intents, listed from the gateway in bulk.
+    
+    Intents not found by listing (the window holds mostly other intents, or
+    they fall outside it) are retrieved one by one. Intents the gateway does
+    not know are left out. Returns (succeeded {id: (currency, amount)},
+    canceled {id: message}, unpaid ids, gateway calls made).
+    """
+    wanted = set(intent_ids)
+    outcomes = {'succeeded': {}, 'canceled': {}, 'unpaid': set()}
+    starting_after = None
+    calls = 0
+    
+    # Stop once listing has cost as much as retrieving what is left would
+    while wanted and calls < len(wanted):
+        page, error = list_payment_intents(
+            created_gte=created_gte, created_lte=created_lte,
+            starting_after=starting_after, limit=GATEWAY_PAGE_SIZE
+        )
+        calls += 1
+        if error:
+            raise RuntimeError(f'Listing payment intents failed: {error}')
+        
+        for intent in page['data']:
+            if intent['id'] in wanted:
+                wanted.discard(intent['id'])
+                _record_outcome(outcomes, intent)
+        
+        if not page['has_more'] or not page['data']:
+            break
+        starting_after = page['data'][-1]['id']
+    
+    for intent_id in sorted(wanted):
+        intent, error = verify_payment_intent(intent_id)
+        calls += 1
+        if error:
+            raise RuntimeError(f'Retrieving payment intent {intent_id} failed: {error}')
+        if intent:
+            _record_outcome(outcomes, intent)
+    
+    return outcomes['succeeded'], outcomes['canceled'], outcomes['unpaid'], calls
+
+
+def reconcile_pending_donations(batch_size=500, min_age=300, abandon_after=ABANDON_AFTER):
+    """Settle pending donations older than min_age seconds from gateway state.
+    
+    Donations still unpaid after abandon_after seconds are marked failed
+    (pass None or 0 to keep them pending). Each batch is committed on its
+    own. Returns a dict of throughput and lag statistics.
+    """
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=min_age)
+    abandon_before = now - timedelta(seconds=abandon_after) if abandon_after else None
+    
+    stats = {
+        'scanned': 0, 'completed': 0, 'failed': 0, 'still_pending': 0,
+        'batches': 0, 'gateway_calls': 0, 'max_lag_seconds': 0.0, 'total_lag_seconds': 0.0
+    }
+    position = None
+    
+    while True:
+        query = db.session.query(Donation.id, Donation.transaction_id, Donation.created_at).filter(
+            Donation.status == 'pending',
+            Donation.transaction_id.isnot(None),
+            Donation.created_at < cutoff
+        )
+        if position:
+            query = query.filter(tuple_(Donation.created_at, Donation.id) > position)
+        batch = query.order_by(Donation.created_at, Donation.id).limit(batch_size).all()
+        
+        if not batch:
+            break
+        position = (batch[-1].created_at, batch[-1].id)
+        stats['batches'] += 1
+        stats['scanned'] += len(batch)
+        
+        succeeded, failed = {}, {}
+        for window in _windows(batch):
+            window_succeeded, canceled, unpaid, calls = list_intent_outcomes(
+                [row.transaction_id for row in window],
+                created_gte=_timestamp(window[0].created_at) - INTENT_WINDOW_SKEW,
+                created_lte=_timestamp(window[-1].created_at) + INTENT_WINDOW_SKEW
+            )
+            stats['gateway_calls'] += calls
+            succeeded.update(window_succeeded)
+            failed.update(canceled)
+            if abandon_before:
+                for row in window:
+                    if row.transaction_id in unpaid and row.created_at < abandon_before:
+                        failed[row.transaction_id] = 'Payment abandoned'
+        
+        settlement = apply_payment_results(succeeded, failed)
+        db.session.commit()
+        
+        for campaign_id in settlement.campaign_ids:
+            response_cache.invalidate_campaign(campaign_id)
+        
+        # Count what was actually settled: amount mismatches stay pending,
+        # and a webhook may have settled a donation since it was read
+        settled_ids = settlement.completed | settlement.failed
+        settled_at = datetime.utcnow()
+        for row in batch:
+            if row.transaction_id in settled_ids:
+                lag = (settled_at - row.created_at).total_seconds()
+                stats['total_lag_seconds'] += lag
+                stats['max_lag_seconds'] = max(stats['max_lag_seconds'], lag)
+        stats['completed'] += len(settlement.completed)
+        stats['failed'] += len(settlement.failed)
+        stats['still_pending'] += len(batch) - len(settled_ids)
+        
+        if len(batch) < batch_size:
+            break
+    
+    elapsed = time.perf_counter() - started
+    settled = stats['completed'] + stats['failed']
+    stats['elapsed_seconds'] = round(elapsed, 3)
+    stats['donations_per_second'] = round(stats['scanned'] / elapsed, 1) if elapsed else 0.0
+    stats['avg_lag_seconds'] = round(stats.pop('total_lag_seconds') / settled, 1) if settled else 0.0
+    stats['max_lag_seconds'] = round(stats['max_lag_seconds'], 1)
+    return stats
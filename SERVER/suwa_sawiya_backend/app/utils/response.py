@@ -22,8 +22,12 @@ def error_response(message='Error', status_code=400, data=None):
     return jsonify(response), status_code
 
 
-def paginated_response(items, total, page, per_page, message='Success'):
-    """Format paginated response"""
+def paginated_response(items, total, page, per_page, message='Success', has_more=None, next_cursor=None):
+    """Format paginated response
+    
+    total is None when the client asked for include_total=false; page is
+    None in cursor mode, where next_cursor fetches the following page.
+    """
     response = {
         'success': True,
         'message': message,
@@ -32,7 +36,9 @@ def paginated_response(items, total, page, per_page, message='Success'):
             'total': total,
             'page': page,
             'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
+            'total_pages': (total + per_page - 1) // per_page if total is not None else None,
+            'has_more': has_more if has_more is not None else page * per_page < total,
+            'next_cursor': next_cursor
         }
     }
     return jsonify(response), 200
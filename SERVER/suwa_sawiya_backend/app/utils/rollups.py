@@ -0,0 +1,188 @@
+"""Hourly and daily donation rollups for time-series analytics
+
+Settling a donation adds it to the hour and day buckets of its campaign
+(record_donation_rollups), and backfill_rollups() rebuilds any range
+exactly from the donations table. Analytics queries read only the
+rollups, so their cost depends on the number of buckets requested, not
+on the number of donations.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import func, select, delete, literal, text
+from sqlalchemy.dialects.postgresql import insert
+from app.models import db
+from app.models.campaign import Campaign, Donation, DonationRollup
+
+GRANULARITIES = ('hour', 'day')
+# Coarser granularities are served by re-bucketing the daily rollups
+QUERY_GRANULARITIES = ('hour', 'day', 'week', 'month')
+GROUP_BY_COLUMNS = {
+    'campaign': DonationRollup.campaign_id,
+    'category': DonationRollup.category,
+    'urgency': DonationRollup.urgency
+}
+# Upper bound on the buckets one query may return, which bounds its cost
+MAX_BUCKETS = 2000
+
+
+def bucket_start(timestamp, granularity):
+    """Start of the hour or day bucket containing timestamp"""
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def record_donation_rollups(donations):
+    """Add completed donations to their rollup buckets; does not commit.
+    
+    donations is an iterable of (campaign_id, amount, completed_at).
+    """
+    buckets = defaultdict(lambda: [0, 0.0])
+    for campaign_id, amount, completed_at in donations:
+        for granularity in GRANULARITIES:
+            bucket = buckets[(granularity, bucket_start(completed_at, granularity), campaign_id)]
+            bucket[0] += 1
+            bucket[1] += amount
+    
+    if not buckets:
+        return
+    
+    campaign_ids = {campaign_id for _, _, campaign_id in buckets}
+    campaigns = dict(
+        (row.id, row) for row in db.session.query(Campaign.id, Campaign.category, Campaign.urgency)
+        .filter(Campaign.id.in_(campaign_ids))
+    )
+    
+    # Rows are written in key order so concurrent settlements cannot deadlock
+    stmt = insert(DonationRollup).values([
+        {
+            'granularity': granularity,
+            'bucket_start': start,
+            'campaign_id': campaign_id,
+            'category': campaigns[campaign_id].category if campaign_id in campaigns else None,
+            'urgency': campaigns[campaign_id].urgency if campaign_id in campaigns else None,
+            'donation_count': count,
+            'amount': amount
+        }
+        for (granularity, start, campaign_id), (count, amount) in sorted(buckets.items(), key=lambda i: str(i[0]))
+    ])
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[DonationRollup.granularity, DonationRollup.bucket_start, DonationRollup.campaign_id],
+        set_={
+            'donation_count': DonationRollup.donation_count + stmt.excluded.donation_count,
+            'amount': DonationRollup.amount + stmt.excluded.amount
+        }
+    ))
+
+
+def backfill_rollups(start=None, end=None):
+    """Rebuild the rollups for [start, end) from completed donations and commit.
+    
+    The range is widened to whole days. Without bounds every rollup is
+    rebuilt. Settlements that write rollups wait until the rebuild commits.
+    Returns the number of rollup rows written.
+    """
+    if start:
+        start = bucket_start(start, 'day')
+    if end:
+        day = bucket_start(end, 'day')
+        end = day if day == end else day + timedelta(days=1)
+    
+    # Conflicts with the ROW EXCLUSIVE lock of record_donation_rollups: a
+    # settlement that already wrote its rollups commits before the rebuild
+    # reads the donations (so it is counted once, by the rebuild), and one
+    # that has not waits for the rebuild to commit (and then adds itself)
+    db.session.execute(text(f'LOCK TABLE {DonationRollup.__tablename__} IN SHARE ROW EXCLUSIVE MODE'))
+    
+    cleared = delete(DonationRollup)
+    if start:
+        cleared = cleared.where(DonationRollup.bucket_start >= start)
+    if end:
+        cleared = cleared.where(DonationRollup.bucket_start < end)
+    db.session.execute(cleared)
+    
+    written = 0
+    for granularity in GRANULARITIES:
+        bucket = func.date_trunc(granularity, Donation.completed_at)
+        rows = select(
+            literal(granularity),
+            bucket,
+            Donation.campaign_id,
+            Campaign.category,
+            Campaign.urgency,
+            func.count(Donation.id),
+            func.sum(Donation.amount)
+        ).join(Campaign, Campaign.id == Donation.campaign_id).where(
+            Donation.status == 'completed',
+            Donation.completed_at.isnot(None)
+        ).group_by(bucket, Donation.campaign_id, Campaign.category, Campaign.urgency)
+        
+        if start:
+            rows = rows.where(Donation.completed_at >= start)
+        if end:
+            rows = rows.where(Donation.completed_at < end)
+        
+        # The range was cleared and no settlement can write into it, so
+        # every bucket is inserted fresh
+        result = db.session.execute(insert(DonationRollup).from_select(
+            ['granularity', 'bucket_start', 'campaign_id', 'category', 'urgency', 'donation_count', 'amount'],
+            rows
+        ))
+        written += result.rowcount
+    
+    db.session.commit()
+    return written
+
+
+def donation_time_series(start, end, granularity='day', group_by=None, filters=None):
+    """Donation counts and amounts per bucket in [start, end), read from the rollups.
+    
+    Returns (series, error) where series is a list of
+    {bucket_start, [group,] donation_count, amount} ordered by bucket.
+    """
+    if granularity not in QUERY_GRANULARITIES:
+        return None, f'granularity must be one of: {", ".join(QUERY_GRANULARITIES)}'
+    if group_by is not None and group_by not in GROUP_BY_COLUMNS:
+        return None, f'group_by must be one of: {", ".join(GROUP_BY_COLUMNS)}'
+    if end <= start:
+        return None, 'end must be after start'
+    
+    step = timedelta(hours=1) if granularity == 'hour' else timedelta(days=1)
+    if (end - start) / step > MAX_BUCKETS:
+        return None, f'Range too large for {granularity} granularity (max {MAX_BUCKETS} buckets)'
+    
+    source = 'hour' if granularity == 'hour' else 'day'
+    bucket = DonationRollup.bucket_start if granularity == source else func.date_trunc(granularity, DonationRollup.bucket_start)
+    
+    columns = [bucket.label('bucket_start')]
+    group_columns = [bucket]
+    if group_by:
+        columns.append(GROUP_BY_COLUMNS[group_by].label('group'))
+        group_columns.append(GROUP_BY_COLUMNS[group_by])
+    
+    query = db.session.query(
+        *columns,
+        func.sum(DonationRollup.donation_count).label('donation_count'),
+        func.sum(DonationRollup.amount).label('amount')
+    ).filter(
+        DonationRollup.granularity == source,
+        DonationRollup.bucket_start >= start,
+        DonationRollup.bucket_start < end
+    )
+    
+    for name, value in (filters or {}).items():
+        if value is not None:
+            query = query.filter(GROUP_BY_COLUMNS[name] == value)
+    
+    rows = query.group_by(*group_columns).order_by(*group_columns).all()
+    
+    series = []
+    for row in rows:
+        point = {'bucket_start': row.bucket_start.isoformat()}
+        if group_by:
+            point[group_by] = str(row.group) if group_by == 'campaign' else row.group
+        point['donation_count'] = int(row.donation_count)
+        point['amount'] = float(row.amount)
+        series.append(point)
+    
+    return series, None
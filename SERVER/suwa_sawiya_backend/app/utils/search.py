@@ -0,0 +1,69 @@
+"""Full-text search utilities for campaigns"""
+from html import escape
+from sqlalchemy import func
+from app.models.campaign import Campaign
+
+# Text search configuration used by Campaign.search_vector
+SEARCH_CONFIG = 'english'
+
+# ts_headline copies the source text verbatim (including any HTML in it),
+# so matches are delimited with plain-text markers and the result is
+# HTML-escaped before the markers become <mark> tags
+MARK_START = '[[[mark:'
+MARK_STOP = ':mark]]]'
+
+SNIPPET_OPTIONS = f'StartSel="{MARK_START}", StopSel="{MARK_STOP}", MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=" ... "'
+TITLE_OPTIONS = f'StartSel="{MARK_START}", StopSel="{MARK_STOP}", HighlightAll=true'
+
+
+def parse_search_query(search_query):
+    """Build a tsquery from free-form user input (quotes, OR and -negation supported)"""
+    return func.websearch_to_tsquery(SEARCH_CONFIG, search_query)
+
+
+def search_campaigns_query(query, search_query):
+    """Restrict a campaign query to full-text matches.
+    
+    Returns (filtered_query, ranked_query). The filtered query selects only
+    Campaign rows and is suitable for counting; the ranked query adds the
+    relevance rank and highlighted snippets and is ordered best match first.
+    """
+    ts_query = parse_search_query(search_query)
+    filtered = query.filter(Campaign.search_vector.op('@@')(ts_query))
+    
+    # Normalization 32 scales the rank into 0..1 (rank / (rank + 1))
+    rank = func.ts_rank_cd(Campaign.search_vector, ts_query, 32)
+    title_highlight = func.ts_headline(SEARCH_CONFIG, Campaign.title, ts_query, TITLE_OPTIONS)
+    snippet = func.ts_headline(
+        SEARCH_CONFIG,
+        func.concat_ws(' ', Campaign.beneficiary_medical_condition, Campaign.description),
+        ts_query,
+        SNIPPET_OPTIONS
+    )
+    
+    ranked = filtered.add_columns(
+        rank.label('rank'),
+        title_highlight.label('title_highlight'),
+        snippet.label('snippet')
+    ).order_by(rank.desc(), Campaign.created_at.desc(), Campaign.id.desc())
+    
+    return filtered, ranked
+
+
+def highlight_html(headline):
+    """HTML for a ts_headline result: escaped text with matches in <mark>"""
+    if headline is None:
+        return None
+    return escape(headline).replace(MARK_START, '<mark>').replace(MARK_STOP, '</mark>')
+
+
+def search_result_to_dict(row):
+    """Serialize a (Campaign, rank, title_highlight, snippet) search row"""
+    campaign, rank, title_highlight, snippet = row
+    data = campaign.to_dict()
+    data['search_rank'] = round(rank, 4)
+    data['highlights'] = {
+        'title': highlight_html(title_highlight),
+        'snippet': highlight_html(snippet)
+    }
+    return data
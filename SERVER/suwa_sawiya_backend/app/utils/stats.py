@@ -0,0 +1,113 @@
+"""Admin dashboard statistics"""
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, select
+from app.models import db
+from app.models.user import User
+from app.models.campaign import Campaign, Donation
+from app.models.other import Disbursement, FraudReport
+from app.utils.cache import response_cache
+
+DASHBOARD_STATS_KEY = 'stats:admin_dashboard'
+RECENT_CAMPAIGNS = 5
+
+
+def compute_dashboard_stats():
+    """Exact dashboard statistics from one aggregate query plus the recent campaigns.
+    
+    Each table is scanned once: per-type and per-status counts come from
+    FILTER clauses, and user counts read only the users table instead of
+    the joined-inheritance subclass tables.
+    """
+    users = select(
+        func.count().label('total'),
+        func.count().filter(User.user_type == 'donor').label('donors'),
+        func.count().filter(User.user_type == 'partner').label('partners')
+    ).select_from(User.__table__).subquery()
+    
+    campaigns = select(
+        func.count().label('total'),
+        func.count().filter(Campaign.status == 'approved').label('approved'),
+        func.count().filter(Campaign.status == 'pending').label('pending'),
+        func.coalesce(func.sum(Campaign.funds_raised), 0).label('funds_raised')
+    ).select_from(Campaign.__table__).subquery()
+    
+    donations = select(
+        func.count().label('completed')
+    ).select_from(Donation.__table__).where(Donation.status == 'completed').subquery()
+    
+    fraud_reports = select(
+        func.count().label('pending')
+    ).select_from(FraudReport.__table__).where(FraudReport.status == 'pending').subquery()
+    
+    disbursements = select(
+        func.count().label('pending')
+    ).select_from(Disbursement.__table__).where(Disbursement.status == 'pending').subquery()
+    
+    row = db.session.execute(
+        select(
+            users.c.total.label('total_users'),
+            users.c.donors,
+            users.c.partners,
+            campaigns.c.total.label('total_campaigns'),
+            campaigns.c.approved,
+            campaigns.c.pending,
+            campaigns.c.funds_raised,
+            donations.c.completed,
+            fraud_reports.c.pending.label('pending_fraud_reports'),
+            disbursements.c.pending.label('pending_disbursements')
+        ).select_from(users).join(campaigns, db.true()).join(donations, db.true())
+        .join(fraud_reports, db.true()).join(disbursements, db.true())
+    ).one()
+    
+    recent_campaigns = Campaign.query.order_by(Campaign.created_at.desc()).limit(RECENT_CAMPAIGNS).all()
+    
+    return {
+        'users': {
+            'total': row.total_users,
+            'donors': row.donors,
+            'partners': row.partners
+        },
+        'campaigns': {
+            'total': row.total_campaigns,
+            'approved': row.approved,
+            'pending': row.pending,
+            'total_funds_raised': row.funds_raised
+        },
+        'donations': {
+            'total': row.completed,
+            'average_amount': row.funds_raised / row.completed if row.completed > 0 else 0
+        },
+        'pending_items': {
+            'fraud_reports': row.pending_fraud_reports,
+            'disbursement_requests': row.pending_disbursements
+        },
+        'recent_campaigns': [c.to_dict() for c in recent_campaigns],
+        'generated_at': datetime.utcnow().isoformat()
+    }
+
+
+def get_dashboard_stats(refresh=False):
+    """Dashboard statistics, served from the cache for DASHBOARD_STATS_TTL seconds.
+    
+    refresh=True recomputes them exactly and replaces the cached copy.
+    """
+    backend = response_cache.backend
+    
+    if backend is not None and not refresh:
+        try:
+            stats = backend.get(DASHBOARD_STATS_KEY)
+            if stats is not None:
+                return stats
+        except Exception as e:
+            current_app.logger.warning(f'Cache read failed: {e}')
+    
+    stats = compute_dashboard_stats()
+    
+    if backend is not None:
+        try:
+            backend.set(DASHBOARD_STATS_KEY, stats, current_app.config['DASHBOARD_STATS_TTL'])
+        except Exception as e:
+            current_app.logger.warning(f'Cache write failed: {e}')
+    
+    return stats
@@ -0,0 +1,27 @@
+"""Rebuild hourly/daily donation rollups from the donations table
+
+Rebuild everything:       python backfill_rollups.py
+Rebuild a date range:     python backfill_rollups.py 2024-01-01 2024-02-01
+
+The range is [start, end), widened to whole days.
+"""
+import os
+import sys
+from datetime import datetime
+from app import create_app
+from app.utils.rollups import backfill_rollups
+
+
+def backfill(start=None, end=None):
+    """Rebuild rollups for the given range (or all of them)"""
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+    with app.app_context():
+        written = backfill_rollups(start, end)
+        print(f"Wrote {written} rollup row(s)"
+              f"{f' from {start.date()}' if start else ''}{f' until {end.date()}' if end else ''}")
+
+
+if __name__ == '__main__':
+    args = [datetime.fromisoformat(arg) for arg in sys.argv[1:3]]
+    backfill(*args)
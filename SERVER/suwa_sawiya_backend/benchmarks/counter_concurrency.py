@@ -0,0 +1,169 @@
+"""Concurrency benchmark for settling donations into campaign and donor totals
+
+Settles N pending donations to one hot campaign (all from one donor) from
+many workers at once, through the same code the payment webhook pipeline
+uses, and checks that Campaign.funds_raised and Donor.total_donated end up
+exactly N * amount:
+
+  apply   each worker settles batches with apply_payment_results()
+  events  the succeeded events are queued and the workers drain the queue
+          with process_payment_events()
+
+Each mode runs with the campaign unsharded and with fund counter shards.
+
+    python benchmarks/counter_concurrency.py --donations 2000 --concurrency 16
+    python benchmarks/counter_concurrency.py --mode events --shards 0 4 16
+    python benchmarks/counter_concurrency.py --batch-size 1   # one donation per transaction
+
+Requires a PostgreSQL database for FLASK_ENV (default: testing). The
+benchmark campaign, donor and donations are removed afterwards.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from app import create_app
+from app.models import db
+from app.models.user import Donor
+from app.models.campaign import Campaign, Donation
+from app.models.other import Transaction, PaymentEvent
+from app.utils.counters import compact_fund_shards
+from app.utils.payment import amount_in_cents
+from app.utils.payment_events import apply_payment_results, process_payment_events
+
+
+def settle_batch(app, intent_ids, cents):
+    with app.app_context():
+        apply_payment_results({intent_id: ('usd', cents) for intent_id in intent_ids}, {})
+        db.session.commit()
+
+
+def drain_queue(app, batch_size):
+    with app.app_context():
+        processed = 0
+        while True:
+            batch = process_payment_events(batch_size)
+            if not batch:
+                return processed
+            processed += batch
+
+
+def setup(app, args, shards):
+    """Create the campaign, donor and pending donations; returns their ids"""
+    with app.app_context():
+        campaign = Campaign(
+            title='Counter benchmark',
+            category='emergency',
+            urgency='critical',
+            target_amount=args.donations * args.amount,
+            funds_raised=0,
+            counter_shards=shards,
+            beneficiary_name='Benchmark',
+            status='approved'
+        )
+        donor = Donor(email=f'counter-benchmark-{uuid.uuid4().hex}@example.com', password_hash='x', total_donated=0)
+        db.session.add_all([campaign, donor])
+        db.session.flush()
+
+        intent_ids = [f'pi_counter_benchmark_{uuid.uuid4().hex}' for _ in range(args.donations)]
+        db.session.execute(insert(Donation), [
+            {
+                'campaign_id': campaign.id, 'donor_id': donor.id, 'amount': args.amount,
+                'status': 'pending', 'transaction_id': intent_id
+            }
+            for intent_id in intent_ids
+        ])
+        if args.mode == 'events':
+            now = datetime.utcnow()
+            db.session.execute(insert(PaymentEvent), [
+                {
+                    'id': uuid.uuid4(), 'event_id': f'evt_{intent_id}', 'event_type': 'payment_intent.succeeded',
+                    'payment_intent_id': intent_id, 'status': 'queued', 'received_at': now,
+                    'payload': {'amount': amount_in_cents(args.amount), 'currency': 'usd', 'status': 'succeeded'}
+                }
+                for intent_id in intent_ids
+            ])
+        db.session.commit()
+        return campaign.id, donor.id, intent_ids
+
+
+def teardown(app, campaign_id, donor_id, intent_ids):
+    with app.app_context():
+        donation_ids = db.session.query(Donation.id).filter_by(campaign_id=campaign_id)
+        Transaction.query.filter(Transaction.donation_id.in_(donation_ids)).delete(synchronize_session=False)
+        PaymentEvent.query.filter(PaymentEvent.payment_intent_id.in_(intent_ids)).delete(synchronize_session=False)
+        Donation.query.filter_by(campaign_id=campaign_id).delete()
+        Campaign.query.filter_by(id=campaign_id).delete()
+        db.session.delete(db.session.get(Donor, donor_id))
+        db.session.commit()
+
+
+def run(app, args, shards):
+    """Settle every donation concurrently; returns True if no increment was lost"""
+    campaign_id, donor_id, intent_ids = setup(app, args, shards)
+    cents = amount_in_cents(args.amount)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        if args.mode == 'apply':
+            batches = [intent_ids[i:i + args.batch_size] for i in range(0, len(intent_ids), args.batch_size)]
+            futures = [pool.submit(settle_batch, app, batch, cents) for batch in batches]
+        else:
+            futures = [pool.submit(drain_queue, app, args.batch_size) for _ in range(args.concurrency)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    try:
+        with app.app_context():
+            compact_fund_shards()
+            funds_raised = db.session.get(Campaign, campaign_id).funds_raised
+            total_donated = db.session.get(Donor, donor_id).total_donated
+            completed = Donation.query.filter_by(campaign_id=campaign_id, status='completed').count()
+    finally:
+        teardown(app, campaign_id, donor_id, intent_ids)
+
+    expected = args.donations * args.amount
+    print(f"Mode:            {args.mode}, {f'{shards} shards' if shards else 'unsharded'}")
+    print(f"Settlements:     {args.donations} in batches of {args.batch_size} with {args.concurrency} workers")
+    print(f"Elapsed:         {elapsed:.2f}s ({args.donations / elapsed:.0f} donations/s)")
+    print(f"Completed:       {completed}/{args.donations}")
+    print(f"funds_raised:    {funds_raised:.2f} (expected {expected:.2f})")
+    print(f"total_donated:   {total_donated:.2f} (expected {expected:.2f})")
+    print(f"Lost increments: {round((expected - funds_raised) / args.amount)} campaign, "
+          f"{round((expected - total_donated) / args.amount)} donor")
+    print()
+
+    return completed == args.donations and abs(funds_raised - expected) < 1e-6 and abs(total_donated - expected) < 1e-6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--donations', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=20, help='donations settled per transaction')
+    parser.add_argument('--amount', type=float, default=1.0)
+    parser.add_argument('--mode', choices=['apply', 'events'], nargs='+', default=['apply', 'events'])
+    parser.add_argument('--shards', type=int, nargs='+', default=[0, 16],
+                        help='fund counter shards of the campaign (0 = direct increments)')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'testing'))
+    ok = True
+
+    for mode in args.mode:
+        for shards in args.shards:
+            ok &= run(app, argparse.Namespace(**{**vars(args), 'mode': mode}), shards)
+
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Load test for the payment webhook pipeline using the fake gateway
+
+Creates N pending donations backed by fake payment intents, settles them
+on the fake gateway, delivers the signed webhook events concurrently and
+then drains the event queue, checking that campaign totals match the
+succeeded payments. No network access to Stripe is needed.
+
+    python benchmarks/fake_gateway_events.py --donations 5000 --concurrency 32
+    python benchmarks/fake_gateway_events.py --duplicates 0.2   # redeliveries
+    python benchmarks/fake_gateway_events.py --url http://localhost:5000
+
+Without --url, events are posted in-process through the Flask test client.
+With --url, the server must run with the same PAYMENT_GATEWAY=fake,
+FAKE_GATEWAY_PATH, STRIPE_WEBHOOK_SECRET and database.
+
+Requires a PostgreSQL database for FLASK_ENV (default: testing). The
+benchmark campaign and its donations are removed afterwards.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from app import create_app
+from app.models import db
+from app.models.campaign import Campaign, Donation
+from app.models.other import Transaction, PaymentEvent
+from app.utils.fake_gateway import get_fake_gateway, signed_event
+from app.utils.payment_events import process_payment_events
+
+
+def post_in_process(app, payload, signature):
+    with app.test_client() as client:
+        response = client.post(
+            '/api/payments/webhook', data=payload,
+            headers={'Stripe-Signature': signature, 'Content-Type': 'application/json'}
+        )
+        return response.status_code
+
+
+def post_http(url, payload, signature):
+    request = urllib.request.Request(
+        url.rstrip('/') + '/api/payments/webhook', data=payload.encode(), method='POST',
+        headers={'Stripe-Signature': signature, 'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--donations', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--amount', type=float, default=10.0)
+    parser.add_argument('--success-rate', type=float, default=0.95)
+    parser.add_argument('--duplicates', type=float, default=0.0, help='fraction of events delivered twice')
+    parser.add_argument('--url', help='post to a running server instead of the in-process test client')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = create_app(os.getenv('FLASK_ENV', 'testing'))
+
+    with app.app_context():
+        if app.config.get('PAYMENT_GATEWAY') != 'fake':
+            print('PAYMENT_GATEWAY must be "fake" for this benchmark')
+            return 2
+
+        gateway = get_fake_gateway(app.config['FAKE_GATEWAY_PATH'])
+        secret = app.config['STRIPE_WEBHOOK_SECRET']
+
+        campaign = Campaign(
+            title='Webhook benchmark',
+            category='emergency',
+            urgency='critical',
+            target_amount=args.donations * args.amount,
+            funds_raised=0,
+            beneficiary_name='Benchmark',
+            status='approved'
+        )
+        db.session.add(campaign)
+        db.session.flush()
+        campaign_id = campaign.id
+
+        intents = [
+            gateway.create_payment_intent(int(args.amount * 100), 'usd', 'Webhook benchmark')
+            for _ in range(args.donations)
+        ]
+        db.session.execute(insert(Donation), [
+            {'campaign_id': campaign_id, 'amount': args.amount, 'status': 'pending', 'transaction_id': intent['id']}
+            for intent in intents
+        ])
+        db.session.commit()
+
+        settled = gateway.settle([intent['id'] for intent in intents], args.success_rate, rng)
+        succeeded = sum(1 for intent in settled if intent['status'] == 'succeeded')
+
+    deliveries = [signed_event(intent, secret) for intent in settled]
+    deliveries += rng.sample(deliveries, int(len(deliveries) * args.duplicates))
+    rng.shuffle(deliveries)
+
+    if args.url:
+        post = lambda delivery: post_http(args.url, *delivery)
+    else:
+        post = lambda delivery: post_in_process(app, *delivery)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        statuses = list(pool.map(post, deliveries))
+    ingest_elapsed = time.perf_counter() - start
+    accepted = sum(1 for status in statuses if status == 200)
+
+    with app.app_context():
+        start = time.perf_counter()
+        processed = 0
+        while True:
+            batch = process_payment_events(app.config['PAYMENT_EVENT_BATCH_SIZE'])
+            if not batch:
+                break
+            processed += batch
+        drain_elapsed = time.perf_counter() - start
+
+        funds_raised = db.session.get(Campaign, campaign_id).funds_raised
+        expected = succeeded * args.amount
+
+        print(f"Deliveries:      {len(deliveries)} ({len(settled)} events + duplicates) with {args.concurrency} threads")
+        print(f"Accepted:        {accepted}/{len(deliveries)} in {ingest_elapsed:.2f}s "
+              f"({len(deliveries) / ingest_elapsed:.0f} deliveries/s)")
+        print(f"Processed:       {processed} events in {drain_elapsed:.2f}s "
+              f"({processed / drain_elapsed if drain_elapsed else 0:.0f} events/s)")
+        print(f"funds_raised:    {funds_raised:.2f} (expected {expected:.2f}, {succeeded} succeeded)")
+
+        intent_ids = [intent['id'] for intent in intents]
+        donation_ids = db.session.query(Donation.id).filter_by(campaign_id=campaign_id)
+        Transaction.query.filter(Transaction.donation_id.in_(donation_ids)).delete(synchronize_session=False)
+        PaymentEvent.query.filter(PaymentEvent.payment_intent_id.in_(intent_ids)).delete(synchronize_session=False)
+        Donation.query.filter_by(campaign_id=campaign_id).delete()
+        Campaign.query.filter_by(id=campaign_id).delete()
+        db.session.commit()
+
+    ok = accepted == len(deliveries) and abs(funds_raised - expected) < 1e-6
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Password hashing throughput benchmark
+
+Simulates login peaks: many request threads verify passwords at once,
+either inline (PASSWORD_HASH_WORKERS=0, the old behaviour) or through the
+bounded process pool. Reports logins per second and per core for each
+pool size. No database is needed.
+
+    python benchmarks/password_hashing.py
+    python benchmarks/password_hashing.py --method pbkdf2:sha256:600000 --workers 0 1 2 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from app.utils.passwords import hash_password, verify_password, get_hasher, PasswordHasherBusy
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--method', default='scrypt:32768:8:1', help='werkzeug hash method')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, cores], help='pool sizes to compare (0 = inline)')
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=32, help='concurrent request threads')
+    args = parser.parse_args()
+
+    print(f"Method: {args.method}, {args.logins} logins from {args.threads} threads, {cores} core(s)")
+
+    for workers in args.workers:
+        app = Flask(__name__)
+        app.config.update(
+            PASSWORD_HASH_METHOD=args.method,
+            PASSWORD_HASH_WORKERS=workers,
+            PASSWORD_HASH_TIMEOUT=60
+        )
+
+        with app.app_context():
+            password_hash = hash_password('correct horse battery staple')
+
+        def login(_):
+            with app.app_context():
+                try:
+                    return verify_password(password_hash, 'correct horse battery staple')
+                except PasswordHasherBusy:
+                    return False
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            ok = sum(pool.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - start
+
+        # hashlib and scrypt release the GIL, so inline hashing can use every core too
+        used_cores = min(workers, cores) if workers else cores
+        rate = args.logins / elapsed
+        label = f'pool of {workers}' if workers else 'inline'
+        print(f"{label:>12}: {rate:8.1f} logins/s, {rate / used_cores:8.1f} logins/s/core "
+              f"({ok}/{args.logins} verified, {elapsed:.2f}s)")
+
+        get_hasher(app).shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,408 @@
+"""Benchmark suite for the API hot paths
+
+Drives the hot endpoints one scenario at a time with a pool of client
+threads, then reports latency percentiles, throughput and SQL queries per
+request (from the X-DB-Query-Count header). Results are written as JSON so
+runs can be compared across commits.
+
+Scenarios:
+  browse     GET  /api/donor/campaigns
+  search     GET  /api/donor/campaigns/search (full-text + filters)
+  priority   GET  /api/donor/campaigns/priority
+  detail     GET  /api/donor/campaigns/<id> (hot campaigns requested most)
+  donate     POST /api/donor/donate, the signed gateway webhook, then
+             POST /api/donor/donations/<id>/confirm
+  login      POST /api/auth/login
+  dashboard  GET  /api/admin/dashboard
+
+    python seed_db.py --scale 10 --seed 42      # build the dataset first
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scenarios browse detail --requests 2000 --concurrency 32
+    python benchmarks/run_benchmarks.py --no-cache --compare benchmarks/results/<earlier run>.json
+    python benchmarks/run_benchmarks.py --url http://localhost:5000
+
+Without --url, requests go through the Flask test client of
+create_app(--config), which defaults to FLASK_ENV or development, the same
+as seed_db.py, so both use the same database. In-process runs always pay
+on the fake gateway, and they always hash with the production
+PASSWORD_HASH_METHOD, even under --config testing. With --url, the
+server must share the database, PAYMENT_GATEWAY=fake, FAKE_GATEWAY_PATH
+and STRIPE_WEBHOOK_SECRET, and run process_payment_events.py --loop.
+The login scenario expects the seeded accounts' password (--password).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from app import create_app
+from app.models import db
+from config import Config
+from app.models.user import User
+from app.models.campaign import Campaign, Donation
+from app.utils.auth import create_user_token
+from app.utils.cache import response_cache
+from app.utils.fake_gateway import get_fake_gateway, signed_event
+from app.utils.payment_events import process_payment_events
+
+SCENARIOS = ['browse', 'search', 'priority', 'detail', 'donate', 'login', 'dashboard']
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+SEARCH_TERMS = ['heart', 'kidney', 'cancer', 'insulin', 'dialysis', 'transplant', 'leukemia', 'burns']
+CATEGORIES = ['surgery', 'treatment', 'medication', 'emergency']
+URGENCIES = ['critical', 'high', 'medium', 'low']
+
+
+class InProcessClient:
+    """Sends requests through the Flask test client"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method, path, body=None, headers=None, raw=None):
+        with self.app.test_client() as client:
+            response = client.open(path, method=method, json=body, data=raw, headers=headers or {})
+            return response.status_code, response.headers, response.get_json(silent=True)
+
+
+class HttpClient:
+    """Sends requests to a running server"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def request(self, method, path, body=None, headers=None, raw=None):
+        headers = dict(headers or {})
+        data = raw.encode() if raw is not None else None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.url + path, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, response.headers, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, None
+
+
+class Recorder:
+    """Latencies, statuses and query counts per operation"""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation, seconds, status, queries):
+        with self._lock:
+            self.samples.setdefault(operation, []).append((seconds, status, queries))
+
+
+class Session:
+    """What a scenario iteration uses to issue timed requests"""
+
+    def __init__(self, client, recorder, rng):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+
+    def request(self, operation, method, path, body=None, headers=None, raw=None):
+        started = time.perf_counter()
+        status, response_headers, payload = self.client.request(method, path, body, headers, raw)
+        elapsed = time.perf_counter() - started
+        queries = response_headers.get('X-DB-Query-Count')
+        self.recorder.record(operation, elapsed, status, int(queries) if queries is not None else None)
+        return status, payload
+
+
+def skewed_choice(rng, items, exponent=1.1):
+    """Pick items[k] with weight 1 / (k + 1) ** exponent, so the first ones are hot"""
+    return rng.choices(items, weights=[1 / (rank + 1) ** exponent for rank in range(len(items))])[0]
+
+
+def load_fixtures(app, args):
+    """Campaign ids, accounts and tokens the scenarios need"""
+    with app.app_context():
+        campaign_ids = [str(row.id) for row in db.session.query(Campaign.id).filter_by(status='approved')
+                        .order_by(func.random()).limit(args.campaign_sample)]
+        donors = User.query.filter_by(user_type='donor', is_active=True).order_by(func.random()).limit(50).all()
+        admin = User.query.filter_by(user_type='admin', is_active=True).first()
+        counts = {
+            'users': db.session.query(func.count(User.id)).scalar(),
+            'campaigns': db.session.query(func.count(Campaign.id)).scalar(),
+            'donations': db.session.query(func.count(Donation.id)).scalar()
+        }
+        return {
+            'database': db.engine.dialect.name,
+            'campaign_ids': campaign_ids,
+            'donor_emails': [donor.email for donor in donors],
+            'donor_tokens': [create_user_token(donor) for donor in donors],
+            'admin_token': create_user_token(admin) if admin else None,
+            'dataset': counts
+        }
+
+
+def build_scenarios(app, fixtures, args):
+    """{name: function(session)} issuing one iteration of each scenario"""
+    campaign_ids = fixtures['campaign_ids']
+    bearer = lambda token: {'Authorization': f'Bearer {token}'}
+
+    def browse(session):
+        session.request('browse', 'GET', f'/api/donor/campaigns?per_page=20&page={session.rng.randint(1, 5)}')
+
+    def search(session):
+        rng = session.rng
+        path = f'/api/donor/campaigns/search?per_page=20&search={rng.choice(SEARCH_TERMS)}'
+        if rng.random() < 0.5:
+            path += f'&category={rng.choice(CATEGORIES)}'
+        if rng.random() < 0.5:
+            path += f'&urgency={rng.choice(URGENCIES)}'
+        session.request('search', 'GET', path)
+
+    def priority(session):
+        session.request('priority', 'GET', f'/api/donor/campaigns/priority?limit=20&offset={session.rng.choice([0, 0, 0, 20, 40])}')
+
+    def detail(session):
+        session.request('detail', 'GET', f'/api/donor/campaigns/{skewed_choice(session.rng, campaign_ids)}')
+
+    def donate(session):
+        rng = session.rng
+        token = rng.choice(fixtures['donor_tokens'])
+        # Fresh keys, so a rerun with the same seed is not served replayed responses
+        headers = dict(bearer(token), **{'Idempotency-Key': str(uuid.uuid4())})
+        status, payload = session.request('donate', 'POST', '/api/donor/donate', body={
+            'campaign_id': skewed_choice(rng, campaign_ids),
+            'amount': round(rng.uniform(5, 200), 2)
+        }, headers=headers)
+        if status != 201:
+            return
+
+        # Pay on the fake gateway and deliver its webhook like Stripe would
+        with app.app_context():
+            gateway = get_fake_gateway(app.config['FAKE_GATEWAY_PATH'])
+            intent_id = payload['data']['client_secret'].rsplit('_secret', 1)[0]
+            intent = gateway.settle([intent_id], args.success_rate, rng)[0]
+            body, signature = signed_event(intent, app.config['STRIPE_WEBHOOK_SECRET'])
+        session.request('webhook', 'POST', '/api/payments/webhook', raw=body,
+                        headers={'Stripe-Signature': signature, 'Content-Type': 'application/json'})
+        session.request('confirm', 'POST', f"/api/donor/donations/{payload['data']['donation_id']}/confirm",
+                        headers=bearer(token))
+
+    def login(session):
+        session.request('login', 'POST', '/api/auth/login', body={
+            'email': session.rng.choice(fixtures['donor_emails']),
+            'password': args.password
+        })
+
+    def dashboard(session):
+        session.request('dashboard', 'GET', '/api/admin/dashboard', headers=bearer(fixtures['admin_token']))
+
+    return {
+        'browse': browse,
+        'search': search,
+        'priority': priority,
+        'detail': detail,
+        'donate': donate,
+        'login': login,
+        'dashboard': dashboard
+    }
+
+
+def drain_payment_events(app, stop):
+    """Settle webhook events in the background, as process_payment_events.py --loop would"""
+    with app.app_context():
+        while not stop.is_set():
+            if not process_payment_events(app.config['PAYMENT_EVENT_BATCH_SIZE']):
+                stop.wait(0.05)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    errors = sum(1 for _, status, _ in samples if not 200 <= status < 300)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'max_ms': round(latencies[-1], 3),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None
+    }
+
+
+def run_scenario(scenario, client, args, seed):
+    """Run warmup then measured iterations; returns {operation: summary}"""
+    if args.warmup:
+        warmup = Session(client, Recorder(), random.Random(seed - 1))
+        for _ in range(args.warmup):
+            scenario(warmup)
+
+    recorder = Recorder()
+    local = threading.local()
+    seeds = random.Random(seed)
+    seeds_lock = threading.Lock()
+
+    def iteration(_):
+        if not hasattr(local, 'session'):
+            # One deterministic RNG per worker thread
+            with seeds_lock:
+                local.session = Session(client, recorder, random.Random(seeds.getrandbits(64)))
+        scenario(local.session)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(iteration, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    return {operation: summarize(samples, elapsed) for operation, samples in recorder.samples.items()}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    print(f"\n{'operation':<12}{'reqs':>7}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'q/req':>7}")
+    for operation, stats in results.items():
+        line = (f"{operation:<12}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput_rps']:>10.1f}"
+                f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                f"{stats['queries_per_request'] if stats['queries_per_request'] is not None else '-':>7}")
+        before = (baseline or {}).get(operation)
+        if before:
+            p95_change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            rps_change = ((stats['throughput_rps'] - before['throughput_rps']) / before['throughput_rps'] * 100
+                          if before['throughput_rps'] else 0)
+            line += f"   p95 {p95_change:+.1f}%  rps {rps_change:+.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--requests', type=int, default=500, help='iterations per scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured iterations per scenario')
+    parser.add_argument('--campaign-sample', type=int, default=500, help='approved campaigns the detail/donate scenarios pick from')
+    parser.add_argument('--password', default='password123', help='password of the seeded donor accounts')
+    parser.add_argument('--success-rate', type=float, default=0.95, help='fraction of fake payments that succeed')
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache (in-process only)')
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process test client')
+    parser.add_argument('--config', default=os.getenv('FLASK_ENV', 'development'),
+                        help='app configuration (default: FLASK_ENV or development, as seed_db.py)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<time>-<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to show changes against')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    # Measure budget overruns rather than failing on them
+    app.config['SQL_STRICT_BUDGETS'] = False
+    # Logins must cost what they cost in production (and must not rehash the
+    # seeded accounts), whatever the configuration's own hashing settings
+    app.config['PASSWORD_HASH_METHOD'] = Config.PASSWORD_HASH_METHOD
+    app.config['PASSWORD_HASH_WORKERS'] = Config.PASSWORD_HASH_WORKERS
+    if args.no_cache:
+        app.config['CACHE_BACKEND'] = 'none'
+        response_cache.init_app(app)
+    if not args.url:
+        # The in-process app both signs and verifies the webhooks it is sent
+        app.config['PAYMENT_GATEWAY'] = 'fake'
+        app.config['STRIPE_WEBHOOK_SECRET'] = app.config['STRIPE_WEBHOOK_SECRET'] or 'whsec_benchmark'
+    elif app.config.get('PAYMENT_GATEWAY') != 'fake' and 'donate' in args.scenarios:
+        print('PAYMENT_GATEWAY must be "fake" for the donate scenario')
+        return 2
+
+    fixtures = load_fixtures(app, args)
+    if not fixtures['campaign_ids'] or not fixtures['donor_tokens']:
+        print('No approved campaigns or donors found; seed the database first (python seed_db.py --scale 1)')
+        return 2
+    if 'dashboard' in args.scenarios and not fixtures['admin_token']:
+        print('No admin account found for the dashboard scenario')
+        return 2
+
+    client = HttpClient(args.url) if args.url else InProcessClient(app)
+    scenarios = build_scenarios(app, fixtures, args)
+
+    stop = threading.Event()
+    drainer = None
+    if not args.url and 'donate' in args.scenarios:
+        drainer = threading.Thread(target=drain_payment_events, args=(app, stop), daemon=True)
+        drainer.start()
+
+    dataset = fixtures['dataset']
+    print(f"Dataset: {dataset['users']:,} users, {dataset['campaigns']:,} campaigns, {dataset['donations']:,} donations")
+    print(f"{args.requests} iterations per scenario, {args.concurrency} threads, "
+          f"{'server ' + args.url if args.url else 'in-process'}, cache {'off' if args.no_cache else 'on'}")
+
+    results = {}
+    try:
+        for index, name in enumerate(args.scenarios):
+            print(f"  running {name}...")
+            results.update(run_scenario(scenarios[name], client, args, args.seed * 1000 + index))
+    finally:
+        stop.set()
+        if drainer:
+            drainer.join()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    commit = git_commit()
+    run = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'commit': commit,
+            'target': args.url or f"in-process ({args.config})",
+            'database': fixtures['database'],
+            'dataset': dataset,
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args)
+        },
+        'results': results
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.utcnow():%Y%m%d-%H%M%S}-{commit or 'unknown'}.json")
+    with open(output, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
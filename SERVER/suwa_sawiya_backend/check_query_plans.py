@@ -0,0 +1,289 @@
+"""Query plan regression checks
+
+Seeds a large synthetic dataset inside a transaction, runs EXPLAIN on the
+queries behind the hot routes and checks that each plan uses the index
+designed for it. The transaction is rolled back afterwards, so the
+database is left untouched. Exits non-zero if any plan regressed.
+
+    python check_query_plans.py
+    python check_query_plans.py --campaigns 200000 --donations 5000000
+    python check_query_plans.py --no-seed    # plans against the existing data
+
+Requires PostgreSQL 13+ (gen_random_uuid) and the indexes from
+create_indexes.py.
+"""
+import argparse
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import text, tuple_
+from sqlalchemy.dialects import postgresql
+from app import create_app
+from app.models import db
+from app.models.user import User
+from app.models.campaign import Campaign, Donation, DonationRollup, campaign_priority_order
+from app.models.other import Transaction, Disbursement, FraudReport, PaymentEvent
+from app.utils.donations import completed_donations_query
+from app.utils.search import search_campaigns_query
+
+SEED_STATEMENTS = [
+    """
+    INSERT INTO users (id, email, password_hash, user_type, is_active, is_verified, created_at, updated_at)
+    SELECT gen_random_uuid(), 'plan-check-' || i || '@example.com', 'x',
+           (ARRAY['donor', 'donor', 'donor', 'partner', 'admin'])[1 + i % 5], true, false,
+           now() - i * interval '1 minute', now()
+    FROM generate_series(1, :users) i
+    """,
+    """
+    INSERT INTO campaigns (id, title, description, category, urgency, target_amount, funds_raised,
+                           counter_shards, status, beneficiary_name, beneficiary_medical_condition,
+                           created_at, updated_at)
+    SELECT gen_random_uuid(),
+           'Campaign ' || i || ' for ' || (ARRAY['heart surgery', 'kidney transplant', 'cancer treatment',
+                                                 'insulin supply', 'burn care', 'eye operation'])[1 + i % 6],
+           md5(i::text), (ARRAY['surgery', 'medication', 'treatment', 'emergency', 'therapy', 'equipment'])[1 + i % 6],
+           (ARRAY['critical', 'high', 'medium', 'low'])[1 + (i / 7) % 4], 1000 + i % 50000, i % 900, 0,
+           (ARRAY['approved', 'approved', 'approved', 'pending', 'rejected', 'completed'])[1 + (i / 3) % 6],
+           'Beneficiary ' || i, 'chronic condition ' || i % 100,
+           now() - i * interval '1 minute', now()
+    FROM generate_series(1, :campaigns) i
+    """,
+    """
+    INSERT INTO donations (id, campaign_id, donor_id, amount, is_anonymous, status, transaction_id,
+                           created_at, completed_at)
+    SELECT gen_random_uuid(), c.ids[1 + i % array_length(c.ids, 1)], u.ids[1 + i % array_length(u.ids, 1)],
+           10 + i % 500, i % 10 = 0,
+           CASE WHEN i % 50 = 0 THEN 'pending' WHEN i % 97 = 0 THEN 'failed' ELSE 'completed' END,
+           'pi_plan_check_' || i, now() - i * (interval '90 days' / :donations),
+           now() - i * (interval '90 days' / :donations)
+    FROM generate_series(1, :donations) i,
+         (SELECT array_agg(id) AS ids FROM campaigns) c,
+         (SELECT array_agg(id) AS ids FROM users WHERE user_type = 'donor') u
+    """,
+    """
+    INSERT INTO transactions (id, donation_id, payment_method, transaction_reference, amount, currency,
+                              status, created_at, processed_at)
+    SELECT gen_random_uuid(), id, 'stripe', transaction_id, amount, 'USD', 'success', completed_at, completed_at
+    FROM donations WHERE transaction_id LIKE 'pi_plan_check_%' AND status = 'completed'
+    """,
+    """
+    INSERT INTO fraud_reports (id, campaign_id, description, status, created_at, updated_at)
+    SELECT gen_random_uuid(), c.ids[1 + i % array_length(c.ids, 1)], 'report ' || i,
+           (ARRAY['dismissed', 'dismissed', 'confirmed', 'investigating', 'pending'])[1 + i % 5],
+           now() - i * interval '1 minute', now()
+    FROM generate_series(1, :campaigns / 5) i, (SELECT array_agg(id) AS ids FROM campaigns) c
+    """,
+    """
+    INSERT INTO disbursements (id, campaign_id, amount, status, created_at)
+    SELECT gen_random_uuid(), c.ids[1 + i % array_length(c.ids, 1)], 100 + i % 1000,
+           (ARRAY['processed', 'processed', 'approved', 'pending'])[1 + i % 4],
+           now() - i * interval '1 minute'
+    FROM generate_series(1, :campaigns / 2) i, (SELECT array_agg(id) AS ids FROM campaigns) c
+    """,
+    """
+    INSERT INTO payment_events (id, event_id, event_type, payment_intent_id, status, payload, received_at, processed_at)
+    SELECT gen_random_uuid(), 'evt_plan_check_' || i, 'payment_intent.succeeded', 'pi_plan_check_' || i,
+           CASE WHEN i % 200 = 0 THEN 'queued' ELSE 'processed' END, '{}',
+           now() - i * interval '1 second', now()
+    FROM generate_series(1, :donations / 10) i
+    """,
+    """
+    INSERT INTO donation_rollups (granularity, bucket_start, campaign_id, category, urgency, donation_count, amount)
+    SELECT g.granularity, date_trunc(g.granularity, d.completed_at), d.campaign_id, c.category, c.urgency,
+           count(*), sum(d.amount)
+    FROM donations d JOIN campaigns c ON c.id = d.campaign_id,
+         (VALUES ('hour'), ('day')) AS g (granularity)
+    WHERE d.transaction_id LIKE 'pi_plan_check_%' AND d.status = 'completed'
+    GROUP BY g.granularity, date_trunc(g.granularity, d.completed_at), d.campaign_id, c.category, c.urgency
+    ON CONFLICT DO NOTHING
+    """
+]
+# Table each seed statement fills, in the same order
+SEEDED_TABLES = [
+    'users', 'campaigns', 'donations', 'transactions', 'fraud_reports',
+    'disbursements', 'payment_events', 'donation_rollups'
+]
+
+PAGE = 11  # per_page + 1, as fetched by paginate_query
+
+
+def _keyset(query, model):
+    """The newest-first page paginate_query fetches in cursor mode"""
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(PAGE)
+
+
+def _week_ago():
+    return datetime.utcnow() - timedelta(days=7)
+
+
+def _search(terms):
+    filtered, _ = search_campaigns_query(Campaign.query.filter_by(status='approved'), terms)
+    return filtered.order_by(None).with_entities(db.func.count())
+
+
+# (name, build(sample) -> query, acceptable index names) for the queries behind each route.
+# Walking the created_at index and filtering is as cheap as the status index for common statuses.
+PLAN_CHECKS = [
+    ('donor: browse approved campaigns',
+     lambda sample: _keyset(Campaign.query.filter_by(status='approved'), Campaign),
+     {'ix_campaigns_status_created_at_id', 'ix_campaigns_created_at_id'}),
+    ('donor: search by category and urgency (count)',
+     lambda sample: Campaign.query.filter_by(status='approved', category='surgery', urgency='critical')
+     .order_by(None).with_entities(db.func.count()),
+     {'ix_campaigns_status_category_urgency'}),
+    ('donor: search by urgency (count)',
+     lambda sample: Campaign.query.filter_by(status='approved', urgency='critical')
+     .order_by(None).with_entities(db.func.count()),
+     {'ix_campaigns_status_urgency', 'ix_campaigns_priority'}),
+    ('donor: full-text search',
+     lambda sample: _search('kidney transplant 42'),
+     {'ix_campaigns_search_vector'}),
+    ('donor: priority campaigns',
+     lambda sample: Campaign.query.filter_by(status='approved').order_by(*campaign_priority_order()).limit(20),
+     {'ix_campaigns_priority'}),
+    ('donor: campaign donation stream',
+     lambda sample: _keyset(completed_donations_query(sample['campaign_id']), Donation),
+     {'ix_donations_campaign_status_created_at_id'}),
+    ('donor: donation history',
+     lambda sample: _keyset(
+         Donation.query.filter(Donation.donor_id == sample['donor_id'], Donation.is_anonymous == False),  # noqa: E712
+         Donation
+     ),
+     {'ix_donations_donor_created_at_id'}),
+    ('partner: campaign list',
+     lambda sample: _keyset(Campaign.query.filter_by(partner_id=sample['partner_id']), Campaign),
+     {'ix_campaigns_partner_created_at_id'}),
+    ('admin: campaigns by status',
+     lambda sample: _keyset(Campaign.query.filter_by(status='pending'), Campaign),
+     {'ix_campaigns_status_created_at_id', 'ix_campaigns_created_at_id'}),
+    ('admin: pending fraud reports',
+     lambda sample: _keyset(FraudReport.query.filter_by(status='pending'), FraudReport),
+     {'ix_fraud_reports_status_created_at_id'}),
+    ('admin: pending disbursements',
+     lambda sample: _keyset(Disbursement.query.filter_by(status='pending'), Disbursement),
+     {'ix_disbursements_status_created_at_id'}),
+    ('admin: users by type',
+     lambda sample: _keyset(User.query.filter_by(user_type='partner'), User),
+     {'ix_users_user_type_created_at_id'}),
+    ('admin: donation analytics',
+     lambda sample: DonationRollup.query.filter(
+         DonationRollup.granularity == 'day',
+         DonationRollup.bucket_start >= _week_ago(),
+         DonationRollup.bucket_start < datetime.utcnow()
+     ),
+     {'donation_rollups_pkey'}),
+    ('admin: transaction export page',
+     lambda sample: Transaction.query.filter(Transaction.created_at >= _week_ago())
+     .order_by(Transaction.created_at, Transaction.id).limit(2000),
+     {'ix_transactions_created_at_id'}),
+    ('admin: delete campaign transactions',
+     lambda sample: Transaction.query.filter(Transaction.donation_id == sample['donation_id']),
+     {'ix_transactions_donation_id'}),
+    ('auth: login by email',
+     lambda sample: User.query.filter_by(email='plan-check-42@example.com'),
+     {'ix_users_email'}),
+    ('worker: payment event queue',
+     lambda sample: PaymentEvent.query.filter_by(status='queued').order_by(PaymentEvent.received_at).limit(500),
+     {'ix_payment_events_status_received_at'}),
+    ('worker: pending donation reconciler',
+     lambda sample: Donation.query.filter(
+         Donation.status == 'pending',
+         Donation.transaction_id.isnot(None),
+         tuple_(Donation.created_at, Donation.id) > (_week_ago(), uuid.UUID(int=0))
+     ).order_by(Donation.created_at, Donation.id).limit(500),
+     {'ix_donations_pending_created_at_id'}),
+]
+
+
+def seed(conn, users, campaigns, donations):
+    """Insert the synthetic dataset and refresh planner statistics"""
+    params = {'users': users, 'campaigns': campaigns, 'donations': donations}
+    for table, statement in zip(SEEDED_TABLES, SEED_STATEMENTS):
+        conn.execute(text(statement), params)
+        # Before the next statement is planned, which may read this table
+        conn.execute(text(f'ANALYZE {table}'))
+
+
+def sample_ids(conn):
+    """Ids the per-row checks filter on, or None when there are no completed donations"""
+    row = conn.execute(text(
+        "SELECT d.campaign_id, d.donor_id, d.id FROM donations d "
+        "WHERE d.status = 'completed' AND d.donor_id IS NOT NULL LIMIT 1"
+    )).first()
+    if row is None:
+        return None
+    return {
+        'campaign_id': row[0],
+        'donor_id': row[1],
+        'donation_id': row[2],
+        'partner_id': uuid.uuid4()
+    }
+
+
+def plan_indexes(plan):
+    """Names of all indexes used anywhere in an EXPLAIN (FORMAT JSON) plan node"""
+    names = set()
+    if 'Index Name' in plan:
+        names.add(plan['Index Name'])
+    for child in plan.get('Plans', []):
+        names |= plan_indexes(child)
+    return names
+
+
+def explain(conn, query):
+    statement = query.statement if hasattr(query, 'statement') else query
+    compiled = statement.compile(dialect=postgresql.dialect(), compile_kwargs={'render_postcompile': True})
+    result = conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled.string}', compiled.params).scalar()
+    plan = (json.loads(result) if isinstance(result, str) else result)[0]['Plan']
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--campaigns', type=int, default=50000)
+    parser.add_argument('--donations', type=int, default=500000)
+    parser.add_argument('--no-seed', action='store_true', help='explain against the existing data only')
+    parser.add_argument('--verbose', action='store_true', help='print the plan of failing queries')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    failures = 0
+
+    with app.app_context():
+        conn = db.engine.connect()
+        transaction = conn.begin()
+        try:
+            if not args.no_seed:
+                print(f"Seeding {args.users} users, {args.campaigns} campaigns, {args.donations} donations...")
+                seed(conn, args.users, args.campaigns, args.donations)
+
+            sample = sample_ids(conn)
+            if sample is None:
+                print('No completed donations to sample; run without --no-seed')
+                return 2
+
+            for name, build, expected in PLAN_CHECKS:
+                plan = explain(conn, build(sample))
+                used = plan_indexes(plan)
+                ok = bool(used & expected)
+                failures += not ok
+                line = f"{'PASS' if ok else 'FAIL'}  {name}: {', '.join(sorted(used)) or plan['Node Type']}"
+                if not ok:
+                    line += f" (expected {' or '.join(sorted(expected))})"
+                print(line)
+                if not ok and args.verbose:
+                    print(json.dumps(plan, indent=2))
+        finally:
+            # Never keep the synthetic data
+            transaction.rollback()
+            conn.close()
+
+    print(f"{failures} plan regression(s)" if failures else 'All plans use their intended indexes')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
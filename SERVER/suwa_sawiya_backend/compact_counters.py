@@ -0,0 +1,36 @@
+"""Fold sharded campaign fund counters back into campaigns.funds_raised
+
+Run once:                 python compact_counters.py
+Run every N seconds:      python compact_counters.py N
+"""
+import os
+import sys
+import time
+from app import create_app
+from app.utils.cache import response_cache, UNSHARED_CACHE_ERROR
+from app.utils.counters import compact_fund_shards
+
+
+def compact_counters(interval=None):
+    """Compact fund shards once, or forever every `interval` seconds"""
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+    if not response_cache.is_shared:
+        sys.exit(UNSHARED_CACHE_ERROR)
+
+    with app.app_context():
+        while True:
+            campaign_ids = compact_fund_shards()
+
+            for campaign_id in campaign_ids:
+                response_cache.invalidate_campaign(campaign_id)
+
+            print(f"Compacted fund shards for {len(campaign_ids)} campaign(s)")
+
+            if interval is None:
+                break
+            time.sleep(interval)
+
+
+if __name__ == '__main__':
+    compact_counters(float(sys.argv[1]) if len(sys.argv) > 1 else None)
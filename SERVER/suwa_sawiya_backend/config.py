@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from dotenv import load_dotenv
 
@@ -15,6 +16,13 @@ class Config:
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'dev-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1)
+    AUTH_REVOCATION_REFRESH = 30  # seconds between reloads of deactivated user ids
+    
+    # Password hashing (werkzeug method string; stored hashes are upgraded on login)
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))  # 0 hashes inline
+    PASSWORD_HASH_MAX_PENDING = None  # queued + running hashes before callers wait; default 4 per worker
+    PASSWORD_HASH_TIMEOUT = 10  # seconds to wait for a slot or a result
     
     # Flask
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -23,10 +31,60 @@ class Config:
     MAX_CONTENT_LENGTH = 52428800  # 50MB
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx'}
+    # Unreferenced stored files younger than this are kept (uploads in flight)
+    UPLOAD_GC_GRACE_SECONDS = int(os.getenv('UPLOAD_GC_GRACE_SECONDS', 3600))
+    
+    # File serving
+    FILE_SERVING_MODE = os.getenv('FILE_SERVING_MODE', 'direct')  # 'direct', 'x-accel' (nginx) or 'x-sendfile'
+    FILE_ACCEL_PREFIX = os.getenv('FILE_ACCEL_PREFIX', '/protected-uploads/')  # nginx internal location for UPLOAD_FOLDER
+    FILE_CACHE_MAX_AGE = int(os.getenv('FILE_CACHE_MAX_AGE', 3600))  # seconds, public files only
+    
+    # Cover image variants
+    IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', 2))  # 0 renders inline
+    IMAGE_VARIANT_MAX_PENDING = None  # queued + running renders before new ones are skipped; default 16 per worker
+    
+    # Caching
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')  # 'memory', 'redis' or 'none'
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 2048))
+    CACHE_DEFAULT_TTL = 60  # seconds
+    PRIORITY_CAMPAIGNS_CACHE_TTL = 30  # seconds
+    DASHBOARD_STATS_TTL = 15  # seconds
+    
+    # SQL instrumentation
+    SQL_STATS_ENABLED = os.getenv('SQL_STATS_ENABLED', 'true').lower() == 'true'
+    SQL_STATS_HEADERS = False  # X-DB-Query-Count / X-DB-Time-Ms on every response
+    SQL_QUERY_BUDGET = None  # budget for views without @query_budget; None means unlimited
+    SQL_REPEATED_QUERY_THRESHOLD = 5  # one statement run this often in a request is flagged as N+1
+    SQL_STRICT_BUDGETS = False  # raise QueryBudgetExceeded instead of logging
+    
+    # Prometheus metrics at /metrics
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_AUTH_TOKEN = os.getenv('METRICS_AUTH_TOKEN', '')  # if set, scrapes need 'Authorization: Bearer <token>'
+    
+    # Request profiling (sampled, or requests carrying an admin-issued X-Profile-Token)
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'true').lower() == 'true'
+    PROFILER_SECRET = os.getenv('PROFILER_SECRET', '')  # signs profiling tokens; defaults to SECRET_KEY
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))  # fraction of all requests to profile
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'suwa_profiles'))
+    PROFILE_MAX_FILES = 200  # profiles kept before the oldest are deleted
+    PROFILE_MAX_BYTES = 200 * 1024 * 1024
+    
+    # Bulk exports
+    EXPORT_BATCH_SIZE = 2000  # rows fetched per server-side cursor round trip
     
     # Payment
     STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY', '')
     STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', '')
+    STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET', '')
+    PAYMENT_GATEWAY = os.getenv('PAYMENT_GATEWAY', 'stripe')  # 'stripe' or 'fake' (local, no network)
+    FAKE_GATEWAY_PATH = os.getenv('FAKE_GATEWAY_PATH', os.path.join(tempfile.gettempdir(), 'suwa_fake_gateway.sqlite3'))
+    PAYMENT_EVENT_BATCH_SIZE = 500
+    
+    # Idempotency-Key support
+    IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # seconds a completed response is replayed
+    IDEMPOTENCY_LOCK_TIMEOUT = 60  # seconds before an unfinished request's key can be reclaimed
+    IDEMPOTENCY_WAIT_TIMEOUT = 10  # seconds a concurrent duplicate waits for the original
     
     # Email
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
@@ -43,6 +101,7 @@ class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     TESTING = False
+    SQL_STATS_HEADERS = True
 
 
 class ProductionConfig(Config):
@@ -55,7 +114,14 @@ class TestingConfig(Config):
     """Testing configuration"""
     DEBUG = True
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'postgresql://localhost/suwa_sawiya_test_db'
+    SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'postgresql://localhost/suwa_sawiya_test_db')
+    PAYMENT_GATEWAY = 'fake'
+    STRIPE_WEBHOOK_SECRET = 'whsec_test'
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # Cheap hashes keep tests fast
+    PASSWORD_HASH_WORKERS = 0
+    IMAGE_VARIANT_WORKERS = 0
+    SQL_STATS_HEADERS = True
+    SQL_STRICT_BUDGETS = True  # Query budget regressions fail the test
 
 
 config = {
@@ -0,0 +1,78 @@
+"""Build the indexes declared on the models without blocking writes
+
+db.create_all() only creates indexes together with new tables. This
+script adds any declared index that is missing from an existing database
+with CREATE INDEX CONCURRENTLY, so tables stay writable while it runs.
+Indexes left INVALID by an interrupted concurrent build are dropped and
+rebuilt. Safe to run repeatedly.
+
+List what would be built:  python create_indexes.py --dry-run
+Build missing indexes:     python create_indexes.py
+"""
+import os
+import sys
+import time
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from app import create_app
+from app.models import db
+import app.models.user  # noqa: F401 - register every table on the metadata
+import app.models.campaign  # noqa: F401
+import app.models.other  # noqa: F401
+
+
+def existing_indexes(conn):
+    """{index name: is valid} for the public schema"""
+    rows = conn.execute(text(
+        "SELECT c.relname, i.indisvalid FROM pg_index i "
+        "JOIN pg_class c ON c.oid = i.indexrelid "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE n.nspname = current_schema()"
+    ))
+    return {name: valid for name, valid in rows}
+
+
+def declared_indexes():
+    for table in db.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            yield index
+
+
+def create_indexes(dry_run=False):
+    """Create missing declared indexes concurrently; returns the names built"""
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    built = []
+
+    with app.app_context():
+        # CONCURRENTLY cannot run inside a transaction block
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            present = existing_indexes(conn)
+
+            for index in declared_indexes():
+                if present.get(index.name) is True:
+                    continue
+
+                if present.get(index.name) is False:
+                    print(f"Dropping invalid index {index.name}")
+                    if not dry_run:
+                        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+
+                index.dialect_kwargs['postgresql_concurrently'] = True
+                statement = CreateIndex(index, if_not_exists=True)
+                print(f"Building {index.name} on {index.table.name}")
+
+                if dry_run:
+                    print(f"  {str(statement.compile(dialect=conn.dialect)).strip()}")
+                    continue
+
+                start = time.perf_counter()
+                conn.execute(statement)
+                print(f"  done in {time.perf_counter() - start:.1f}s")
+                built.append(index.name)
+
+    print(f"{len(built)} index(es) built")
+    return built
+
+
+if __name__ == '__main__':
+    create_indexes(dry_run='--dry-run' in sys.argv[1:])
@@ -0,0 +1,31 @@
+"""Delete uploaded files that no document or campaign references
+
+Run once:                 python gc_uploads.py
+List what would go:       python gc_uploads.py --dry-run
+
+Files touched within UPLOAD_GC_GRACE_SECONDS are kept, since their rows
+may not be committed yet.
+"""
+import os
+import sys
+from app import create_app
+from app.utils.file_handler import collect_garbage
+from config import Config
+
+
+def gc_uploads(dry_run=False):
+    """Remove unreferenced stored files and stale partial uploads"""
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+    with app.app_context():
+        removed, freed = collect_garbage(
+            Config.UPLOAD_FOLDER,
+            app.config.get('UPLOAD_GC_GRACE_SECONDS', 3600),
+            dry_run=dry_run
+        )
+        action = 'Would delete' if dry_run else 'Deleted'
+        print(f"{action} {removed} unreferenced file(s), {freed / 1024 / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    gc_uploads(dry_run='--dry-run' in sys.argv[1:])
@@ -0,0 +1,46 @@
+"""Render missing cover image variants (thumbnail, card, hero)
+
+Render missing variants:  python generate_cover_variants.py
+Re-render all of them:    python generate_cover_variants.py --all
+
+Covers are rendered in IMAGE_VARIANT_WORKERS processes. Use this after
+deploying, or after a worker restart dropped queued renders.
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from app import create_app
+from app.models import db
+from app.models.campaign import Campaign
+from app.utils.images import render_variants, record_cover_variants
+
+
+def generate_cover_variants(rerender=False):
+    """Render variants of every cover that lacks them (or of all covers)"""
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+    with app.app_context():
+        query = Campaign.query.with_entities(Campaign.id, Campaign.cover_image).filter(
+            Campaign.cover_image.isnot(None)
+        )
+        if not rerender:
+            query = query.filter(Campaign.cover_variants.is_(None))
+        covers = query.all()
+
+        rendered = failed = 0
+        with ProcessPoolExecutor(max_workers=max(app.config.get('IMAGE_VARIANT_WORKERS') or 1, 1)) as pool:
+            futures = [(campaign_id, path, pool.submit(render_variants, path)) for campaign_id, path in covers]
+            for campaign_id, path, future in futures:
+                try:
+                    record_cover_variants(campaign_id, path, future.result())
+                    rendered += 1
+                except Exception as e:
+                    db.session.rollback()
+                    failed += 1
+                    print(f"Campaign {campaign_id}: {e}")
+
+        print(f"Rendered variants for {rendered} cover(s), {failed} failed")
+
+
+if __name__ == '__main__':
+    generate_cover_variants(rerender='--all' in sys.argv[1:])
@@ -0,0 +1,42 @@
+"""Apply queued payment gateway webhook events to donations
+
+Drain the queue and exit:   python process_payment_events.py
+Run as a worker:            python process_payment_events.py --loop
+
+Several workers may run at once; each claims its own batch of events.
+"""
+import os
+import sys
+import time
+from app import create_app
+from app.utils.cache import response_cache, UNSHARED_CACHE_ERROR
+from app.utils.payment_events import process_payment_events
+
+
+def run_worker(loop=False, idle_interval=1.0):
+    """Process event batches until the queue is empty (or forever with loop)"""
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+    if not response_cache.is_shared:
+        sys.exit(UNSHARED_CACHE_ERROR)
+
+    with app.app_context():
+        batch_size = app.config['PAYMENT_EVENT_BATCH_SIZE']
+        total = 0
+
+        while True:
+            processed = process_payment_events(batch_size)
+            total += processed
+
+            if processed:
+                print(f"Processed {processed} payment event(s)")
+            elif loop:
+                time.sleep(idle_interval)
+            else:
+                break
+
+        print(f"Done: {total} payment event(s) processed")
+
+
+if __name__ == '__main__':
+    run_worker(loop='--loop' in sys.argv[1:])
@@ -0,0 +1,28 @@
+"""Delete expired Idempotency-Key records
+
+Run once:                 python purge_idempotency_keys.py
+Run every N seconds:      python purge_idempotency_keys.py N
+"""
+import os
+import sys
+import time
+from app import create_app
+from app.utils.idempotency import purge_expired_keys
+
+
+def purge_keys(interval=None):
+    """Purge expired keys once, or forever every `interval` seconds"""
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+    with app.app_context():
+        while True:
+            removed = purge_expired_keys()
+            print(f"Purged {removed} expired idempotency key(s)")
+
+            if interval is None:
+                break
+            time.sleep(interval)
+
+
+if __name__ == '__main__':
+    purge_keys(float(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,52 @@
+"""Reconcile pending donations with the payment gateway
+
+Settles donations whose payment webhooks were missed, listing payment
+intents from the gateway in bulk (works with PAYMENT_GATEWAY=fake).
+
+Run once:                 python reconcile_donations.py
+Run every N seconds:      python reconcile_donations.py --interval 600
+Fail unpaid after 1 day:  python reconcile_donations.py --abandon-after 86400
+Never fail unpaid:        python reconcile_donations.py --abandon-after 0
+"""
+import argparse
+import os
+import sys
+import time
+from app import create_app
+from app.utils.cache import response_cache, UNSHARED_CACHE_ERROR
+from app.utils.reconciliation import reconcile_pending_donations, ABANDON_AFTER
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--min-age', type=int, default=300,
+                        help='skip donations younger than this many seconds (webhooks still in flight)')
+    parser.add_argument('--abandon-after', type=int, default=ABANDON_AFTER,
+                        help='mark donations still unpaid after this many seconds failed (0 disables)')
+    parser.add_argument('--interval', type=float, help='repeat every N seconds')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+    if not response_cache.is_shared:
+        sys.exit(UNSHARED_CACHE_ERROR)
+
+    with app.app_context():
+        while True:
+            stats = reconcile_pending_donations(args.batch_size, args.min_age, args.abandon_after)
+
+            print(f"Scanned {stats['scanned']} pending donation(s) in {stats['batches']} batch(es), "
+                  f"{stats['gateway_calls']} gateway call(s), {stats['elapsed_seconds']}s "
+                  f"({stats['donations_per_second']} donations/s)")
+            print(f"Completed {stats['completed']}, failed {stats['failed']}, "
+                  f"still pending {stats['still_pending']}; "
+                  f"lag avg {stats['avg_lag_seconds']}s, max {stats['max_lag_seconds']}s")
+
+            if args.interval is None:
+                break
+            time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
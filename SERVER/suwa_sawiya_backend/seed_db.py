@@ -1,15 +1,48 @@
-"""Database seeding script with dummy data"""
+"""Database seeding script with dummy data
+
+Without arguments, adds a handful of hand-written donors, partners and
+campaigns. With --scale, bulk-loads synthetic load-test data instead:
+each scale unit adds 10,000 donors, 100 partners, 2,000 campaigns and
+100,000 donations, with a few hot campaigns and heavy donors receiving
+most of the activity. Rows are written with COPY on PostgreSQL (batched
+multi-row INSERTs on other databases) in a single transaction, and the
+same --seed and --anchor produce the same data. Synthetic timestamps lie
+in the years before --anchor (DEFAULT_ANCHOR unless given).
+
+    python seed_db.py
+    python seed_db.py --scale 10 --seed 42
+    python seed_db.py --scale 50 --batch-size 20000
+    python seed_db.py --scale 1 --anchor 2026-06-01
+    python seed_db.py --scale 1 --config testing
+
+--config picks the app configuration (default: FLASK_ENV or development,
+as benchmarks/run_benchmarks.py). Synthetic accounts are always hashed
+with the production PASSWORD_HASH_METHOD, so benchmarked logins measure
+the real KDF and never rehash.
+"""
+import argparse
+import csv
+import io
+import json
 import os
+import random
+import sys
+import time
+import uuid
 from datetime import datetime, timedelta
+from sqlalchemy import text
 from app import create_app, db
 from app.models.user import User, Donor, Partner, Admin
 from app.models.campaign import Campaign, Donation
 from app.models.other import Document, Transaction, Disbursement, FraudReport
+from config import Config
+from app.utils.passwords import hash_password
+from app.utils.rollups import backfill_rollups
 
 
-def seed_db():
+def seed_db(config_name=None):
     """Seed database with dummy data"""
-    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    app = create_app(config_name or os.getenv('FLASK_ENV', 'development'))
 
     with app.app_context():
         # Check if data already exists
@@ -393,5 +426,365 @@ def seed_db():
         print(f"- {len(fraud_reports_data)} fraud reports")
 
 
+# Rows per unit of --scale
+SCALE_UNIT = {
+    'donors': 10000,
+    'partners': 100,
+    'campaigns': 2000,
+    'donations': 100000,
+    'fraud_reports': 200,
+    'disbursements': 500
+}
+
+FIRST_NAMES = ['Nimal', 'Kamala', 'Sunil', 'Anjali', 'Ruwan', 'Dilani', 'Kasun', 'Tharushi', 'Mohamed',
+               'Fathima', 'Arjun', 'Priya', 'John', 'Maria', 'Chen', 'Aisha', 'David', 'Sarah']
+LAST_NAMES = ['Perera', 'Fernando', 'Silva', 'Jayawardena', 'Bandara', 'Wickramasinghe', 'Rajapaksa',
+              'Kumar', 'Nadarajah', 'Hussain', 'Smith', 'Garcia', 'Wang', 'Brown']
+CITIES = ['Colombo', 'Kandy', 'Galle', 'Jaffna', 'Negombo', 'Matara', 'Kurunegala', 'Anuradhapura', 'Batticaloa']
+BANKS = ['Bank of Ceylon', "People's Bank", 'Commercial Bank', 'Sampath Bank', 'Hatton National Bank']
+CONDITIONS = {
+    'surgery': ['Congenital heart defect requiring open-heart surgery', 'Spinal injury requiring corrective surgery',
+                'Hip replacement after a fall', 'Brain tumour removal'],
+    'treatment': ['Stage 2 breast cancer requiring chemotherapy', 'Leukemia requiring a bone marrow transplant',
+                  'Tuberculosis requiring long-term treatment', 'Severe burns requiring skin grafts'],
+    'medication': ['Type 1 diabetes requiring insulin therapy', 'Epilepsy requiring daily medication',
+                   'HIV antiretroviral therapy', 'Rheumatoid arthritis biologic therapy'],
+    'emergency': ['Acute kidney failure requiring dialysis', 'Road accident trauma care',
+                  'Dengue haemorrhagic fever intensive care', 'Snakebite antivenom and ICU care']
+}
+FRAUD_REASONS = ['Beneficiary details could not be verified', 'Possible duplicate campaign',
+                 'Medical documents look altered', 'Target amount seems inflated']
+MESSAGES = ['Wishing you a speedy recovery!', 'Stay strong!', 'You are not alone in this fight.',
+            'Hope this helps with your treatment.', 'Get well soon.', 'Sending love and prayers.']
+
+# (value, weight) distributions
+CAMPAIGN_STATUSES = [('approved', 60), ('completed', 15), ('pending', 12), ('rejected', 8), ('cancelled', 5)]
+URGENCIES = [('critical', 15), ('high', 30), ('medium', 35), ('low', 20)]
+DONATION_STATUSES = [('completed', 94), ('pending', 3), ('failed', 2), ('refunded', 1)]
+FRAUD_STATUSES = [('dismissed', 50), ('pending', 25), ('investigating', 15), ('confirmed', 10)]
+DISBURSEMENT_STATUSES = [('processed', 55), ('approved', 20), ('pending', 20), ('failed', 5)]
+ORGANIZATION_TYPES = [('hospital', 50), ('ngo', 35), ('phi', 15)]
+
+# Popularity skew: the item ranked k gets weight 1 / k**exponent
+HOT_CAMPAIGN_SKEW = 1.1
+HEAVY_DONOR_SKEW = 0.8
+BUSY_PARTNER_SKEW = 0.7
+
+
+class Progress:
+    """Single-line progress indicator on stderr"""
+
+    def __init__(self, label, total):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+        self._shown_at = 0
+
+    def advance(self, count):
+        self.done += count
+        now = time.monotonic()
+        if now - self._shown_at >= 0.5 or self.done >= self.total:
+            self._shown_at = now
+            rate = self.done / max(now - self.started, 1e-9)
+            percent = 100 * self.done / self.total if self.total else 100
+            sys.stderr.write(f'\r  {self.label}: {self.done:,}/{self.total:,} ({percent:.0f}%, {rate:,.0f} rows/s)')
+            sys.stderr.flush()
+
+    def finish(self):
+        sys.stderr.write(f'\r  {self.label}: {self.done:,} rows in {time.monotonic() - self.started:.1f}s' + ' ' * 30 + '\n')
+
+
+class BulkLoader:
+    """Writes row batches with COPY on PostgreSQL, multi-row INSERTs elsewhere"""
+
+    def __init__(self, conn, batch_size):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.use_copy = conn.dialect.name == 'postgresql'
+
+    def load(self, table, columns, rows, progress=None):
+        """Write an iterable of row tuples (in `columns` order)"""
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._write(table, columns, batch)
+                if progress:
+                    progress.advance(len(batch))
+                batch = []
+        if batch:
+            self._write(table, columns, batch)
+            if progress:
+                progress.advance(len(batch))
+
+    def _write(self, table, columns, batch):
+        if not self.use_copy:
+            self.conn.execute(db.metadata.tables[table].insert().values([dict(zip(columns, row)) for row in batch]))
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow(['' if value is None else value for value in row])
+        buffer.seek(0)
+        cursor = self.conn.connection.dbapi_connection.cursor()
+        try:
+            # Unquoted empty fields are NULL in CSV COPY
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+
+def _weighted(rng, choices, k):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights, k=k)
+
+
+def _skewed_cum_weights(count, exponent):
+    """Cumulative Zipf-like weights over `count` ranks"""
+    total = 0.0
+    cumulative = []
+    for rank in range(1, count + 1):
+        total += 1 / rank ** exponent
+        cumulative.append(total)
+    return cumulative
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _user_row(rng, user_id, email, password_hash, user_type, created_at):
+    return (
+        user_id, email, password_hash, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+        f'+9477{rng.randrange(10 ** 7):07d}', user_type, rng.random() > 0.005, rng.random() < 0.8,
+        created_at, created_at
+    )
+
+
+# Synthetic data ends at this moment unless --anchor is given
+DEFAULT_ANCHOR = datetime(2025, 1, 1)
+
+USER_COLUMNS = ['id', 'email', 'password_hash', 'first_name', 'last_name', 'phone', 'user_type',
+                'is_active', 'is_verified', 'created_at', 'updated_at']
+
+
+def seed_scale(scale, seed, batch_size, anchor=DEFAULT_ANCHOR, config_name=None):
+    """Bulk-load synthetic load-test data; counts are SCALE_UNIT times scale.
+
+    All timestamps are derived from anchor (never the clock), so a seed
+    gives the same data whenever it is loaded.
+    """
+    app = create_app(config_name or os.getenv('FLASK_ENV', 'development'))
+    app.config['PASSWORD_HASH_METHOD'] = Config.PASSWORD_HASH_METHOD
+    counts = {name: max(1, round(unit * scale)) for name, unit in SCALE_UNIT.items()}
+    rng = random.Random(seed)
+
+    with app.app_context():
+        if User.query.count() > 0:
+            print("Database already contains data. Skipping seeding.")
+            return
+
+        print(f"Seeding synthetic data at scale {scale} (seed {seed}): "
+              + ', '.join(f'{count:,} {name}' for name, count in counts.items()))
+        started = time.monotonic()
+        # Every synthetic account shares one hash; hashing per user would dominate the load time
+        password_hash = hash_password('password123')
+
+        with db.engine.begin() as conn:
+            loader = BulkLoader(conn, batch_size)
+
+            # Donors
+            donor_ids = [_uuid(rng) for _ in range(counts['donors'])]
+            donor_created = [anchor - timedelta(seconds=rng.uniform(0, 730 * 86400)) for _ in donor_ids]
+            progress = Progress('donors', counts['donors'] * 2)
+            loader.load('users', USER_COLUMNS, (
+                _user_row(rng, donor_id, f'donor{i:07d}@loadtest.suwa', password_hash, 'donor', created_at)
+                for i, (donor_id, created_at) in enumerate(zip(donor_ids, donor_created))
+            ), progress)
+            loader.load('donors', ['id', 'is_anonymous', 'total_donated', 'notification_preferences'], (
+                (donor_id, rng.random() < 0.05, 0,
+                 json.dumps({'email': rng.random() < 0.9, 'sms': rng.random() < 0.3}))
+                for donor_id in donor_ids
+            ), progress)
+            progress.finish()
+
+            # Partners and admins
+            partner_ids = [_uuid(rng) for _ in range(counts['partners'])]
+            admin_ids = [_uuid(rng) for _ in range(3)]
+            progress = Progress('partners and admins', (len(partner_ids) + len(admin_ids)) * 2)
+            loader.load('users', USER_COLUMNS, [
+                _user_row(rng, partner_id, f'partner{i:05d}@loadtest.suwa', password_hash, 'partner',
+                          anchor - timedelta(days=rng.uniform(540, 1095)))
+                for i, partner_id in enumerate(partner_ids)
+            ] + [
+                _user_row(rng, admin_id, f'admin{i}@loadtest.suwa', password_hash, 'admin',
+                          anchor - timedelta(days=1095))
+                for i, admin_id in enumerate(admin_ids)
+            ], progress)
+            organization_types = _weighted(rng, ORGANIZATION_TYPES, len(partner_ids))
+            loader.load('partners', ['id', 'organization_name', 'organization_type', 'registration_number', 'address',
+                                     'city', 'country', 'bank_account_number', 'bank_name', 'is_verified'], (
+                (partner_id, f'{city} {organization_type.upper() if organization_type == "phi" else organization_type.title()} {i}',
+                 organization_type, f'REG{i:07d}', f'{rng.randrange(1, 500)} Main Street, {city}', city, 'Sri Lanka',
+                 f'{rng.randrange(10 ** 10):010d}', rng.choice(BANKS), rng.random() < 0.9)
+                for i, (partner_id, organization_type, city) in enumerate(
+                    zip(partner_ids, organization_types, (rng.choice(CITIES) for _ in partner_ids))
+                )
+            ), progress)
+            loader.load('admins', ['id', 'role', 'permissions'], (
+                (admin_id, 'super_admin' if i == 0 else 'admin', json.dumps({}))
+                for i, admin_id in enumerate(admin_ids)
+            ), progress)
+            progress.finish()
+
+            # Campaigns, spread unevenly across partners
+            campaign_ids = [_uuid(rng) for _ in range(counts['campaigns'])]
+            campaign_created = [anchor - timedelta(seconds=rng.uniform(0, 540 * 86400)) for _ in campaign_ids]
+            campaign_statuses = _weighted(rng, CAMPAIGN_STATUSES, len(campaign_ids))
+            campaign_partners = rng.choices(partner_ids, cum_weights=_skewed_cum_weights(len(partner_ids), BUSY_PARTNER_SKEW),
+                                            k=len(campaign_ids))
+
+            def campaign_rows():
+                for campaign_id, created_at, status, partner_id in zip(
+                    campaign_ids, campaign_created, campaign_statuses, campaign_partners
+                ):
+                    category = rng.choice(list(CONDITIONS))
+                    condition = rng.choice(CONDITIONS[category])
+                    beneficiary = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+                    target = round(min(max(rng.lognormvariate(10, 0.9), 1000), 500000), -2)
+                    yield (
+                        campaign_id, f'{condition.split(" requiring")[0]} support for {beneficiary}',
+                        f'{beneficiary} needs help with {condition.lower()}.', category,
+                        _weighted(rng, URGENCIES, 1)[0], target, 0, 0, status, beneficiary, rng.randrange(1, 90),
+                        condition, partner_id, created_at, created_at,
+                        created_at + timedelta(days=rng.randrange(30, 180))
+                    )
+
+            progress = Progress('campaigns', len(campaign_ids))
+            loader.load('campaigns', ['id', 'title', 'description', 'category', 'urgency', 'target_amount',
+                                      'funds_raised', 'counter_shards', 'status', 'beneficiary_name', 'beneficiary_age',
+                                      'beneficiary_medical_condition', 'partner_id', 'created_at', 'updated_at',
+                                      'deadline'], campaign_rows(), progress)
+            progress.finish()
+
+            # Donations go to live campaigns; a few hot campaigns and heavy donors get most of them
+            live = [i for i, status in enumerate(campaign_statuses) if status in ('approved', 'completed')]
+            rng.shuffle(live)
+            live_cum_weights = _skewed_cum_weights(len(live), HOT_CAMPAIGN_SKEW)
+            donor_order = list(range(len(donor_ids)))
+            rng.shuffle(donor_order)
+            donor_cum_weights = _skewed_cum_weights(len(donor_order), HEAVY_DONOR_SKEW)
+
+            progress = Progress('donations and transactions', counts['donations'])
+            donation_columns = ['id', 'campaign_id', 'donor_id', 'amount', 'is_anonymous', 'status', 'transaction_id',
+                                'donor_message', 'created_at', 'completed_at']
+            transaction_columns = ['id', 'donation_id', 'payment_method', 'transaction_reference', 'amount', 'currency',
+                                   'status', 'created_at', 'processed_at']
+            for offset in range(0, counts['donations'], batch_size):
+                size = min(batch_size, counts['donations'] - offset)
+                campaigns = rng.choices(live, cum_weights=live_cum_weights, k=size)
+                donors = rng.choices(donor_order, cum_weights=donor_cum_weights, k=size)
+                statuses = _weighted(rng, DONATION_STATUSES, size)
+                donations, transactions = [], []
+                for n, (campaign, donor, status) in enumerate(zip(campaigns, donors, statuses)):
+                    donation_id = _uuid(rng)
+                    age = (anchor - campaign_created[campaign]).total_seconds()
+                    created_at = campaign_created[campaign] + timedelta(seconds=rng.uniform(0, age))
+                    completed_at = created_at + timedelta(seconds=rng.uniform(2, 120)) if status in ('completed', 'refunded') else None
+                    amount = round(min(max(rng.lognormvariate(3.5, 1.1), 1), 25000), 2)
+                    intent_id = f'pi_seed{seed}_{offset + n:09d}'
+                    donations.append((
+                        donation_id, campaign_ids[campaign], donor_ids[donor] if rng.random() > 0.02 else None,
+                        amount, rng.random() < 0.1, status, intent_id,
+                        rng.choice(MESSAGES) if rng.random() < 0.15 else None, created_at, completed_at
+                    ))
+                    if completed_at:
+                        transactions.append((
+                            _uuid(rng), donation_id, 'stripe', intent_id, amount, 'USD',
+                            'success', completed_at, completed_at
+                        ))
+                loader.load('donations', donation_columns, donations)
+                loader.load('transactions', transaction_columns, transactions)
+                progress.advance(size)
+            progress.finish()
+
+            # Fraud reports and disbursements
+            progress = Progress('fraud reports and disbursements', counts['fraud_reports'] + counts['disbursements'])
+            def fraud_report_rows():
+                for status in _weighted(rng, FRAUD_STATUSES, counts['fraud_reports']):
+                    campaign = rng.randrange(len(campaign_ids))
+                    created_at = campaign_created[campaign] + timedelta(days=rng.uniform(0, 30))
+                    yield (
+                        _uuid(rng), campaign_ids[campaign], rng.choice(donor_ids), rng.choice(FRAUD_REASONS),
+                        status, created_at, created_at
+                    )
+
+            loader.load('fraud_reports', ['id', 'campaign_id', 'reported_by_id', 'description', 'status',
+                                          'created_at', 'updated_at'], fraud_report_rows(), progress)
+
+            def disbursement_rows():
+                for status in _weighted(rng, DISBURSEMENT_STATUSES, counts['disbursements']):
+                    campaign = rng.choice(live)
+                    created_at = campaign_created[campaign] + timedelta(days=rng.uniform(1, 60))
+                    approved = status in ('approved', 'processed')
+                    yield (
+                        _uuid(rng), campaign_ids[campaign], round(rng.uniform(500, 20000), 2), status,
+                        f'{rng.randrange(10 ** 10):010d}', rng.choice(BANKS),
+                        rng.choice(admin_ids) if approved else None, created_at,
+                        created_at + timedelta(days=1) if approved else None,
+                        created_at + timedelta(days=3) if status == 'processed' else None
+                    )
+
+            loader.load('disbursements', ['id', 'campaign_id', 'amount', 'status', 'bank_account_number', 'bank_name',
+                                          'approved_by_id', 'created_at', 'approved_at', 'processed_at'],
+                        disbursement_rows(), progress)
+            progress.finish()
+
+            # Denormalized totals, as the payment worker would have maintained them
+            print("  Updating campaign and donor totals...")
+            conn.execute(text(
+                "UPDATE campaigns SET funds_raised = totals.amount FROM ("
+                " SELECT campaign_id, SUM(amount) AS amount FROM donations"
+                " WHERE status = 'completed' GROUP BY campaign_id"
+                ") AS totals WHERE campaigns.id = totals.campaign_id"
+            ))
+            conn.execute(text(
+                "UPDATE donors SET total_donated = totals.amount FROM ("
+                " SELECT donor_id, SUM(amount) AS amount FROM donations"
+                " WHERE status = 'completed' AND donor_id IS NOT NULL GROUP BY donor_id"
+                ") AS totals WHERE donors.id = totals.donor_id"
+            ))
+
+        if db.engine.dialect.name == 'postgresql':
+            print("  Building donation rollups...")
+            backfill_rollups()
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text('ANALYZE'))
+
+        print(f"\nSynthetic data seeding complete in {time.monotonic() - started:.1f}s")
+        print("All synthetic accounts use the password 'password123'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, help='bulk-load synthetic data, in units of 100,000 donations')
+    parser.add_argument('--seed', type=int, default=1, help='random seed (same seed, same data)')
+    parser.add_argument('--batch-size', type=int, default=10000, help='rows per COPY or INSERT')
+    parser.add_argument('--anchor', type=datetime.fromisoformat, default=DEFAULT_ANCHOR,
+                        help=f'synthetic data ends at this date (default {DEFAULT_ANCHOR.date()})')
+    parser.add_argument('--config', default=os.getenv('FLASK_ENV', 'development'),
+                        help='app configuration (default: FLASK_ENV or development)')
+    args = parser.parse_args()
+
+    if args.scale is None:
+        seed_db(args.config)
+    elif args.scale <= 0 or args.batch_size < 1:
+        parser.error('--scale and --batch-size must be positive')
+    else:
+        seed_scale(args.scale, args.seed, args.batch_size, args.anchor, args.config)
+
+
 if __name__ == '__main__':
-    seed_db()
+    main()
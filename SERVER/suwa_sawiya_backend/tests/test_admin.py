@@ -0,0 +1,147 @@
+"""Admin dashboard, partner progress, donation analytics and exports"""
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+from app.models import db
+from app.models.campaign import DonationRollup
+from app.utils.payment_events import apply_payment_results
+from app.utils.rollups import backfill_rollups
+
+
+def _settle(app, campaign_id, make_donation, amounts):
+    """Pending donations settled the way the webhook worker settles them"""
+    intents = {}
+    for i, amount in enumerate(amounts):
+        intent_id = f'pi_{campaign_id.hex[:8]}_{i}'
+        make_donation(campaign_id, amount, status='pending', transaction_id=intent_id)
+        intents[intent_id] = ('usd', int(round(amount * 100)))
+    with app.app_context():
+        apply_payment_results(intents, {})
+        db.session.commit()
+
+
+def _rollups(app):
+    with app.app_context():
+        return sorted(
+            (r.granularity, r.bucket_start, r.campaign_id, r.donation_count, r.amount)
+            for r in DonationRollup.query.all()
+        )
+
+
+def test_dashboard_counts_everything_and_is_cached_until_refreshed(client, make_user, make_campaign, make_donation):
+    admin = make_user('admin')
+    make_user('donor')
+    make_user('partner')
+    approved = make_campaign(funds_raised=300)
+    make_campaign(status='pending')
+    make_donation(approved, 100.0)
+    make_donation(approved, 200.0)
+
+    stats = client.get('/api/admin/dashboard', headers=admin.headers).get_json()['data']
+
+    assert stats['users'] == {'total': 3, 'donors': 1, 'partners': 1}
+    assert stats['campaigns'] == {'total': 2, 'approved': 1, 'pending': 1, 'total_funds_raised': 300}
+    assert stats['donations'] == {'total': 2, 'average_amount': 150}
+    assert len(stats['recent_campaigns']) == 2
+
+    make_campaign(status='pending')
+    cached = client.get('/api/admin/dashboard', headers=admin.headers).get_json()['data']
+    refreshed = client.get('/api/admin/dashboard?refresh=true', headers=admin.headers).get_json()['data']
+    assert cached['campaigns']['total'] == 2
+    assert refreshed['campaigns']['total'] == 3
+
+
+def test_partner_progress_aggregates_donations(client, make_user, make_campaign, make_donation):
+    partner, donor = make_user('partner'), make_user('donor')
+    busy = make_campaign(partner_id=partner.id, target_amount=1000, funds_raised=250)
+    quiet = make_campaign(partner_id=partner.id)
+    make_campaign()  # Another partner's
+    for amount, anonymous in [(100.0, False), (100.0, False), (50.0, True)]:
+        make_donation(busy, amount, donor_id=donor.id, is_anonymous=anonymous)
+    make_donation(busy, 500.0, status='pending')
+
+    progress = client.get('/api/partner/campaigns/progress', headers=partner.headers).get_json()['data']
+
+    by_id = {item['campaign_id']: item for item in progress}
+    assert set(by_id) == {str(busy), str(quiet)}
+    assert by_id[str(busy)]['donation_count'] == 3
+    assert by_id[str(busy)]['total_donors'] == 1
+    assert by_id[str(busy)]['anonymous_donations'] == 1
+    assert by_id[str(busy)]['progress_percentage'] == 25.0
+    assert by_id[str(quiet)]['donation_count'] == 0
+
+
+def test_settlements_maintain_rollups_that_backfill_reproduces(app, client, make_user, make_campaign, make_donation):
+    admin = make_user('admin')
+    surgery = make_campaign(category='surgery')
+    medication = make_campaign(category='medication')
+    _settle(app, surgery, make_donation, [10.0, 20.0])
+    _settle(app, medication, make_donation, [5.0])
+
+    maintained = _rollups(app)
+    with app.app_context():
+        backfill_rollups()
+    assert _rollups(app) == maintained
+
+    response = client.get('/api/admin/analytics/donations', headers=admin.headers,
+                          query_string={'granularity': 'day', 'group_by': 'category'})
+    series = {point['category']: point for point in response.get_json()['data']['series']}
+    assert series['surgery']['donation_count'] == 2 and series['surgery']['amount'] == 30.0
+    assert series['medication']['donation_count'] == 1 and series['medication']['amount'] == 5.0
+
+
+def test_backfill_rebuilds_only_the_requested_days(app, make_campaign, make_donation):
+    campaign_id = make_campaign()
+    today = datetime.utcnow()
+    last_week = today - timedelta(days=7)
+    make_donation(campaign_id, 10.0, completed_at=today)
+    make_donation(campaign_id, 20.0, completed_at=last_week)
+
+    with app.app_context():
+        backfill_rollups(today - timedelta(days=1), today + timedelta(days=1))
+        days = {r.bucket_start.date(): r.amount for r in DonationRollup.query.filter_by(granularity='day')}
+
+    assert days == {today.date(): 10.0}
+
+
+def test_analytics_rejects_bad_ranges(client, make_user):
+    admin = make_user('admin')
+
+    assert client.get('/api/admin/analytics/donations?granularity=minute', headers=admin.headers).status_code == 400
+    too_long = {'granularity': 'hour', 'start': '2020-01-01', 'end': '2024-01-01'}
+    assert client.get('/api/admin/analytics/donations', headers=admin.headers, query_string=too_long).status_code == 400
+
+
+def test_csv_export_neutralises_formulas(client, make_user, make_campaign):
+    admin = make_user('admin')
+    make_campaign(title='=HYPERLINK("http://evil.example","Click")', beneficiary_name='+Nimal')
+
+    response = client.get('/api/admin/export/campaigns', headers=admin.headers)
+
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'].endswith('.csv"')
+    [row] = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert row['title'] == '\'=HYPERLINK("http://evil.example","Click")'
+    assert row['beneficiary_name'] == "'+Nimal"
+
+
+def test_ndjson_export_filters_and_hides_anonymous_donors(client, make_user, make_campaign, make_donation):
+    admin, donor = make_user('admin'), make_user('donor')
+    campaign_id = make_campaign()
+    make_donation(campaign_id, 10.0, donor_id=donor.id)
+    make_donation(campaign_id, 20.0, donor_id=donor.id, is_anonymous=True)
+    make_donation(campaign_id, 30.0, status='pending')
+
+    response = client.get('/api/admin/export/donations', headers=admin.headers,
+                          query_string={'format': 'ndjson', 'status': 'completed', 'gzip': 'true'})
+
+    assert response.mimetype == 'application/gzip'
+    rows = [json.loads(line) for line in gzip.decompress(response.get_data()).decode().splitlines()]
+    assert sorted((row['amount'], row['donor_id']) for row in rows) == [(10.0, str(donor.id)), (20.0, None)]
+
+
+def test_unknown_exports_are_not_found(client, make_user):
+    assert client.get('/api/admin/export/users', headers=make_user('admin').headers).status_code == 404
@@ -0,0 +1,69 @@
+"""Token role claims, revocation of deactivated users and rehash-on-login"""
+from flask_jwt_extended import decode_token
+from werkzeug.security import generate_password_hash
+
+from app.models import db
+from app.models.user import User
+from conftest import PASSWORD
+
+
+def test_tokens_carry_role_and_active_claims(app, make_user):
+    partner = make_user('partner')
+
+    with app.app_context():
+        claims = decode_token(partner.token)
+
+    assert claims['sub'] == str(partner.id)
+    assert claims['role'] == 'partner' and claims['active'] is True
+
+
+def test_roles_are_checked_from_the_token(client, make_user):
+    donor, admin = make_user('donor'), make_user('admin')
+
+    assert client.get('/api/admin/dashboard', headers=donor.headers).status_code == 403
+    assert client.get('/api/admin/dashboard', headers=admin.headers).status_code == 200
+
+
+def test_rejected_partner_tokens_are_refused_immediately(client, make_user):
+    partner, admin = make_user('partner'), make_user('admin')
+    assert client.get('/api/partner/profile', headers=partner.headers).status_code == 200
+
+    response = client.post(f'/api/admin/partners/{partner.id}/reject', headers=admin.headers, json={'reason': 'Fraud'})
+    assert response.status_code == 200
+
+    assert client.get('/api/partner/profile', headers=partner.headers).status_code == 401
+
+
+def test_deactivations_by_other_workers_are_picked_up_on_refresh(app, client, make_user, monkeypatch):
+    donor = make_user('donor')
+    assert client.get('/api/auth/profile', headers=donor.headers).status_code == 200
+
+    with app.app_context():
+        User.query.filter_by(id=donor.id).update({'is_active': False})
+        db.session.commit()
+    monkeypatch.setitem(app.config, 'AUTH_REVOCATION_REFRESH', 0)
+
+    assert client.get('/api/auth/profile', headers=donor.headers).status_code == 401
+
+
+def test_login_upgrades_hashes_made_with_older_settings(app, client, make_user):
+    donor = make_user('donor')
+    with app.app_context():
+        User.query.filter_by(id=donor.id).update({'password_hash': generate_password_hash(PASSWORD, 'pbkdf2:sha256:500')})
+        db.session.commit()
+
+    response = client.post('/api/auth/login', json={'email': donor.email, 'password': PASSWORD})
+
+    assert response.status_code == 200
+    with app.app_context():
+        password_hash = db.session.get(User, donor.id).password_hash
+    assert password_hash.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+    assert client.post('/api/auth/login', json={'email': donor.email, 'password': PASSWORD}).status_code == 200
+
+
+def test_login_rejects_wrong_passwords(client, make_user):
+    donor = make_user('donor')
+
+    response = client.post('/api/auth/login', json={'email': donor.email, 'password': 'not-the-password'})
+
+    assert response.status_code == 401
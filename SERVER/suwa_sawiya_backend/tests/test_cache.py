@@ -0,0 +1,36 @@
+"""Response cache backends and the worker scripts' shared-cache guard"""
+import importlib
+
+import pytest
+from flask import Flask
+
+from app.utils.cache import ResponseCache, UNSHARED_CACHE_ERROR
+
+
+def _cache(backend):
+    app = Flask(__name__)
+    app.config.update(CACHE_BACKEND=backend, CACHE_REDIS_URL='redis://localhost:6379/0')
+    cache = ResponseCache()
+    cache.init_app(app)
+    return cache
+
+
+@pytest.mark.parametrize('backend, shared', [('memory', False), ('redis', True), ('none', True)])
+def test_only_the_memory_backend_is_private_to_a_process(backend, shared):
+    assert _cache(backend).is_shared is shared
+
+
+@pytest.mark.parametrize('script, entry_point', [
+    ('process_payment_events', 'run_worker'),
+    ('compact_counters', 'compact_counters'),
+    ('reconcile_donations', 'main'),
+])
+def test_worker_scripts_refuse_the_memory_backend(script, entry_point, monkeypatch):
+    module = importlib.import_module(script)
+    monkeypatch.setenv('FLASK_ENV', 'testing')
+    monkeypatch.setattr('sys.argv', [script])
+
+    with pytest.raises(SystemExit) as exit_info:
+        getattr(module, entry_point)()
+
+    assert exit_info.value.code == UNSHARED_CACHE_ERROR
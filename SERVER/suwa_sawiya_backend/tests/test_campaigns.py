@@ -0,0 +1,129 @@
+"""Public campaign reads: search, pagination, priority, detail and caching"""
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def _get(client, url, **params):
+    response = client.get(url, query_string=params)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+@pytest.fixture
+def campaigns(make_campaign):
+    """Seven approved campaigns, one minute apart, plus a pending one"""
+    now = datetime.utcnow()
+    ids = [make_campaign(title=f'Campaign {i}', created_at=now - timedelta(minutes=i)) for i in range(7)]
+    make_campaign(title='Awaiting review', status='pending')
+    return ids
+
+
+def test_search_ranks_matches_and_escapes_highlights(client, make_campaign):
+    best = make_campaign(title='Kidney transplant for <b>Amal</b>', description='An urgent kidney transplant')
+    other = make_campaign(title='Eye operation', description='Recovery after a kidney infection')
+    make_campaign(title='Insulin supply', description='Monthly insulin')
+
+    body = _get(client, '/api/donor/campaigns/search', search='kidney')
+
+    assert [item['id'] for item in body['data']] == [str(best), str(other)]
+    assert body['pagination']['total'] == 2
+    title = body['data'][0]['highlights']['title']
+    assert '<mark>Kidney</mark>' in title
+    assert '&lt;b&gt;Amal&lt;/b&gt;' in title and '<b>' not in title
+
+
+def test_search_supports_phrases_and_negation(client, make_campaign):
+    make_campaign(title='Kidney transplant', description='Donor found')
+    make_campaign(title='Kidney stones', description='Transplant not needed')
+
+    assert _get(client, '/api/donor/campaigns/search', search='"kidney transplant"')['pagination']['total'] == 1
+    assert _get(client, '/api/donor/campaigns/search', search='kidney -stones')['pagination']['total'] == 1
+
+
+def test_cursor_pagination_walks_every_campaign_once(client, campaigns):
+    seen, cursor = [], ''
+    while cursor is not None:
+        body = _get(client, '/api/donor/campaigns', cursor=cursor, per_page=3, include_total='false')
+        assert body['pagination']['total'] is None
+        seen += [item['id'] for item in body['data']]
+        cursor = body['pagination']['next_cursor']
+
+    assert seen == [str(campaign_id) for campaign_id in campaigns]
+
+
+def test_offset_pagination_reports_totals(client, campaigns):
+    body = _get(client, '/api/donor/campaigns', page=3, per_page=3)
+
+    # Offset pages have no defined order; only their size is checked
+    assert len(body['data']) == 1
+    assert body['data'][0]['id'] in {str(campaign_id) for campaign_id in campaigns}
+    assert body['pagination']['total'] == 7
+    assert body['pagination']['has_more'] is False
+
+
+def test_malformed_cursors_are_rejected(client, campaigns):
+    response = client.get('/api/donor/campaigns', query_string={'cursor': 'not-a-cursor'})
+
+    assert response.status_code == 400
+
+
+def test_priority_orders_by_urgency_then_amount_still_needed(client, make_campaign):
+    low = make_campaign(urgency='low', target_amount=90000)
+    high_small = make_campaign(urgency='high', target_amount=1000)
+    critical = make_campaign(urgency='critical', target_amount=500)
+    high_large = make_campaign(urgency='high', target_amount=8000, funds_raised=1000)
+
+    body = _get(client, '/api/donor/campaigns/priority', limit=3)
+
+    assert [item['id'] for item in body['data']] == [str(critical), str(high_large), str(high_small)]
+    assert client.get('/api/donor/campaigns/priority', query_string={'limit': 1000}).status_code == 400
+    assert str(low) not in [item['id'] for item in body['data']]
+
+
+def test_campaign_detail_embeds_a_bounded_donation_summary(client, make_user, make_campaign, make_donation):
+    campaign_id = make_campaign()
+    donors = [make_user('donor') for _ in range(3)]
+    for i in range(8):
+        make_donation(campaign_id, 10.0, donor_id=donors[i % 3].id, is_anonymous=i == 0)
+    make_donation(campaign_id, 99.0, status='pending')
+
+    data = _get(client, f'/api/donor/campaigns/{campaign_id}')['data']
+
+    assert 'donations' not in data
+    summary = data['donation_summary']
+    assert summary['donation_count'] == 8
+    assert summary['donor_count'] == 3
+    assert summary['anonymous_donations'] == 1
+    assert len(summary['latest_donations']) == 5
+
+
+def test_campaign_donations_stream_by_cursor(client, make_campaign, make_donation):
+    campaign_id = make_campaign()
+    now = datetime.utcnow()
+    donation_ids = [make_donation(campaign_id, created_at=now - timedelta(seconds=i)) for i in range(5)]
+
+    first = _get(client, f'/api/donor/campaigns/{campaign_id}/donations', per_page=3)
+    second = _get(client, f'/api/donor/campaigns/{campaign_id}/donations', per_page=3,
+                  cursor=first['pagination']['next_cursor'])
+
+    assert first['pagination']['total'] is None
+    assert [d['id'] for d in first['data'] + second['data']] == [str(d) for d in donation_ids]
+    assert second['pagination']['has_more'] is False
+
+
+def test_cached_reads_are_invalidated_by_writes(client, make_user, campaigns):
+    admin = make_user('admin')
+    url = f'/api/donor/campaigns/{campaigns[0]}'
+
+    assert client.get(url).headers['X-Cache'] == 'MISS'
+    assert client.get(url).headers['X-Cache'] == 'HIT'
+    assert client.get('/api/donor/campaigns').headers['X-Cache'] == 'MISS'
+
+    response = client.put(f'/api/admin/campaigns/{campaigns[0]}', headers=admin.headers, json={'title': 'Renamed'})
+    assert response.status_code == 200
+
+    detail = client.get(url)
+    assert detail.headers['X-Cache'] == 'MISS'
+    assert detail.get_json()['data']['title'] == 'Renamed'
+    assert client.get('/api/donor/campaigns').headers['X-Cache'] == 'MISS'
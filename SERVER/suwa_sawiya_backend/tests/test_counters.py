@@ -0,0 +1,38 @@
+"""Concurrent settlements never lose campaign or donor increments"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.models import db
+from app.models.campaign import Campaign, CampaignFundShard
+from app.models.user import Donor
+from app.utils.counters import compact_fund_shards
+from app.utils.payment_events import apply_payment_results
+
+
+def _settle(app, intent_ids):
+    with app.app_context():
+        apply_payment_results({intent_id: ('usd', 500) for intent_id in intent_ids}, {})
+        db.session.commit()
+
+
+@pytest.mark.parametrize('shards', [0, 4])
+def test_concurrent_batches_settle_every_donation_once(app, make_user, make_campaign, make_donation, shards):
+    donor = make_user('donor')
+    campaign_id = make_campaign(counter_shards=shards)
+    intent_ids = [f'pi_concurrent_{i}' for i in range(40)]
+    for intent_id in intent_ids:
+        make_donation(campaign_id, 5.0, status='pending', donor_id=donor.id, transaction_id=intent_id)
+
+    # Every donation is offered to two batches, as when webhook events are redelivered
+    batches = [intent_ids[i:i + 5] for i in range(0, 40, 5)] * 2
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for future in [pool.submit(_settle, app, batch) for batch in batches]:
+            future.result()
+
+    with app.app_context():
+        if shards:
+            assert CampaignFundShard.query.filter_by(campaign_id=campaign_id).count() > 0
+        compact_fund_shards()
+        assert db.session.get(Campaign, campaign_id).funds_raised == 200.0
+        assert db.session.get(Donor, donor.id).total_donated == 200.0
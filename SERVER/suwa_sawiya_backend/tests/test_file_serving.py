@@ -0,0 +1,108 @@
+"""Cover images, their variants and documents served from the upload store"""
+import io
+
+import pytest
+from PIL import Image
+
+from app.models import db
+from app.models.campaign import Campaign
+
+PDF = b'%PDF-1.4\n1 0 obj << /Type /Catalog >> endobj\n%%EOF\n' * 50
+
+
+def _png(width=1200, height=800):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 40, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def partner_campaign(app, client, make_user, upload_folder):
+    """(partner, campaign id) for an approved campaign created with a cover image"""
+    partner = make_user('partner')
+    response = client.post('/api/partner/campaigns', headers=partner.headers, data={
+        'title': 'Cover test', 'category': 'surgery', 'urgency': 'high', 'target_amount': '1000',
+        'beneficiary_name': 'Nimal', 'beneficiary_medical_condition': 'Fracture',
+        'cover_image': (io.BytesIO(_png()), 'cover.png')
+    })
+    assert response.status_code == 201
+    campaign_id = response.get_json()['data']['id']
+    with app.app_context():
+        Campaign.query.filter_by(id=campaign_id).update({'status': 'approved'})
+        db.session.commit()
+    return partner, campaign_id
+
+
+def test_cover_variants_are_rendered_and_served(app, client, partner_campaign):
+    _, campaign_id = partner_campaign
+
+    variants = client.get(f'/api/donor/campaigns/{campaign_id}').get_json()['data']['cover_image_variants']
+    assert (variants['card']['width'], variants['card']['height']) == (600, 400)
+    assert (variants['thumbnail']['width'], variants['thumbnail']['height']) == (240, 160)
+    with app.app_context():
+        card_hash = db.session.get(Campaign, campaign_id).cover_variants['card']['content_hash']
+
+    response = client.get(variants['card']['url'])
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    assert response.headers['ETag'] == f'"{card_hash}"'
+    assert 'public' in response.headers['Cache-Control']
+    assert client.get(f'/api/files/campaigns/{campaign_id}/cover/poster').status_code == 404
+
+
+def test_cover_revalidates_with_etag(client, partner_campaign):
+    _, campaign_id = partner_campaign
+    url = f'/api/files/campaigns/{campaign_id}/cover'
+
+    first = client.get(url)
+    assert first.status_code == 200 and first.mimetype == 'image/png'
+
+    again = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.get_data() == b''
+
+
+def test_cover_serves_byte_ranges(client, partner_campaign):
+    _, campaign_id = partner_campaign
+    url = f'/api/files/campaigns/{campaign_id}/cover'
+    full = client.get(url).get_data()
+
+    partial = client.get(url, headers={'Range': 'bytes=0-99'})
+    assert partial.status_code == 206
+    assert partial.headers['Content-Range'] == f'bytes 0-99/{len(full)}'
+    assert partial.get_data() == full[:100]
+
+    beyond = client.get(url, headers={'Range': f'bytes={len(full) + 10}-'})
+    assert beyond.status_code == 416
+
+
+def test_unapproved_covers_are_private(app, client, make_user, partner_campaign):
+    partner, campaign_id = partner_campaign
+    with app.app_context():
+        Campaign.query.filter_by(id=campaign_id).update({'status': 'pending'})
+        db.session.commit()
+    url = f'/api/files/campaigns/{campaign_id}/cover'
+
+    assert client.get(url).status_code == 404
+    assert client.get(url, headers=make_user('partner').headers).status_code == 404
+    response = client.get(url, headers=partner.headers)
+    assert response.status_code == 200 and 'private' in response.headers['Cache-Control']
+
+
+def test_documents_are_served_to_the_owning_partner_and_admins(client, make_user, partner_campaign):
+    partner, campaign_id = partner_campaign
+    uploaded = client.post(f'/api/partner/campaigns/{campaign_id}/documents', headers=partner.headers, data={
+        'document': (io.BytesIO(PDF), 'report.pdf')
+    })
+    assert uploaded.status_code == 201
+    url = f'/api/files/documents/{uploaded.get_json()["data"]["id"]}'
+
+    response = client.get(url, headers=partner.headers)
+    assert response.status_code == 200
+    assert response.get_data() == PDF
+    assert response.mimetype == 'application/pdf'
+    assert 'report.pdf' in response.headers['Content-Disposition']
+
+    assert client.get(url, headers=make_user('admin').headers).status_code == 200
+    assert client.get(url, headers=make_user('partner').headers).status_code == 404
+    assert client.get(url, headers=make_user('donor').headers).status_code == 404
+    assert client.get(url).status_code == 401
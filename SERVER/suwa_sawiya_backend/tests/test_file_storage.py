@@ -0,0 +1,88 @@
+"""Uploads: content sniffing, deduplication and reference-counted deletion"""
+import io
+import logging
+import os
+import zipfile
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from app.utils.file_handler import DOCX_MIME_TYPE, delete_file, save_uploaded_file
+
+PDF = b'%PDF-1.4\n1 0 obj << /Type /Catalog >> endobj\n%%EOF\n'
+
+
+@pytest.fixture
+def no_grace_period(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_GC_GRACE_SECONDS', 0)
+
+
+def _upload(client, partner, campaign_id, content=PDF, filename='certificate.pdf'):
+    return client.post(
+        f'/api/partner/campaigns/{campaign_id}/documents', headers=partner.headers,
+        data={'document': (io.BytesIO(content), filename)}, content_type='multipart/form-data'
+    )
+
+
+def _stored_files(upload_folder):
+    return [os.path.join(d, f) for d, _, files in os.walk(upload_folder) for f in files]
+
+
+def test_identical_uploads_are_stored_once(client, make_user, make_campaign, upload_folder):
+    partner = make_user('partner')
+    first = _upload(client, partner, make_campaign(partner_id=partner.id))
+    second = _upload(client, partner, make_campaign(partner_id=partner.id))
+
+    assert first.status_code == second.status_code == 201
+    assert first.get_json()['data']['content_hash'] == second.get_json()['data']['content_hash']
+    assert len(_stored_files(upload_folder)) == 1
+
+
+def test_a_stored_file_is_deleted_with_its_last_reference(client, make_user, make_campaign, upload_folder,
+                                                          no_grace_period):
+    partner, admin = make_user('partner'), make_user('admin')
+    campaign_ids = [make_campaign(partner_id=partner.id) for _ in range(2)]
+    for campaign_id in campaign_ids:
+        assert _upload(client, partner, campaign_id).status_code == 201
+    [stored] = _stored_files(upload_folder)
+
+    assert client.delete(f'/api/admin/campaigns/{campaign_ids[0]}', headers=admin.headers).status_code == 200
+    assert os.path.exists(stored)
+
+    assert client.delete(f'/api/admin/campaigns/{campaign_ids[1]}', headers=admin.headers).status_code == 200
+    assert _stored_files(upload_folder) == []
+    assert os.listdir(upload_folder) == []
+
+
+def test_delete_failures_are_logged(app, upload_folder, caplog):
+    directory = os.path.join(upload_folder, 'not-a-file')
+    os.mkdir(directory)
+    with app.app_context(), caplog.at_level(logging.WARNING):
+        assert delete_file(directory) is False
+    assert f'Error deleting file {directory}' in caplog.text
+
+
+def _zip(*names):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name in names:
+            archive.writestr(name, '<xml/>')
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('content, accepted', [
+    (_zip('[Content_Types].xml', 'word/document.xml'), True),
+    (_zip('[Content_Types].xml', 'xl/workbook.xml'), False),  # A spreadsheet renamed .docx
+    (_zip('payload.exe'), False),
+    (b'PK\x03\x04 but not a zip archive', False),
+])
+def test_docx_uploads_must_be_word_documents(upload_folder, content, accepted):
+    saved, error = save_uploaded_file(
+        FileStorage(io.BytesIO(content), 'report.docx'), upload_folder, {'docx'}
+    )
+
+    if accepted:
+        assert error is None and saved.mime_type == DOCX_MIME_TYPE
+    else:
+        assert error == 'File content does not match its extension'
+        assert _stored_files(upload_folder) == []
@@ -0,0 +1,58 @@
+"""Idempotency-Key handling on donation creation"""
+from app.models.campaign import Donation
+
+
+def _donate(client, account, campaign_id, key=None, amount=25.0):
+    headers = dict(account.headers)
+    if key:
+        headers['Idempotency-Key'] = key
+    return client.post('/api/donor/donate', headers=headers, json={'campaign_id': str(campaign_id), 'amount': amount})
+
+
+def _donation_count(app):
+    with app.app_context():
+        return Donation.query.count()
+
+
+def test_retries_replay_the_original_response(app, client, make_user, make_campaign):
+    donor, campaign_id = make_user('donor'), make_campaign()
+
+    first = _donate(client, donor, campaign_id, key='retry-1')
+    retry = _donate(client, donor, campaign_id, key='retry-1')
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+    assert _donation_count(app) == 1
+
+
+def test_reusing_a_key_for_a_different_request_is_a_conflict(app, client, make_user, make_campaign):
+    donor, campaign_id = make_user('donor'), make_campaign()
+
+    assert _donate(client, donor, campaign_id, key='reused', amount=25.0).status_code == 201
+    assert _donate(client, donor, campaign_id, key='reused', amount=50.0).status_code == 422
+    assert _donation_count(app) == 1
+
+
+def test_keys_are_scoped_per_user(app, client, make_user, make_campaign):
+    campaign_id = make_campaign()
+
+    for donor in (make_user('donor'), make_user('donor')):
+        response = _donate(client, donor, campaign_id, key='same-key')
+        assert response.status_code == 201 and 'Idempotent-Replayed' not in response.headers
+    assert _donation_count(app) == 2
+
+
+def test_requests_without_a_key_are_not_deduplicated(app, client, make_user, make_campaign):
+    donor, campaign_id = make_user('donor'), make_campaign()
+
+    _donate(client, donor, campaign_id)
+    _donate(client, donor, campaign_id)
+
+    assert _donation_count(app) == 2
+
+
+def test_overlong_keys_are_rejected(client, make_user, make_campaign):
+    response = _donate(client, make_user('donor'), make_campaign(), key='k' * 256)
+
+    assert response.status_code == 400
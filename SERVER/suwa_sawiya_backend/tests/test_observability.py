@@ -0,0 +1,66 @@
+"""Prometheus metrics, SQL statistics and the on-demand request profiler"""
+import os
+
+import pytest
+
+
+def test_metrics_expose_request_latency_and_pool_gauges(client, make_campaign):
+    make_campaign()
+    assert client.get('/api/donor/campaigns').status_code == 200
+
+    body = client.get('/metrics').get_data(as_text=True)
+
+    labels = 'blueprint="donor",endpoint="donor.get_campaigns",method="GET"'
+    assert f'http_requests_total{{{labels},status="200"}}' in body
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}' in body
+    assert 'db_pool_checked_out{pool="suwa_sawiya_test_db"}' in body
+
+
+def test_metrics_can_require_a_token(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_AUTH_TOKEN', 'scrape-secret')
+
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+
+
+def test_sql_stats_aggregate_queries_per_endpoint(client, make_user, make_campaign):
+    admin = make_user('admin')
+    make_campaign()
+    client.get('/api/donor/campaigns/priority')
+
+    stats = client.get('/api/admin/sql/stats', headers=admin.headers).get_json()['data']
+
+    assert 'donor.get_priority_campaigns' in str(stats)
+
+
+@pytest.fixture
+def profile_dir(app, tmp_path, monkeypatch):
+    directory = str(tmp_path / 'profiles')
+    monkeypatch.setitem(app.config, 'PROFILE_DIR', directory)
+    return directory
+
+
+def test_requests_with_a_profiling_token_are_profiled(client, make_user, make_campaign, profile_dir):
+    admin = make_user('admin')
+    make_campaign()
+    token = client.post('/api/admin/profiling/token', headers=admin.headers, json={'ttl': 60}).get_json()['data']
+
+    response = client.get('/api/donor/campaigns', headers={token['header']: token['token']})
+
+    profile_id = response.headers['X-Profile-Id']
+    [profile] = client.get('/api/admin/profiling/profiles', headers=admin.headers).get_json()['data']
+    assert profile['request_id'] == profile_id
+    assert profile['endpoint'] == 'donor.get_campaigns'
+    collapsed = [name for name in profile['files'] if name.endswith('.collapsed')][0]
+    download = client.get(f'/api/admin/profiling/profiles/{collapsed}', headers=admin.headers)
+    assert download.status_code == 200 and b'get_campaigns' in download.get_data()
+
+
+def test_forged_or_expired_tokens_are_ignored(client, make_user, profile_dir):
+    admin = make_user('admin')
+
+    response = client.get('/api/donor/campaigns', headers={'X-Profile-Token': '9999999999.forged'})
+
+    assert 'X-Profile-Id' not in response.headers
+    assert not os.path.exists(profile_dir)
+    assert client.post('/api/admin/profiling/token', headers=admin.headers, json={'ttl': 0}).status_code == 400
@@ -0,0 +1,106 @@
+"""Donations: creation, ownership of confirmations, webhooks and batch settlement"""
+from app.models import db
+from app.models.campaign import Campaign, Donation
+from app.models.other import PaymentEvent, Transaction
+from app.utils.fake_gateway import get_fake_gateway, signed_event, sign_payload
+from app.utils.payment_events import process_payment_events
+
+
+def _donate(client, account, campaign_id, amount=25.0, **body):
+    response = client.post(
+        '/api/donor/donate', headers=account.headers,
+        json=dict(campaign_id=str(campaign_id), amount=amount, **body)
+    )
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return response.get_json()['data']['donation_id']
+
+
+def _post_event(client, payload, signature):
+    return client.post(
+        '/api/payments/webhook', data=payload,
+        headers={'Stripe-Signature': signature, 'Content-Type': 'application/json'}
+    )
+
+
+def _settled_intent(app, donation_id, succeed):
+    with app.app_context():
+        intent_id = db.session.get(Donation, donation_id).transaction_id
+    gateway = get_fake_gateway(app.config['FAKE_GATEWAY_PATH'])
+    return gateway.settle([intent_id], success_rate=1 if succeed else 0)[0]
+
+
+def test_only_the_donor_can_confirm_a_donation(client, make_user, make_campaign):
+    donor, other = make_user('donor'), make_user('donor')
+    donation_id = _donate(client, donor, make_campaign())
+
+    assert client.post(f'/api/donor/donations/{donation_id}/confirm', headers=donor.headers).status_code == 202
+    assert client.post(f'/api/donor/donations/{donation_id}/confirm', headers=other.headers).status_code == 404
+
+
+def test_anonymous_donations_are_confirmable_but_hide_their_donor(client, make_user, make_campaign):
+    donor, other = make_user('donor'), make_user('donor')
+    donation_id = _donate(client, donor, make_campaign(), is_anonymous=True)
+
+    response = client.post(f'/api/donor/donations/{donation_id}/confirm', headers=donor.headers)
+
+    assert response.status_code == 202
+    assert response.get_json()['data']['donation']['donor_id'] is None
+    assert client.post(f'/api/donor/donations/{donation_id}/confirm', headers=other.headers).status_code == 404
+
+
+def test_webhook_rejects_bad_signatures(app, client, make_user, make_campaign):
+    donation_id = _donate(client, make_user('donor'), make_campaign())
+    payload, _ = signed_event(_settled_intent(app, donation_id, succeed=True), 'whsec_test')
+
+    assert _post_event(client, payload, sign_payload(payload, 'whsec_wrong')).status_code == 400
+    assert _post_event(client, payload, '').status_code == 400
+    with app.app_context():
+        assert PaymentEvent.query.count() == 0
+
+
+def test_webhook_queues_each_event_once(app, client, make_user, make_campaign):
+    donation_id = _donate(client, make_user('donor'), make_campaign())
+    payload, signature = signed_event(_settled_intent(app, donation_id, succeed=True), 'whsec_test')
+
+    first = _post_event(client, payload, signature)
+    redelivery = _post_event(client, payload, signature)
+
+    assert first.get_json()['data']['queued'] is True
+    assert redelivery.get_json()['data']['queued'] is False
+    with app.app_context():
+        assert PaymentEvent.query.filter_by(status='queued').count() == 1
+
+
+def test_queued_events_are_settled_in_one_batch(app, client, make_user, make_campaign):
+    donor = make_user('donor')
+    campaign_id = make_campaign()
+    paid = [_donate(client, donor, campaign_id, 30.0) for _ in range(3)]
+    declined = _donate(client, donor, campaign_id, 50.0)
+    for donation_id, succeed in [(paid[0], True), (paid[1], True), (paid[2], True), (declined, False)]:
+        payload, signature = signed_event(_settled_intent(app, donation_id, succeed), 'whsec_test')
+        assert _post_event(client, payload, signature).status_code == 200
+
+    with app.app_context():
+        assert process_payment_events(batch_size=10) == 4
+        assert process_payment_events(batch_size=10) == 0
+
+        assert {db.session.get(Donation, d).status for d in paid} == {'completed'}
+        assert db.session.get(Donation, declined).status == 'failed'
+        assert db.session.get(Campaign, campaign_id).funds_raised == 90.0
+        assert Transaction.query.count() == 3
+        assert PaymentEvent.query.filter_by(status='processed').count() == 4
+
+    response = client.post(f'/api/donor/donations/{paid[0]}/confirm', headers=donor.headers)
+    assert response.status_code == 200
+    assert response.get_json()['data']['campaign_progress']['funds_raised'] == 90.0
+
+
+def test_a_charge_that_does_not_match_the_donation_is_not_settled(app, client, make_user, make_campaign):
+    donation_id = _donate(client, make_user('donor'), make_campaign(), 25.0)
+    intent = dict(_settled_intent(app, donation_id, succeed=True), amount=100)
+    payload, signature = signed_event(intent, 'whsec_test')
+    _post_event(client, payload, signature)
+
+    with app.app_context():
+        process_payment_events()
+        assert db.session.get(Donation, donation_id).status == 'pending'
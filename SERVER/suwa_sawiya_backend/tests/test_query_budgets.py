@@ -0,0 +1,96 @@
+"""Budgeted routes stay within their declared query budgets
+
+TestingConfig sets SQL_STRICT_BUDGETS, so a route over its budget raises
+QueryBudgetExceeded; every request here also asserts X-DB-Query-Count.
+"""
+from collections import namedtuple
+
+import pytest
+from app.models import db
+from app.models.other import Document
+from app.utils.query_stats import QueryBudgetExceeded
+from conftest import PASSWORD
+
+World = namedtuple('World', ['donor', 'partner', 'campaign_id', 'document_id'])
+
+# (method, url template, who calls it) for every route with a @query_budget
+BUDGETED_REQUESTS = [
+    ('POST', '/api/auth/login', None),
+    ('GET', '/api/auth/profile', 'donor'),
+    ('GET', '/api/donor/campaigns', None),
+    ('GET', '/api/donor/campaigns/search?search=surgery&urgency=high', None),
+    ('GET', '/api/donor/campaigns/priority', None),
+    ('GET', '/api/donor/campaigns/{campaign_id}', None),
+    ('GET', '/api/donor/campaigns/{campaign_id}/donations', None),
+    ('GET', '/api/donor/campaigns/{campaign_id}/updates', None),
+    ('GET', '/api/donor/donations', 'donor'),
+    ('GET', '/api/partner/campaigns', 'partner'),
+    ('GET', '/api/partner/campaigns/progress', 'partner'),
+    ('GET', '/api/partner/campaigns/{campaign_id}/progress', 'partner'),
+    ('GET', '/api/partner/profile', 'partner'),
+    ('GET', '/api/files/campaigns/{campaign_id}/cover', None),
+    ('GET', '/api/files/documents/{document_id}', 'partner'),
+]
+
+
+@pytest.fixture
+def world(app, make_user, make_campaign, make_donation, upload_folder):
+    """A partner with several campaigns, each with donations from two donors"""
+    donor = make_user('donor')
+    other_donor = make_user('donor')
+    partner = make_user('partner')
+
+    cover = f'{upload_folder}/cover.png'
+    with open(cover, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n' + b'\x00' * 64)
+    document_path = f'{upload_folder}/certificate.pdf'
+    with open(document_path, 'wb') as f:
+        f.write(b'%PDF-1.4\n%test\n')
+
+    campaign_ids = [make_campaign(partner_id=partner.id, cover_image=cover) for _ in range(3)]
+    for campaign_id in campaign_ids:
+        for account in (donor, other_donor, donor):
+            make_donation(campaign_id, 20.0, donor_id=account.id)
+
+    with app.app_context():
+        document = Document(
+            campaign_id=campaign_ids[0], document_type='medical_certificate', file_path=document_path,
+            file_name='certificate.pdf', file_size=16, mime_type='application/pdf'
+        )
+        db.session.add(document)
+        db.session.commit()
+        return World(donor, partner, campaign_ids[0], document.id)
+
+
+@pytest.mark.parametrize('method, url, caller', BUDGETED_REQUESTS, ids=[f'{m} {u}' for m, u, _ in BUDGETED_REQUESTS])
+def test_route_stays_within_its_budget(app, client, world, method, url, caller):
+    url = url.format(campaign_id=world.campaign_id, document_id=world.document_id)
+    headers = getattr(world, caller).headers if caller else {}
+    body = {'email': world.donor.email, 'password': PASSWORD} if url == '/api/auth/login' else None
+
+    response = client.open(url, method=method, headers=headers, json=body)
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    if '/search' in url:
+        # The ranked full-text path, not the plain filter
+        assert response.get_json()['data'][0]['highlights']
+    view = app.view_functions[app.url_map.bind('').match(url.split('?')[0], method=method)[0]]
+    assert int(response.headers['X-DB-Query-Count']) <= view.query_budget
+
+
+def test_every_budgeted_route_is_exercised(app):
+    adapter = app.url_map.bind('')
+    exercised = {adapter.match(url.split('?')[0].format(campaign_id='c', document_id='d'), method=method)[0]
+                 for method, url, _ in BUDGETED_REQUESTS}
+    budgeted = {endpoint for endpoint, view in app.view_functions.items() if hasattr(view, 'query_budget')}
+
+    assert budgeted == exercised
+
+
+def test_strict_mode_raises_when_a_route_exceeds_its_budget(app, client, make_campaign, monkeypatch):
+    campaign_id = make_campaign()
+    view = app.view_functions['donor.get_campaign_details']
+    monkeypatch.setattr(view, 'query_budget', 0)
+
+    with pytest.raises(QueryBudgetExceeded, match='budget is 0'):
+        client.get(f'/api/donor/campaigns/{campaign_id}')
@@ -0,0 +1,36 @@
+"""The queries behind the hot routes use the indexes designed for them
+
+Seeds a synthetic dataset (smaller than check_query_plans.py's default, but
+large enough that the planner prefers indexes) inside a transaction that is
+rolled back after the module.
+"""
+import pytest
+
+from app.models import db
+from check_query_plans import PLAN_CHECKS, explain, plan_indexes, sample_ids, seed
+
+pytestmark = pytest.mark.rolled_back
+
+
+@pytest.fixture(scope='module')
+def seeded(app):
+    """(connection, sample ids) on seeded data that is never committed"""
+    with app.app_context():
+        conn = db.engine.connect()
+        transaction = conn.begin()
+        try:
+            seed(conn, users=8000, campaigns=20000, donations=100000)
+            yield conn, sample_ids(conn)
+        finally:
+            transaction.rollback()
+            conn.close()
+
+
+@pytest.mark.parametrize('name, build, expected', PLAN_CHECKS, ids=[check[0] for check in PLAN_CHECKS])
+def test_query_uses_its_index(seeded, name, build, expected):
+    conn, sample = seeded
+
+    plan = explain(conn, build(sample))
+
+    used = plan_indexes(plan)
+    assert used & expected, f"{name}: {', '.join(sorted(used)) or plan['Node Type']}, expected {' or '.join(sorted(expected))}"
@@ -0,0 +1,77 @@
+"""Reconciliation of pending donations against the (fake) gateway"""
+from datetime import datetime, timedelta
+
+import stripe
+
+from app.models import db
+from app.models.campaign import Campaign, Donation
+from app.utils.fake_gateway import get_fake_gateway
+from app.utils.payment import create_payment_intent, verify_payment_intent
+from app.utils.reconciliation import reconcile_pending_donations
+
+
+def _pending_donation(app, campaign_id, amount, paid):
+    with app.app_context():
+        intent, error = create_payment_intent(amount)
+        assert error is None
+        if paid:
+            get_fake_gateway(app.config['FAKE_GATEWAY_PATH']).settle([intent['id']], success_rate=1)
+        donation = Donation(campaign_id=campaign_id, amount=amount, status='pending', transaction_id=intent['id'])
+        db.session.add(donation)
+        db.session.commit()
+        return donation.id
+
+
+def test_reconcile_settles_paid_donations_and_skips_unknown_intents(app, make_campaign):
+    campaign_id = make_campaign()
+    paid = _pending_donation(app, campaign_id, 40.0, paid=True)
+    unpaid = _pending_donation(app, campaign_id, 15.0, paid=False)
+    with app.app_context():
+        db.session.add(Donation(campaign_id=campaign_id, amount=5.0, status='pending', transaction_id='pi_missing'))
+        db.session.commit()
+
+        stats = reconcile_pending_donations(min_age=0, abandon_after=None)
+
+        assert stats['scanned'] == 3
+        assert stats['completed'] == 1
+        assert stats['failed'] == 0
+        assert stats['still_pending'] == 2
+        assert db.session.get(Donation, paid).status == 'completed'
+        assert db.session.get(Donation, unpaid).status == 'pending'
+        assert db.session.get(Campaign, campaign_id).funds_raised == 40.0
+
+
+def test_reconcile_abandons_old_unpaid_donations(app, make_campaign):
+    campaign_id = make_campaign()
+    unpaid = _pending_donation(app, campaign_id, 15.0, paid=False)
+    with app.app_context():
+        Donation.query.filter_by(id=unpaid).update({'created_at': datetime.utcnow() - timedelta(minutes=2)})
+        db.session.commit()
+
+        stats = reconcile_pending_donations(min_age=0, abandon_after=60)
+
+        assert stats['failed'] == 1
+        assert db.session.get(Donation, unpaid).status == 'failed'
+
+
+def test_missing_stripe_intent_is_not_an_error(app, monkeypatch):
+    def retrieve(intent_id):
+        raise stripe.error.InvalidRequestError(
+            f"No such payment_intent: '{intent_id}'", 'intent', code='resource_missing'
+        )
+
+    monkeypatch.setitem(app.config, 'PAYMENT_GATEWAY', 'stripe')
+    monkeypatch.setattr(stripe.PaymentIntent, 'retrieve', retrieve)
+    with app.app_context():
+        assert verify_payment_intent('pi_deleted') == (None, None)
+
+
+def test_other_stripe_errors_are_reported(app, monkeypatch):
+    def retrieve(intent_id):
+        raise stripe.error.APIConnectionError('Network unreachable')
+
+    monkeypatch.setitem(app.config, 'PAYMENT_GATEWAY', 'stripe')
+    monkeypatch.setattr(stripe.PaymentIntent, 'retrieve', retrieve)
+    with app.app_context():
+        intent, error = verify_payment_intent('pi_1')
+        assert intent is None and 'Network unreachable' in error
@@ -0,0 +1,48 @@
+"""Synthetic load-test data from seed_db.py --scale"""
+from datetime import datetime
+
+from sqlalchemy import func, text
+
+from app.models import db
+from app.models.campaign import Campaign, Donation
+from app.models.user import Donor
+from seed_db import SCALE_UNIT, seed_scale
+
+ANCHOR = datetime(2026, 1, 1)
+
+
+def _snapshot():
+    return (
+        sorted((str(c.id), c.title, c.status, round(c.funds_raised, 2)) for c in Campaign.query),
+        sorted((str(d.id), str(d.campaign_id), d.amount, d.created_at) for d in Donation.query)
+    )
+
+
+def test_same_seed_and_anchor_give_the_same_data(app):
+    seed_scale(0.01, seed=7, batch_size=250, anchor=ANCHOR, config_name='testing')
+    with app.app_context():
+        first = _snapshot()
+        tables = ', '.join(table.name for table in db.metadata.sorted_tables)
+        db.session.execute(text(f'TRUNCATE {tables} CASCADE'))
+        db.session.commit()
+
+    seed_scale(0.01, seed=7, batch_size=250, anchor=ANCHOR, config_name='testing')
+    with app.app_context():
+        assert _snapshot() == first
+        assert len(first[1]) == round(SCALE_UNIT['donations'] * 0.01)
+
+
+def test_denormalized_totals_match_completed_donations(app):
+    seed_scale(0.01, seed=3, batch_size=500, anchor=ANCHOR, config_name='testing')
+    with app.app_context():
+        completed = Donation.query.filter_by(status='completed')
+        by_campaign = dict(completed.with_entities(Donation.campaign_id, func.sum(Donation.amount))
+                           .group_by(Donation.campaign_id))
+        by_donor = dict(completed.filter(Donation.donor_id.isnot(None))
+                        .with_entities(Donation.donor_id, func.sum(Donation.amount)).group_by(Donation.donor_id))
+
+        for campaign in Campaign.query:
+            assert abs(campaign.funds_raised - by_campaign.get(campaign.id, 0)) < 0.01
+        for donor in Donor.query:
+            assert abs(donor.total_donated - by_donor.get(donor.id, 0)) < 0.01
+        assert max(d.created_at for d in Donation.query) < ANCHOR